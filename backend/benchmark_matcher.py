@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Matcher benchmark and differential-correctness check
+Usage: python benchmark_matcher.py [--sizes 100,1000,10000] [--queries 1000] [--check] [--output results.json]
+
+Generates synthetic dockmaster sets across the real zone layout, times the
+brute-force matcher functions next to the indexed and batch engines
+(p50/p99 per call plus peak memory), and with --check verifies that every
+accelerated engine gives exactly the brute-force answers.
+"""
+
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from models import DockmasterEntry
+from utils.zone_validator import (
+    Point,
+    DEFAULT_MAP,
+    get_zone_layout,
+    get_zone_lookup,
+    get_zone_for_point,
+    is_transition_point,
+    point_in_polygon
+)
+from utils.matcher import calculate_distance, find_nearest_dockmaster, find_transition_zones, is_reference_point
+from utils.spatial_index import DockmasterIndex
+from utils.batch_matcher import match_points
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000, 1000000]
+
+# Brute-force matching is linear in the dataset, so it gets fewer queries as
+# sets grow: at most this many entry visits per size
+BRUTE_FORCE_BUDGET = 200000
+
+# find_transition_zones is quadratic on dense sets; skip it above these sizes
+TRANSITION_ZONES_LIMIT = 10000
+REFERENCE_TRANSITION_ZONES_LIMIT = 2000
+
+# Share of generated entries that are 6142 reference points
+REFERENCE_POINT_SHARE = 0.01
+
+# Synthetic data
+
+def layout_bounds(map_id: int = DEFAULT_MAP) -> Tuple[int, int, int, int]:
+    """Bounding box (min_x, max_x, min_y, max_y) of every region in a map's layout."""
+    xs, ys = [], []
+    for zone in get_zone_layout(map_id).zones.values():
+        for region in zone.regions:
+            xs += [region.min_x, region.max_x]
+            ys += [region.min_y, region.max_y]
+        for polygon in zone.polygons:
+            xs += [x for x, _ in polygon.vertices]
+            ys += [y for _, y in polygon.vertices]
+    return min(xs), max(xs), min(ys), max(ys)
+
+def generate_points(count: int, seed: int = 0, map_id: int = DEFAULT_MAP, margin: int = 300) -> Tuple[np.ndarray, np.ndarray]:
+    """Uniform query coordinates over the layout, plus a margin outside every zone."""
+    rng = np.random.default_rng(seed)
+    min_x, max_x, min_y, max_y = layout_bounds(map_id)
+    xs = rng.integers(min_x - margin, max_x + margin + 1, count, dtype=np.int64)
+    ys = rng.integers(min_y - margin, max_y + margin + 1, count, dtype=np.int64)
+    return xs, ys
+
+def generate_dockmasters(count: int, seed: int = 0, map_id: int = DEFAULT_MAP) -> List[DockmasterEntry]:
+    """
+    Synthetic dockmasters spread over the layout. Each one is named after the
+    zone it sits in (XD IDs in XD, the zone's direction suffix elsewhere), so
+    every zone has candidates the way the real file does.
+    """
+    rng = random.Random(seed)
+    xs, ys = generate_points(count, seed, map_id, margin=0)
+    lookup = get_zone_lookup(map_id)
+    codes = lookup.zone_codes_for(xs, ys)
+    layout = get_zone_layout(map_id)
+
+    entries = []
+    for n, (x, y, code) in enumerate(zip(xs.tolist(), ys.tolist(), codes.tolist()), 1):
+        direction = layout.zones[lookup.names[code]].primary_direction if code >= 0 else rng.choice("NSEW")
+        zone_id = f"XD{n}" if direction == "XD" else f"{n}{rng.choice('ABCD')}-{direction}"
+        if rng.random() < REFERENCE_POINT_SHARE:
+            y = 6142
+        entries.append(DockmasterEntry(
+            zone_id=zone_id,
+            x=x,
+            y=y,
+            map=map_id,
+            enabled=True,
+            is_reference_point=(y == 6142)
+        ))
+    return entries
+
+# Brute-force references: straight scans over every zone and region
+
+def reference_zone_mask(point: Point, map_id: Optional[int] = None) -> List[str]:
+    """Names of every zone containing the point."""
+    return [
+        name for name, zone in get_zone_layout(map_id).zones.items()
+        if any(r.min_x <= point.x <= r.max_x and r.min_y <= point.y <= r.max_y for r in zone.regions) or
+        any(point_in_polygon(point.x, point.y, polygon.vertices) for polygon in zone.polygons)
+    ]
+
+def reference_zone_for_point(point: Point, map_id: Optional[int] = None) -> Optional[str]:
+    """Scan-based get_zone_for_point."""
+    containing = reference_zone_mask(point, map_id)
+    return next((name for name in get_zone_layout(map_id).priority if name in containing), None)
+
+def reference_is_transition_point(point: Point, threshold: int = 200, map_id: Optional[int] = None) -> bool:
+    """Scan-based is_transition_point."""
+    if len(reference_zone_mask(point, map_id)) > 1:
+        return True
+    for zone in get_zone_layout(map_id).zones.values():
+        for region in zone.regions:
+            if (abs(point.x - region.min_x) <= threshold or abs(point.x - region.max_x) <= threshold or
+                    abs(point.y - region.min_y) <= threshold or abs(point.y - region.max_y) <= threshold):
+                return True
+        if any(polygon.boundary_distance(point.x, point.y) <= threshold for polygon in zone.polygons):
+            return True
+    return False
+
+def reference_find_transition_zones(
+    entries: List[DockmasterEntry],
+    distance_threshold: int = 100,
+    map_id: Optional[int] = None
+) -> List[List[DockmasterEntry]]:
+    """All-pairs find_transition_zones."""
+    zones = []
+    processed = set()
+
+    for entry in entries:
+        if entry.zone_id in processed or is_reference_point(entry):
+            continue
+
+        if reference_is_transition_point(Point(entry.x, entry.y), map_id=map_id):
+            zone = [entry]
+            for other in entries:
+                if other.zone_id == entry.zone_id or other.zone_id in processed or is_reference_point(other):
+                    continue
+
+                if reference_is_transition_point(Point(other.x, other.y), map_id=map_id):
+                    if calculate_distance(entry.x, entry.y, other.x, other.y) <= distance_threshold:
+                        zone.append(other)
+
+            if len(zone) > 1:
+                zones.append(zone)
+                processed.update(e.zone_id for e in zone)
+
+    return zones
+
+# Differential checks
+
+def _describe(entry: Optional[DockmasterEntry]):
+    return None if entry is None else (entry.zone_id, entry.x, entry.y, entry.transition_zone)
+
+def check_engines(
+    entries: List[DockmasterEntry],
+    xs: np.ndarray,
+    ys: np.ndarray,
+    map_id: int = DEFAULT_MAP,
+    thresholds: Sequence[int] = (0, 50, 200)
+) -> List[str]:
+    """
+    Compare every accelerated engine against the brute-force implementation
+    on the given dataset and query points. Returns a description of each
+    mismatch; an empty list means identical answers.
+    """
+    mismatches = []
+    points = [Point(x, y) for x, y in zip(xs.tolist(), ys.tolist())]
+
+    # Zone lookup and transition bands, scalar and vectorized
+    lookup = get_zone_lookup(map_id)
+    codes = lookup.zone_codes_for(xs, ys).tolist()
+    for point, code in zip(points, codes):
+        expected = reference_zone_for_point(point, map_id)
+        found = get_zone_for_point(point, map_id)
+        if found != expected or (lookup.names[code] if code >= 0 else None) != expected:
+            mismatches.append(f"zone at ({point.x}, {point.y}): {found!r}, expected {expected!r}")
+    for threshold in thresholds:
+        many = lookup.transition_bands(threshold).contains_many(xs, ys).tolist()
+        for point, in_band in zip(points, many):
+            expected = reference_is_transition_point(point, threshold, map_id)
+            found = is_transition_point(point, threshold, map_id)
+            if found != expected or in_band != expected:
+                mismatches.append(f"transition at ({point.x}, {point.y}), threshold {threshold}: {found}, expected {expected}")
+
+    # Nearest dockmaster: brute force vs index vs batch. The brute-force
+    # matcher tags entries in place, so it works on copies that are untagged
+    # again after every query.
+    index = DockmasterIndex(entries, map_id)
+    batch_matches, batch_confidences = match_points(index, xs, ys)
+    brute_entries = [entry.model_copy() for entry in entries]
+    for i, point in enumerate(points):
+        nearest, expected_confidence = find_nearest_dockmaster(point.x, point.y, brute_entries, map_id=map_id)
+        expected = _describe(nearest)
+        if nearest is not None:
+            nearest.transition_zone = None
+
+        found, confidence = index.find_nearest(point.x, point.y)
+        if _describe(found) != expected or confidence != expected_confidence:
+            mismatches.append(f"index match at ({point.x}, {point.y}): {_describe(found)} {confidence}, expected {expected} {expected_confidence}")
+        if _describe(batch_matches[i]) != expected or batch_confidences[i] != expected_confidence:
+            mismatches.append(f"batch match at ({point.x}, {point.y}): {_describe(batch_matches[i])} {batch_confidences[i]}, expected {expected} {expected_confidence}")
+
+    # Transition zone clustering
+    if len(entries) <= REFERENCE_TRANSITION_ZONES_LIMIT:
+        expected_zones = [[e.zone_id for e in zone] for zone in reference_find_transition_zones(entries, map_id=map_id)]
+        found_zones = [[e.zone_id for e in zone] for zone in find_transition_zones(entries, map_id=map_id)]
+        if found_zones != expected_zones:
+            mismatches.append(f"transition zones: {len(found_zones)} clusters, expected {len(expected_zones)}")
+
+    return mismatches
+
+# Timing
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """p50/p99/mean of per-call timings, in microseconds."""
+    ordered = sorted(samples)
+    return {
+        "calls": len(ordered),
+        "p50_us": ordered[len(ordered) // 2] * 1e6,
+        "p99_us": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1e6,
+        "mean_us": sum(ordered) / len(ordered) * 1e6
+    }
+
+def time_calls(fn: Callable, calls: Sequence[tuple]) -> List[float]:
+    samples = []
+    for args in calls:
+        start = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def peak_memory(fn: Callable) -> Tuple[object, int]:
+    """Run fn under tracemalloc. Returns (result, peak bytes allocated)."""
+    tracemalloc.start()
+    try:
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+def run_benchmark(sizes: Sequence[int], queries: int = 1000, seed: int = 0, check: bool = False) -> Tuple[List[Dict], List[str]]:
+    """Benchmark every size. Returns (results, mismatches)."""
+    results = []
+    mismatches = []
+    xs, ys = generate_points(queries, seed + 1)
+    points = [(x, y) for x, y in zip(xs.tolist(), ys.tolist())]
+
+    def record(size, operation, samples, memory=None):
+        row = {"size": size, "operation": operation, **summarize(samples), "peak_kb": memory and memory / 1024}
+        results.append(row)
+        print(
+            f"{'-' if size is None else size:>9} {operation:<34} {row['calls']:>6} {row['p50_us']:>12.1f} {row['p99_us']:>12.1f}"
+            f" {'' if memory is None else f'{memory / 1024:>12.0f}'}"
+        )
+
+    print(f"{'size':>9} {'operation':<34} {'calls':>6} {'p50 us':>12} {'p99 us':>12} {'peak KB':>12}")
+
+    # Zone lookups don't depend on the dockmaster set
+    zone_calls = [(Point(x, y),) for x, y in points]
+    record(None, "get_zone_for_point", time_calls(get_zone_for_point, zone_calls))
+    record(None, "reference_zone_for_point", time_calls(reference_zone_for_point, zone_calls))
+    record(None, "is_transition_point", time_calls(is_transition_point, zone_calls))
+    record(None, "reference_is_transition_point", time_calls(reference_is_transition_point, zone_calls))
+
+    for size in sizes:
+        start = time.perf_counter()
+        entries, entries_memory = peak_memory(lambda: generate_dockmasters(size, seed))
+        generate_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index = DockmasterIndex(entries)
+        build_time = time.perf_counter() - start
+        _, index_memory = peak_memory(lambda: DockmasterIndex(entries))
+        record(size, "generate_dockmasters", [generate_time], entries_memory)
+        record(size, "DockmasterIndex build", [build_time], index_memory)
+
+        # find_nearest_dockmaster tags entries in place, so keep it off the shared ones
+        brute_entries = [entry.model_copy() for entry in entries]
+        brute_queries = max(3, min(queries, BRUTE_FORCE_BUDGET // size))
+        record(size, "find_nearest_dockmaster", time_calls(
+            lambda x, y: find_nearest_dockmaster(x, y, brute_entries),
+            points[:brute_queries]
+        ))
+        record(size, "DockmasterIndex.find_nearest", time_calls(index.find_nearest, points))
+
+        _, batch_memory = peak_memory(lambda: match_points(index, xs, ys))
+        batch_samples = time_calls(lambda: match_points(index, xs, ys), [()] * 5)
+        record(size, f"match_points ({queries} points)", batch_samples, batch_memory)
+
+        if size <= TRANSITION_ZONES_LIMIT:
+            _, clusters_memory = peak_memory(lambda: find_transition_zones(entries))
+            record(size, "find_transition_zones", time_calls(find_transition_zones, [(entries,)] * 3), clusters_memory)
+        if size <= REFERENCE_TRANSITION_ZONES_LIMIT:
+            record(size, "reference_find_transition_zones", time_calls(reference_find_transition_zones, [(entries,)]))
+
+        if check:
+            found = check_engines(entries, xs[:brute_queries], ys[:brute_queries])
+            print(f"{size:>9} differential check: {'ok' if not found else f'{len(found)} mismatches'}")
+            mismatches += [f"size {size}: {mismatch}" for mismatch in found]
+
+    return results, mismatches
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dockmaster matcher")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="Comma-separated dockmaster set sizes")
+    parser.add_argument("--queries", type=int, default=1000, help="Query points per size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check", action="store_true", help="Verify accelerated engines against brute force")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    results, mismatches = run_benchmark(sizes, args.queries, args.seed, args.check)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"sizes": sizes, "queries": args.queries, "results": results, "mismatches": mismatches}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    for mismatch in mismatches[:20]:
+        print(f"MISMATCH {mismatch}")
+    if mismatches:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
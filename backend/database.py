@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, String, Integer, Boolean, DateTime, Text
+from sqlalchemy import create_engine, Column, String, Integer, Float, Boolean, DateTime, Text, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
@@ -42,6 +42,23 @@ class SuggestionDB(Base):
     pr_number = Column(Integer, nullable=True)
     pr_error = Column(Text, nullable=True)  # Store PR creation error
     pr_retry_count = Column(Integer, default=0)  # Track retry attempts
+    review_flags = Column(Text, nullable=True)  # JSON list of possible duplicates found at submission
+    
+    # Match annotations for add suggestions, kept current as the dockmasters change
+    nearest_zone_id = Column(String, nullable=True)  # Nearest valid existing dockmaster
+    nearest_distance = Column(Float, nullable=True)
+    detected_zone = Column(String, nullable=True)
+    match_confidence = Column(Float, nullable=True)
+    match_radius = Column(Float, nullable=True)  # Dockmaster changes beyond this distance can't affect the above
+    annotated_at = Column(DateTime, nullable=True)
+    
+    # Near-duplicate checks look up pending suggestions by position and zone ID;
+    # the admin list sorts and filters them by confidence
+    __table_args__ = (
+        Index("ix_suggestions_status_x_y", "status", "x", "y"),
+        Index("ix_suggestions_status_zone_id", "status", "zone_id"),
+        Index("ix_suggestions_status_confidence", "status", "match_confidence"),
+    )
 
 class AdminDB(Base):
     __tablename__ = "admins"
@@ -66,6 +83,21 @@ class DockmasterDB(Base):
     added_at = Column(DateTime, default=datetime.utcnow)
     is_active = Column(Boolean, default=True)
 
+class DockmasterAuditDB(Base):
+    __tablename__ = "dockmaster_audit"
+    
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    zone_id = Column(String, nullable=False, index=True)
+    x = Column(Integer, nullable=False)
+    y = Column(Integer, nullable=False)
+    map = Column(Integer, nullable=False)
+    zone = Column(String, nullable=True)  # Zone the coordinates fall in, if any
+    valid = Column(Boolean, nullable=False)
+    issue = Column(String, nullable=True)  # 'outside_zones', 'not_xd_in_xd', 'xd_outside_xd' or 'wrong_direction'
+    detail = Column(Text, nullable=True)
+    layout_key = Column(String, nullable=False)  # Fingerprint of the zone layout the row was checked against
+    checked_at = Column(DateTime, default=datetime.utcnow)
+
 # Create tables
 def create_tables():
     Base.metadata.create_all(bind=engine)
@@ -8,6 +8,9 @@ from routes.github import router as github_router
 from routes.suggestions import router as suggestions_router
 from routes.admin import router as admin_router
 from routes.dockmasters import router as dockmasters_router
+from utils.dockmaster_cache import schedule_derived_builds
+from utils.match_jobs import shutdown_match_jobs
+from utils.match_socket import start_match_socket, stop_match_socket
 
 # Load environment variables
 load_dotenv()
@@ -37,6 +40,24 @@ app.include_router(suggestions_router, prefix="/api/suggestions", tags=["suggest
 app.include_router(admin_router, prefix="/api/admin", tags=["admin"])
 app.include_router(dockmasters_router, prefix="/api/dockmasters", tags=["dockmasters"])
 
+@app.on_event("startup")
+async def build_derived_data():
+    # Answer raster, zone audit and suggestion annotations, in the background
+    schedule_derived_builds()
+
+@app.on_event("startup")
+async def open_match_socket():
+    # Binary match protocol for bots, only if MATCH_SOCKET_PATH is set
+    app.state.match_socket = await start_match_socket()
+
+@app.on_event("shutdown")
+async def stop_match_workers():
+    shutdown_match_jobs()
+
+@app.on_event("shutdown")
+async def close_match_socket():
+    await stop_match_socket(app.state.match_socket)
+
 @app.get("/")
 async def root():
     return {"message": "Dockmaster Suggestion Portal API", "version": "1.0.0"}
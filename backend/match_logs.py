@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Offline bulk matcher for large coordinate logs
+Usage: python match_logs.py LOG [--map 7] [--fields 0,1] [--output results.csv] [--tallies tallies.json]
+                            [--dockmasters "GG DOCKMASTERS.txt"] [--workers N]
+
+Memory-maps the log and pulls x and y out of every line (by default the
+first two integers on it, so both CSV and free-text logs work), then matches
+them on all cores through the same engine as the API. Writes per-zone
+tallies, and with --output one CSV result row per matched line. Dockmasters
+come from the database configured in DATABASE_URL unless a dockmaster file
+is given.
+"""
+
+import argparse
+import json
+import mmap
+import os
+import shutil
+import sys
+import tempfile
+import time
+from dotenv import load_dotenv
+from utils.dockmaster_store import DockmasterStore
+from utils.log_matcher import RESULT_COLUMNS, match_log_range, split_ranges, tally_by_zone, write_log_results
+from utils.match_jobs import MATCH_JOB_WORKERS, SharedStorePool
+
+def load_store(dockmasters_path: str = None) -> DockmasterStore:
+    """Dockmasters from a GG DOCKMASTERS file, or the configured database."""
+    if dockmasters_path:
+        from utils.dockmaster_file import parse_dockmaster_file
+        with open(dockmasters_path, encoding="utf-8") as f:
+            rows, _ = parse_dockmaster_file(f.read())
+        return DockmasterStore(
+            [row["zone_id"] for row in rows],
+            [row["x"] for row in rows],
+            [row["y"] for row in rows],
+            [row["map"] for row in rows],
+            [row["enabled"] for row in rows]
+        )
+
+    from database import SessionLocal
+    from utils.dockmaster_cache import load_dockmaster_store
+    db = SessionLocal()
+    try:
+        return load_dockmaster_store(db)
+    finally:
+        db.close()
+
+def match_log(
+    path: str,
+    store: DockmasterStore,
+    map_id: int = 7,
+    fields=(0, 1),
+    confidence_threshold: float = 0.8,
+    output: str = None,
+    workers: int = MATCH_JOB_WORKERS
+) -> dict:
+    """Match every line of a log file; returns the summary and per-zone tallies."""
+    started = time.time()
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            ranges = []
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                ranges = split_ranges(mm)
+
+    part_dir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(output))) if output else None
+    pool = SharedStorePool(0, store, max_workers=workers)
+    try:
+        futures = [
+            pool.executor.submit(
+                match_log_range, path, start, stop, map_id, tuple(fields), confidence_threshold,
+                os.path.join(part_dir, f"{i:06d}.npz") if part_dir else None
+            )
+            for i, (start, stop) in enumerate(ranges)
+        ]
+        tallies = None
+        total_lines = 0
+        writes = []
+        for i, future in enumerate(futures):
+            result, line_count = future.result()
+            tallies = result if tallies is None else {key: tallies[key] + result[key] for key in tallies}
+            if part_dir:
+                # Every earlier range is counted by now, so this one's line numbers are known
+                writes.append(pool.executor.submit(
+                    write_log_results, os.path.join(part_dir, f"{i:06d}.npz"), os.path.join(part_dir, f"{i:06d}.csv"),
+                    total_lines, map_id
+                ))
+            total_lines += line_count
+            print(f"Matched {i + 1}/{len(futures)} chunks", file=sys.stderr)
+
+        if output:
+            with open(output, "w") as out:
+                out.write(RESULT_COLUMNS)
+                for i, write in enumerate(writes):
+                    write.result()
+                    with open(os.path.join(part_dir, f"{i:06d}.csv")) as part:
+                        shutil.copyfileobj(part, out)
+    finally:
+        pool.close()
+        if part_dir:
+            shutil.rmtree(part_dir, ignore_errors=True)
+
+    zones = tally_by_zone(map_id, tallies) if tallies is not None else {}
+    return {
+        "log": path,
+        "map": map_id,
+        "lines": total_lines,
+        "points": sum(zone["points"] for zone in zones.values()),
+        "matched": sum(zone["matched"] for zone in zones.values()),
+        "needs_verification": sum(zone["needs_verification"] for zone in zones.values()),
+        "seconds": round(time.time() - started, 3),
+        "zones": zones
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Match the coordinates in a large log file")
+    parser.add_argument("log", help="Text or CSV log with coordinates on each line")
+    parser.add_argument("--map", type=int, default=7, help="Map ID (defaults to 7)")
+    parser.add_argument("--fields", default="0,1", help="Which integers on a line are x,y (0-based, default 0,1)")
+    parser.add_argument("--confidence-threshold", type=float, default=0.8)
+    parser.add_argument("--output", help="Write per-line results as CSV to this file")
+    parser.add_argument("--tallies", help="Write the summary and per-zone tallies as JSON to this file")
+    parser.add_argument("--dockmasters", help="Match against this GG DOCKMASTERS file instead of the database")
+    parser.add_argument("--workers", type=int, default=MATCH_JOB_WORKERS, help="Worker processes (default: one per core)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    fields = tuple(int(field) for field in args.fields.split(","))
+    if len(fields) != 2 or min(fields) < 0:
+        parser.error("--fields needs two non-negative field numbers, e.g. 0,1")
+
+    summary = match_log(
+        args.log, load_store(args.dockmasters), args.map, fields, args.confidence_threshold, args.output, args.workers
+    )
+    if args.tallies:
+        with open(args.tallies, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"Tallies written to {args.tallies}")
+    else:
+        print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
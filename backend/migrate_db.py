@@ -29,6 +29,26 @@ def migrate_database():
             print("Adding pr_retry_count column...")
             cursor.execute("ALTER TABLE suggestions ADD COLUMN pr_retry_count INTEGER DEFAULT 0")
         
+        if 'review_flags' not in columns:
+            print("Adding review_flags column...")
+            cursor.execute("ALTER TABLE suggestions ADD COLUMN review_flags TEXT")
+        
+        for column, column_type in [
+            ("nearest_zone_id", "VARCHAR"),
+            ("nearest_distance", "FLOAT"),
+            ("detected_zone", "VARCHAR"),
+            ("match_confidence", "FLOAT"),
+            ("match_radius", "FLOAT"),
+            ("annotated_at", "DATETIME")
+        ]:
+            if column not in columns:
+                print(f"Adding {column} column...")
+                cursor.execute(f"ALTER TABLE suggestions ADD COLUMN {column} {column_type}")
+        
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_suggestions_status_x_y ON suggestions (status, x, y)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_suggestions_status_zone_id ON suggestions (status, zone_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_suggestions_status_confidence ON suggestions (status, match_confidence)")
+        
         # Check if admins table exists
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='admins'")
         if not cursor.fetchone():
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Literal
+from typing import List, Optional, Literal
 from datetime import datetime
 
 class DockmasterEntry(BaseModel):
@@ -12,6 +12,15 @@ class DockmasterEntry(BaseModel):
     transition_zone: Optional[str] = Field(None, description="Identifier for transition zone if this is part of one")
     confidence: Optional[float] = Field(None, description="AI confidence score for this match")
 
+class CoordinatePair(BaseModel):
+    x: int = Field(..., description="X-coordinate")
+    y: int = Field(..., description="Y-coordinate")
+
+class BatchMatchRequest(BaseModel):
+    points: List[CoordinatePair] = Field(..., description="Coordinates to match")
+    map: int = Field(7, description="Map ID (defaults to 7)")
+    confidence_threshold: float = Field(0.8, description="Minimum confidence threshold")
+
 class SuggestionCreate(BaseModel):
     action: Literal["add", "remove"] = Field(..., description="Action to perform")
     zone_id: str = Field(..., description="Zone ID for the suggestion")
@@ -34,6 +43,11 @@ class Suggestion(SuggestionCreate):
     pr_number: Optional[int] = Field(None, description="GitHub Pull Request number")
     pr_error: Optional[str] = Field(None, description="PR creation error message")
     pr_retry_count: Optional[int] = Field(0, description="Number of PR creation retry attempts")
+    review_flags: List[dict] = Field(default_factory=list, description="Possible duplicates flagged at submission")
+    nearest_zone_id: Optional[str] = Field(None, description="Nearest valid existing dockmaster (add suggestions)")
+    nearest_distance: Optional[float] = Field(None, description="Distance to the nearest valid existing dockmaster")
+    detected_zone: Optional[str] = Field(None, description="Zone the coordinates fall in")
+    match_confidence: Optional[float] = Field(None, description="Match confidence at the coordinates")
 
 class SuggestionUpdate(BaseModel):
     status: Literal["approved", "rejected"]
@@ -1,15 +1,22 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from sqlalchemy.orm import Session
 import requests
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 import os
 import httpx
 import re
 from models import SuggestionUpdate, Suggestion, GitHubPRResponse, DockmasterEntry, AdminCreate, Admin
-from database import get_db, SuggestionDB, AdminDB, DockmasterDB
+from database import get_db, SuggestionDB, AdminDB, DockmasterDB, DockmasterAuditDB
 from routes.suggestions import db_suggestion_to_pydantic
 from routes.github import get_github_headers, get_repo_info
+from utils.dockmaster_file import parse_dockmaster_file
+from utils.zone_ids import normalize_zone_ids, sort_zone_id
+from utils.dockmaster_cache import dataset_changed, get_dataset_version, get_derived
+from utils.voronoi_impact import ImpactAnalyzer
+from utils.coverage import CoverageMap
+from utils.zone_validator import reload_zone_layouts
+from utils.zone_audit import get_last_audit_run, run_zone_audit
 
 router = APIRouter()
 
@@ -48,68 +55,25 @@ async def refresh_dockmasters_from_github(db: Session):
             print(f"Failed to fetch file from GitHub for auto-refresh: {response.status_code}")
             return
         
-        # Parse the file content using the same logic as dockmasters.py
+        # Parse the file content, normalizing zone IDs in one pass
         content = response.text
-        lines = content.strip().split('\n')
+        rows, normalized_ids = parse_dockmaster_file(content, log_prefix="Auto-refresh: ")
         
         # Clear existing dockmasters
         db.query(DockmasterDB).delete()
         
-        # Process each line using the same logic as github.py
-        for line_num, line in enumerate(lines, 1):
-            original_line = line
-            line = line.strip()
-            
-            # Skip empty lines and comments
-            if not line or line.startswith('#'):
-                continue
-                
-            # Remove leading + if present (GitHub diff format)
-            if line.startswith('+'):
-                line = line[1:].strip()
-            
-            # Skip if still empty after cleaning
-            if not line:
-                continue
-                
-            # Split by tabs first, then by multiple spaces as fallback
-            if '	' in line:
-                parts = [part.strip() for part in line.split('	')]
-            else:
-                # Split by whitespace and filter empty parts
-                parts = [part for part in line.split() if part]
-            
-            # Filter out empty parts
-            parts = [part for part in parts if part]
-            
-            if len(parts) >= 5:
-                try:
-                    # Validate coordinates are numeric
-                    zone_id = parts[0]
-                    x_coord = int(parts[1])
-                    y_coord = int(parts[2])
-                    map_id = int(parts[3])
-                    enabled = parts[4].lower() in ['true', '1', 'yes', 'enabled']
-                    
-                    # Create dockmaster entry
-                    dockmaster = DockmasterDB(
-                        zone_id=zone_id,
-                        x=x_coord,
-                        y=y_coord,
-                        map=map_id,
-                        enabled=enabled,
-                        added_by="github_auto_refresh",
-                        is_reference_point=(y_coord == 6142),  # Mark reference points
-                        is_active=True
-                    )
-                    db.add(dockmaster)
-                except (ValueError, IndexError) as e:
-                    print(f"Auto-refresh: Line {line_num}: '{original_line}' -> '{line}' - {str(e)}")
-            elif len(parts) > 0:  # Non-empty line but insufficient parts
-                print(f"Auto-refresh: Line {line_num}: '{original_line}' -> '{line}' - Expected 5 parts, got {len(parts)}: {parts}")
+        for row in rows:
+            dockmaster = DockmasterDB(
+                **row,
+                added_by="github_auto_refresh",
+                is_reference_point=(row["y"] == 6142),  # Mark reference points
+                is_active=True
+            )
+            db.add(dockmaster)
         
         # Commit changes
         db.commit()
+        dataset_changed()
         
         # Get updated count
         total_count = db.query(DockmasterDB).count()
@@ -120,6 +84,8 @@ async def refresh_dockmasters_from_github(db: Session):
         ).count()
         
         print(f"Auto-refreshed dockmasters from GitHub: {total_count} total, {active_count} visible")
+        if normalized_ids:
+            print(f"Auto-refresh normalized zone IDs: {normalized_ids}")
         
     except Exception as e:
         print(f"Failed to auto-refresh dockmasters from GitHub: {str(e)}")
@@ -202,6 +168,38 @@ async def update_suggestion(suggestion_id: str, update_data: SuggestionUpdate, d
     
     return updated_suggestion
 
+@router.get("/{suggestion_id}/impact", response_model=dict)
+async def get_suggestion_impact(suggestion_id: str, db: Session = Depends(get_db)):
+    """
+    Area whose nearest dockmaster would change if the suggestion were applied,
+    and the dockmasters that would gain or lose it.
+    """
+    db_suggestion = db.query(SuggestionDB).filter(SuggestionDB.id == suggestion_id).first()
+    
+    if not db_suggestion:
+        raise HTTPException(status_code=404, detail="Suggestion not found")
+    
+    map_id = db_suggestion.map if db_suggestion.map is not None else 7
+    analyzer = get_derived(db, "voronoi_impact", (), ImpactAnalyzer, map_id)
+    try:
+        if db_suggestion.action == "add":
+            if db_suggestion.x is None or db_suggestion.y is None:
+                raise HTTPException(status_code=400, detail="Add suggestion has no coordinates")
+            impact = analyzer.analyze_add(db_suggestion.zone_id, db_suggestion.x, db_suggestion.y, db_suggestion.enabled is not False)
+        else:
+            impact = analyzer.analyze_remove(db_suggestion.zone_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "suggestion_id": suggestion_id,
+        "action": db_suggestion.action,
+        "zone_id": db_suggestion.zone_id,
+        "map": map_id,
+        "dataset_version": get_dataset_version(),
+        **impact
+    }
+
 @router.post("/{suggestion_id}/create-pr", response_model=GitHubPRResponse)
 async def create_github_pr(suggestion_id: str, db: Session = Depends(get_db)):
     """Create a GitHub Pull Request for an approved suggestion"""
@@ -436,44 +434,6 @@ def apply_suggestion_to_content(content: str, suggestion: Suggestion) -> str:
     """Apply the suggestion changes to the file content and return properly sorted content"""
     lines = content.strip().split('\n')
     
-    # Custom sorting function for zone IDs
-    def sort_zone_id(zone_id):
-        # Handle XD zones numerically (XD1, XD2, ..., XD10, XD11)
-        if zone_id.startswith("XD"):
-            try:
-                return (0, int(zone_id[2:]))  # 0 to put XD zones first, then numeric
-            except ValueError:
-                return (0, 9999)  # Invalid XD numbers go to end of XD section
-        # Handle XP zones (similar to XD)
-        elif zone_id.startswith("XP"):
-            try:
-                return (0.1, int(zone_id[2:]))  # 0.1 to put XP zones after XD
-            except ValueError:
-                return (0.1, 9999)
-        # Handle M zones (put them at the very end)
-        elif zone_id.startswith("M"):
-            try:
-                return (99, int(zone_id[1:]))  # 99 to put M zones at the very end
-            except ValueError:
-                return (99, 9999)
-        # Handle special zones (GH, The Gym, GG-Shelter, etc.)
-        elif not zone_id[0].isdigit():
-            return (50, zone_id)  # 50 to put special zones in middle
-        # Handle regular zones (numbers + letters + direction)
-        else:
-            # Extract number and letters for proper sorting
-            import re
-            match = re.match(r'(\d+)([A-Z]*)(-([NSEW]))?', zone_id)
-            if match:
-                number = int(match.group(1))
-                letters = match.group(2) or ""
-                direction = match.group(4) or ""
-                # Sort by number first, then letters, then direction (E, N, S, W)
-                direction_order = {"E": 1, "N": 2, "S": 3, "W": 4, "": 5}
-                return (1, number, letters, direction_order.get(direction, 5))
-            else:
-                return (2, zone_id)  # Fallback alphabetical
-    
     # Parse all existing lines, keeping comments and headers at the top
     header_lines = []
     data_lines = []
@@ -620,6 +580,14 @@ async def fix_file_format(db: Session = Depends(get_db)):
                 else:
                     print(f"DEBUG: Skipping line (insufficient parts): {line.strip()!r}")
         
+        # Normalize every zone ID in one pass (e.g. "XD-7" -> "XD7", "the gym" -> "The Gym")
+        original_ids = [line.split('\t')[0] for line in data_lines]
+        normalized, normalized_ids = normalize_zone_ids(original_ids)
+        data_lines = [
+            zone_id + line[len(original_id):]
+            for line, original_id, zone_id in zip(data_lines, original_ids, normalized)
+        ]
+        
         # Remove duplicates while preserving order (only remove exact line duplicates, not zone duplicates)
         seen_lines = set()
         unique_data_lines = []
@@ -702,6 +670,7 @@ This PR normalizes the entire dockmaster file to ensure consistent formatting:
 - **Fixed format**: All entries now have `zone_id x y 7 true` format
 - **Processed entries**: {len(unique_data_lines)} total entries
 - **Removed duplicates**: {len(data_lines) - len(unique_data_lines)} duplicate lines
+- **Normalized zone IDs**: {", ".join(f"{old} -> {new}" for old, new in normalized_ids.items()) or "none"}
 - **Proper sorting**: All zones sorted correctly (XD zones first, then regular zones, then M zones)
 
 This fixes the issue where some entries had only 4 columns while others had 5 columns, causing inconsistent formatting in future PRs.
@@ -730,7 +699,8 @@ This fixes the issue where some entries had only 4 columns while others had 5 co
             "pr_number": pr_info["number"],
             "branch_name": branch_name,
             "fixed_entries": len(unique_data_lines),
-            "removed_duplicates": len(data_lines) - len(unique_data_lines)
+            "removed_duplicates": len(data_lines) - len(unique_data_lines),
+            "normalized_ids": normalized_ids
         }
         
     except Exception as e:
@@ -751,6 +721,95 @@ async def get_admin_stats(db: Session = Depends(get_db)):
         "rejected": rejected
     }
 
+@router.get("/coverage")
+async def get_coverage(
+    resolution: int = Query(32, ge=8, le=512, description="Cell size in map units"),
+    gap_distance: float = Query(500, ge=0, description="Cells farther than this from a valid dockmaster count as gaps"),
+    worst: int = Query(5, ge=0, le=50, description="Worst-covered spots listed per zone"),
+    map: int = Query(7, description="Map ID (defaults to 7)"),
+    db: Session = Depends(get_db)
+):
+    """Heatmap of the distance to the nearest valid dockmaster, and the worst-covered spots per zone"""
+    coverage = get_derived(db, "coverage", (resolution,), lambda index: CoverageMap(index, resolution), map)
+    return {
+        "dataset_version": get_dataset_version(),
+        **coverage.summary(gap_distance, worst)
+    }
+
+@router.get("/audit")
+async def get_zone_audit(
+    issues_only: bool = Query(True, description="Only list dockmasters that fail the zone check"),
+    map: Optional[int] = Query(None, description="Only this map"),
+    db: Session = Depends(get_db)
+):
+    """Stored zone consistency results for every active dockmaster"""
+    query = db.query(DockmasterAuditDB)
+    if issues_only:
+        query = query.filter(DockmasterAuditDB.valid == False)
+    if map is not None:
+        query = query.filter(DockmasterAuditDB.map == map)
+    records = query.order_by(DockmasterAuditDB.map, DockmasterAuditDB.zone_id).all()
+    
+    return {
+        "last_run": get_last_audit_run(),
+        "count": len(records),
+        "results": [
+            {
+                "zone_id": record.zone_id,
+                "x": record.x,
+                "y": record.y,
+                "map": record.map,
+                "zone": record.zone,
+                "valid": record.valid,
+                "issue": record.issue,
+                "detail": record.detail,
+                "checked_at": record.checked_at.isoformat() if record.checked_at else None
+            }
+            for record in records
+        ]
+    }
+
+@router.post("/audit/run")
+def run_audit(current_admin_id: str, full: bool = False, db: Session = Depends(get_db)):
+    """Re-check changed dockmasters against their zones now (every dockmaster with full=true)"""
+    if current_admin_id not in get_all_admin_ids(db):
+        raise HTTPException(status_code=403, detail="Only admins can run the zone audit")
+    
+    try:
+        return run_zone_audit(db, full)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Zone audit failed: {str(e)}")
+
+@router.post("/zones/reload")
+async def reload_zones(current_admin_id: str, db: Session = Depends(get_db)):
+    """Reload the zone definitions from the zones config without a restart"""
+    if current_admin_id not in get_all_admin_ids(db):
+        raise HTTPException(status_code=403, detail="Only admins can reload zones")
+
+    try:
+        layouts = reload_zone_layouts()
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Zones config rejected, current zones kept: {str(e)}")
+
+    # Cached matches and transition zones were computed against the old zones
+    dataset_changed()
+
+    return {
+        "message": "Zones reloaded successfully",
+        "maps": {
+            map_id: {
+                name: {
+                    "direction": zone.primary_direction,
+                    "regions": len(zone.regions),
+                    "polygons": len(zone.polygons)
+                }
+                for name, zone in layout.zones.items()
+            }
+            for map_id, layout in layouts.items()
+        }
+    }
+
 # Admin Management Endpoints
 
 @router.get("/admins", response_model=List[Admin])
@@ -1,65 +1,81 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, UploadFile, File
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from database import get_db, AdminDB, DockmasterDB
-from models import DockmasterEntry
+from models import DockmasterEntry, BatchMatchRequest
 from utils.matcher import (
-    find_nearest_dockmaster,
+    format_dockmaster_id,
     should_prompt_for_verification,
     validate_dockmaster_id,
     find_transition_zones
 )
+from utils.dockmaster_file import parse_dockmaster_file
+from utils.dockmaster_cache import get_dataset_version, get_dockmaster_index, get_dockmaster_store, get_derived, get_versioned_dockmaster_store, dataset_changed
+from utils.match_cache import match_cache
+from utils.batch_matcher import match_points
+from utils.stream_matcher import STREAM_FORMATS, detect_format, stream_match_results
+from utils.match_jobs import get_match_job, submit_match_job
+from utils.answer_raster import CLASS_CONFIDENT, CLASS_NONE, CLASS_VERIFY, get_answer_raster
+from utils.viewport_index import ViewportIndex
+from utils.zone_id_trie import MAX_AUTOCOMPLETE_MATCHES, ZoneIdTrie
+from utils.route_planner import MAX_ROUTE_STOPS, DistanceGraph, plan_route
+from utils.zone_validator import Point, get_zone_layout, get_zone_for_point, is_transition_point, validate_dockmaster_match
 import httpx
+import io
 import os
 import re
+import shutil
+import tempfile
+import numpy as np
 
 router = APIRouter()
 
+# Upper bound on points accepted by a single batch match request
+MAX_BATCH_POINTS = 100000
+
+# Upper bound on candidates returned by /nearest and /within
+MAX_CANDIDATES = 1000
+
 @router.get("/", response_model=List[dict])
-async def get_dockmasters(db: Session = Depends(get_db)):
-    """Fetch all dockmasters."""
-    dockmasters = db.query(DockmasterDB).filter(
-        DockmasterDB.is_active == True,
-        DockmasterDB.y != 6142,  # Filter out reference points
-        ~DockmasterDB.zone_id.like('M%')  # Filter out M# grid locations
-    ).all()
-    
-    # Convert to list for custom sorting
-    dockmaster_list = [
-        {
-            "zone_id": dm.zone_id,
-            "x": dm.x,
-            "y": dm.y,
-            "map": dm.map,
-            "enabled": dm.enabled
-        }
-        for dm in dockmasters
-    ]
-    
-    # Custom sort function to handle zone IDs properly
-    def sort_zone_id(item):
-        zone_id = item["zone_id"]
-        # Handle XD zones numerically (XD1, XD2, ..., XD10, XD11)
-        if zone_id.startswith("XD"):
-            try:
-                return (0, int(zone_id[2:]))  # 0 to put XD zones first, then numeric
-            except ValueError:
-                return (0, 9999)  # Invalid XD numbers go to end of XD section
-        # Handle regular zones (numbers + letters)
-        else:
-            # Extract number and letters for proper sorting
-            import re
-            match = re.match(r'(\d+)([A-Z]*)(-.*)?', zone_id)
-            if match:
-                number = int(match.group(1))
-                letters = match.group(2) or ""
-                suffix = match.group(3) or ""
-                return (1, number, letters, suffix)  # 1 to put after XD zones
-            else:
-                return (2, zone_id)  # Fallback alphabetical
+async def get_dockmasters(
+    bbox: Optional[str] = Query(None, description="Only dockmasters inside minx,miny,maxx,maxy (edges included)"),
+    map: Optional[int] = Query(None, description="Only dockmasters on this map"),
+    db: Session = Depends(get_db)
+):
+    """Fetch all dockmasters, or those in a viewport."""
+    box = None
+    if bbox is not None:
+        try:
+            box = [int(value) for value in bbox.split(",")]
+        except ValueError:
+            box = []
+        if len(box) != 4 or box[0] > box[2] or box[1] > box[3]:
+            raise HTTPException(status_code=400, detail="bbox must be minx,miny,maxx,maxy with min <= max")
     
-    dockmaster_list.sort(key=sort_zone_id)
-    return dockmaster_list
+    # Filtered (active, no 6142 reference points or M# grid locations) and sorted once per
+    # dataset load, with a grid index for viewport queries
+    viewport = get_derived(
+        db, "viewport_index", (map,), lambda index: ViewportIndex(get_dockmaster_store(db), map)
+    )
+    if box is None:
+        return viewport.items
+    return viewport.within(*box)
+
+@router.get("/autocomplete", response_model=dict)
+async def autocomplete_zone_ids(
+    prefix: str = Query("", description="Start of a zone ID; case, spaces and hyphens are ignored"),
+    limit: int = Query(10, ge=1, le=MAX_AUTOCOMPLETE_MATCHES, description="Maximum matches"),
+    map: int = Query(7, description="Map ID (defaults to 7)"),
+    db: Session = Depends(get_db)
+):
+    """Zone IDs starting with a prefix, in dockmasters file order."""
+    # Prefix trie over the map's zone IDs, built once per dataset load
+    trie = get_derived(
+        db, "zone_id_trie", (), lambda index: ZoneIdTrie.from_store(get_dockmaster_store(db), map), map_id=map
+    )
+    matches = trie.complete(prefix, limit)
+    return {"prefix": prefix, "count": len(matches), "matches": matches}
 
 @router.post("/refresh")
 async def refresh_dockmasters_from_github(db: Session = Depends(get_db)):
@@ -88,68 +104,25 @@ async def refresh_dockmasters_from_github(db: Session = Depends(get_db)):
         if response.status_code != 200:
             raise HTTPException(status_code=500, detail=f"Failed to fetch file from GitHub: {response.status_code}")
         
-        # Parse the file content
+        # Parse the file content, normalizing zone IDs in one pass
         content = response.text
-        lines = content.strip().split('\n')
+        rows, normalized_ids = parse_dockmaster_file(content)
         
         # Clear existing dockmasters
         db.query(DockmasterDB).delete()
         
-        # Process each line using the same logic as github.py
-        for line_num, line in enumerate(lines, 1):
-            original_line = line
-            line = line.strip()
-            
-            # Skip empty lines and comments
-            if not line or line.startswith('#'):
-                continue
-                
-            # Remove leading + if present (GitHub diff format)
-            if line.startswith('+'):
-                line = line[1:].strip()
-            
-            # Skip if still empty after cleaning
-            if not line:
-                continue
-                
-            # Split by tabs first, then by multiple spaces as fallback
-            if '\t' in line:
-                parts = [part.strip() for part in line.split('\t')]
-            else:
-                # Split by whitespace and filter empty parts
-                parts = [part for part in line.split() if part]
-            
-            # Filter out empty parts
-            parts = [part for part in parts if part]
-            
-            if len(parts) >= 5:
-                try:
-                    # Validate coordinates are numeric
-                    zone_id = parts[0]
-                    x_coord = int(parts[1])
-                    y_coord = int(parts[2])
-                    map_id = int(parts[3])
-                    enabled = parts[4].lower() in ['true', '1', 'yes', 'enabled']
-                    
-                    # Create dockmaster entry
-                    dockmaster = DockmasterDB(
-                        zone_id=zone_id,
-                        x=x_coord,
-                        y=y_coord,
-                        map=map_id,
-                        enabled=enabled,
-                        added_by="github_refresh",
-                        is_reference_point=(y_coord == 6142),  # Mark reference points
-                        is_active=True
-                    )
-                    db.add(dockmaster)
-                except (ValueError, IndexError) as e:
-                    print(f"Line {line_num}: '{original_line}' -> '{line}' - {str(e)}")
-            elif len(parts) > 0:  # Non-empty line but insufficient parts
-                print(f"Line {line_num}: '{original_line}' -> '{line}' - Expected 5 parts, got {len(parts)}: {parts}")
+        for row in rows:
+            dockmaster = DockmasterDB(
+                **row,
+                added_by="github_refresh",
+                is_reference_point=(row["y"] == 6142),  # Mark reference points
+                is_active=True
+            )
+            db.add(dockmaster)
         
         # Commit changes
         db.commit()
+        dataset_changed()
         
         # Get updated count
         total_count = db.query(DockmasterDB).count()
@@ -162,7 +135,8 @@ async def refresh_dockmasters_from_github(db: Session = Depends(get_db)):
         return {
             "message": "Dockmasters refreshed successfully from GitHub",
             "total_dockmasters": total_count,
-            "active_visible_dockmasters": active_count
+            "active_visible_dockmasters": active_count,
+            "normalized_ids": normalized_ids
         }
         
     except Exception as e:
@@ -173,47 +147,288 @@ async def refresh_dockmasters_from_github(db: Session = Depends(get_db)):
 async def match_dockmaster(
     x: int = Query(..., description="X coordinate to match"),
     y: int = Query(..., description="Y coordinate to match"),
+    map: int = Query(7, description="Map ID (defaults to 7)"),
     confidence_threshold: float = Query(0.8, description="Minimum confidence threshold"),
     db: Session = Depends(get_db)
 ):
     """Find the nearest dockmaster to given coordinates."""
-    # Load actual dockmasters from database
-    db_dockmasters = db.query(DockmasterDB).filter(DockmasterDB.enabled == True).all()
-    
-    entries = [
-        DockmasterEntry(
-            zone_id=dm.zone_id,
-            x=dm.x,
-            y=dm.y,
-            map=dm.map,
-            enabled=dm.enabled,
-            is_reference_point="6142" in str(dm.x) or "6142" in str(dm.y)
-        )
-        for dm in db_dockmasters
-    ]
+    # Repeated lookups are answered from the cache without touching the DB
+    cache_key = (x, y, map, confidence_threshold, get_dataset_version())
+    found, result = match_cache.get(cache_key)
 
-    # Find nearest match
-    nearest, confidence = find_nearest_dockmaster(x, y, entries)
-    
-    if not nearest:
+    if not found:
+        # Spatial index over this map's enabled dockmasters, built once per dataset load
+        index = get_dockmaster_index(db, map)
+
+        # Find nearest match
+        nearest, confidence = index.find_nearest(x, y)
+        result = None
+        if nearest:
+            result = {
+                "match": nearest,
+                "confidence": confidence,
+                "needs_verification": should_prompt_for_verification(confidence, confidence_threshold)
+            }
+        match_cache.put(cache_key, result)
+
+    if not result:
         raise HTTPException(status_code=404, detail="No valid dockmaster found")
 
-    needs_verification = should_prompt_for_verification(confidence, confidence_threshold)
-    
+    return result
+
+@router.get("/match/cache-stats", response_model=dict)
+async def get_match_cache_stats():
+    """Hit/miss/eviction counters for the /match result cache."""
+    return {"dataset_version": get_dataset_version(), **match_cache.stats()}
+
+@router.post("/match/batch", response_model=dict)
+def match_dockmasters_batch(request: BatchMatchRequest, db: Session = Depends(get_db)):
+    """Find the nearest dockmaster for many coordinates in one request."""
+    # Plain def: matching up to MAX_BATCH_POINTS runs in the threadpool, not on the event loop
+    if len(request.points) > MAX_BATCH_POINTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_POINTS} points per batch")
+
+    index = get_dockmaster_index(db, request.map)
+    xs = np.array([p.x for p in request.points], dtype=np.int64)
+    ys = np.array([p.y for p in request.points], dtype=np.int64)
+    matches, confidences = match_points(index, xs, ys)
+
+    results = []
+    for point, nearest, confidence in zip(request.points, matches, confidences.tolist()):
+        results.append({
+            "x": point.x,
+            "y": point.y,
+            "match": nearest,
+            "confidence": confidence,
+            "needs_verification": should_prompt_for_verification(confidence, request.confidence_threshold)
+        })
+
+    return {
+        "count": len(results),
+        "matched": sum(1 for nearest in matches if nearest is not None),
+        "results": results
+    }
+
+@router.post("/match/stream")
+async def match_dockmasters_stream(
+    file: UploadFile = File(..., description="CSV with x,y columns or NDJSON with x and y fields"),
+    map: int = Query(7, description="Map ID (defaults to 7)"),
+    confidence_threshold: float = Query(0.8, description="Minimum confidence threshold"),
+    format: Optional[str] = Query(None, description="csv or ndjson; detected from the file name if omitted"),
+    db: Session = Depends(get_db)
+):
+    """Match every coordinate in an uploaded file, streaming NDJSON results as they are computed."""
+    fmt = format or detect_format(file.filename, file.content_type)
+    if fmt not in STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Format must be one of {', '.join(STREAM_FORMATS)}")
+
+    index = get_dockmaster_index(db, map)
+    # The upload is spooled to disk, so reading it line by line keeps memory flat
+    lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", errors="replace", newline="")
+    return StreamingResponse(
+        stream_match_results(index, lines, fmt, confidence_threshold),
+        media_type="application/x-ndjson"
+    )
+
+@router.post("/match/jobs", response_model=dict, status_code=202)
+def create_match_job(
+    file: UploadFile = File(..., description="CSV with x,y columns or NDJSON with x and y fields"),
+    map: int = Query(7, description="Map ID (defaults to 7)"),
+    confidence_threshold: float = Query(0.8, description="Minimum confidence threshold"),
+    format: Optional[str] = Query(None, description="csv or ndjson; detected from the file name if omitted"),
+    db: Session = Depends(get_db)
+):
+    """
+    Queue a large match workload on the worker processes. Poll
+    /match/jobs/{job_id} and download /match/jobs/{job_id}/result when completed.
+    The upload is parsed by the job, so a file with too many points fails it.
+    """
+    # Plain def: copying a large upload runs in the threadpool, not on the event loop
+    fmt = format or detect_format(file.filename, file.content_type)
+    if fmt not in STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Format must be one of {', '.join(STREAM_FORMATS)}")
+
+    # The upload is closed with the request; the job reads its own copy
+    spooled = tempfile.TemporaryFile()
+    shutil.copyfileobj(file.file, spooled)
+    spooled.seek(0)
+    lines = io.TextIOWrapper(spooled, encoding="utf-8-sig", errors="replace", newline="")
+
+    version, store = get_versioned_dockmaster_store(db)
+    job = submit_match_job(store, version, map, lines, fmt, confidence_threshold)
+    return job.summary()
+
+@router.get("/match/jobs/{job_id}", response_model=dict)
+async def get_match_job_status(job_id: str):
+    """Status and progress of a match job."""
+    job = get_match_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Match job not found")
+    return job.summary()
+
+@router.get("/match/jobs/{job_id}/result")
+async def get_match_job_result(job_id: str):
+    """Completed job results as NDJSON, one result (or error) per input line."""
+    job = get_match_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Match job not found")
+    if job.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Match job is {job.status}")
+    return StreamingResponse(
+        job.result_lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="match-{job.job_id}.ndjson"'}
+    )
+
+@router.get("/raster", response_model=dict)
+async def get_answer_raster_info():
+    """Status and layout of the precomputed map 7 answer raster."""
+    raster = get_answer_raster()
+    if raster is None:
+        return {"status": "building", "dataset_version": get_dataset_version()}
+    return {"status": "ready", **raster.summary()}
+
+@router.get("/raster/download")
+async def download_answer_raster():
+    """
+    The answer raster as .npz: codes[row, col] indexes zone_ids (-1 no match,
+    -2 look up with /match), classes holds 0 none, 1 verify, 2 confident.
+    """
+    raster = get_answer_raster()
+    if raster is None:
+        raise HTTPException(status_code=503, detail="Answer raster is being built", headers={"Retry-After": "10"})
+    return Response(
+        content=raster.to_npz(),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="answer-raster-v{raster.version}.npz"'}
+    )
+
+@router.get("/raster/lookup", response_model=dict)
+async def lookup_answer_raster(
+    x: int = Query(..., description="X coordinate to match"),
+    y: int = Query(..., description="Y coordinate to match"),
+    db: Session = Depends(get_db)
+):
+    """Matched zone ID and confidence class from the raster, computed exactly where the raster can't tell."""
+    raster = get_answer_raster()
+    answer = raster.lookup(x, y) if raster is not None else None
+    if answer is not None:
+        zone_id, confidence_class = answer
+        return {"x": x, "y": y, "zone_id": zone_id, "confidence_class": confidence_class, "source": "raster"}
+
+    nearest, confidence = get_dockmaster_index(db).find_nearest(x, y)
+    if nearest is None:
+        confidence_class = CLASS_NONE
+    else:
+        confidence_class = CLASS_VERIFY if should_prompt_for_verification(confidence) else CLASS_CONFIDENT
     return {
-        "match": nearest,
-        "confidence": confidence,
-        "needs_verification": needs_verification
+        "x": x,
+        "y": y,
+        "zone_id": nearest.zone_id if nearest else None,
+        "confidence_class": confidence_class,
+        "source": "exact"
     }
 
+def rank_candidates(x: int, y: int, map_id: int, candidates) -> dict:
+    """Response for /nearest and /within: ranked candidates with the zone check for each."""
+    point = Point(x, y)
+    return {
+        "x": x,
+        "y": y,
+        "map": map_id,
+        "zone": get_zone_for_point(point, map_id),
+        "in_transition": is_transition_point(point, map_id=map_id),
+        "count": len(candidates),
+        "candidates": [
+            {
+                "rank": rank,
+                "match": entry,
+                "distance": distance,
+                "valid_for_zone": validate_dockmaster_match(point, entry.zone_id, map_id)
+            }
+            for rank, (entry, distance) in enumerate(candidates, 1)
+        ]
+    }
+
+@router.get("/nearest", response_model=dict)
+async def get_nearest_dockmasters(
+    x: int = Query(..., description="X coordinate"),
+    y: int = Query(..., description="Y coordinate"),
+    k: int = Query(5, ge=1, le=MAX_CANDIDATES, description="Number of candidates"),
+    map: int = Query(7, description="Map ID (defaults to 7)"),
+    db: Session = Depends(get_db)
+):
+    """The k nearest dockmasters of any zone, closest first."""
+    index = get_dockmaster_index(db, map)
+    return rank_candidates(x, y, map, index.nearest_candidates(x, y, k))
+
+@router.get("/within", response_model=dict)
+async def get_dockmasters_within(
+    x: int = Query(..., description="X coordinate"),
+    y: int = Query(..., description="Y coordinate"),
+    radius: float = Query(..., ge=0, description="Search radius"),
+    limit: int = Query(100, ge=1, le=MAX_CANDIDATES, description="Maximum candidates returned"),
+    map: int = Query(7, description="Map ID (defaults to 7)"),
+    db: Session = Depends(get_db)
+):
+    """Dockmasters of any zone within radius, closest first."""
+    index = get_dockmaster_index(db, map)
+    candidates = index.candidates_within(x, y, radius)
+    result = rank_candidates(x, y, map, candidates[:limit])
+    result["total_within"] = len(candidates)
+    return result
+
 @router.get("/transition-zones", response_model=List[List[DockmasterEntry]])
-async def get_transition_zones(distance_threshold: int = Query(100)):
+async def get_transition_zones(
+    distance_threshold: int = Query(100),
+    map: int = Query(7, description="Map ID (defaults to 7)"),
+    db: Session = Depends(get_db)
+):
     """Get all transition zones based on proximity."""
-    # In a real implementation, this would load from database or file
-    entries = [
-        DockmasterEntry(zone_id="1A-N", x=1000, y=1000, map=7),
-        DockmasterEntry(zone_id="1B-S", x=1100, y=1050, map=7),
-        DockmasterEntry(zone_id="XD-1", x=2000, y=2000, map=7)
-    ]
-
-    return find_transition_zones(entries, distance_threshold)
+    return get_derived(
+        db,
+        "transition_zones",
+        (distance_threshold,),
+        lambda index: find_transition_zones(index.entries, distance_threshold, map_id=index.map_id),
+        map_id=map
+    )
+
+@router.get("/route", response_model=dict)
+def plan_dockmaster_route(
+    zone_ids: Optional[str] = Query(None, description="Comma-separated dockmaster zone IDs to visit"),
+    zone: Optional[str] = Query(None, description="Visit every dockmaster in this map zone instead (e.g. SOUTH)"),
+    start_x: Optional[int] = Query(None, description="X coordinate to start from"),
+    start_y: Optional[int] = Query(None, description="Y coordinate to start from"),
+    map: int = Query(7, description="Map ID (defaults to 7)"),
+    db: Session = Depends(get_db)
+):
+    """Short visiting order for a set of dockmasters, from the precomputed distance graph."""
+    # Plain def: building the graph after a refresh and 2-opt run in the threadpool, not on the event loop
+    if (zone_ids is None) == (zone is None):
+        raise HTTPException(status_code=400, detail="Give either zone_ids or zone")
+    if (start_x is None) != (start_y is None):
+        raise HTTPException(status_code=400, detail="Give both start_x and start_y, or neither")
+
+    # Pairwise distances over the map's active dockmasters, computed once per dataset load
+    graph = get_derived(
+        db, "distance_graph", (), lambda index: DistanceGraph(get_dockmaster_store(db), map), map_id=map
+    )
+    if zone is not None:
+        if zone not in get_zone_layout(map).zones:
+            raise HTTPException(status_code=404, detail=f"Unknown zone: {zone}")
+        nodes = graph.nodes_in_zone(zone)
+    else:
+        # Same standardized form as the stored IDs, so "1a-s" or "XD-1" are found
+        nodes, missing = graph.nodes_for_zone_ids(
+            [format_dockmaster_id(z.strip()) for z in zone_ids.split(",") if z.strip()]
+        )
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Unknown dockmasters: {', '.join(missing)}")
+
+    if len(nodes) > MAX_ROUTE_STOPS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_ROUTE_STOPS} stops per route")
+
+    start = (start_x, start_y) if start_x is not None else None
+    result = plan_route(graph, nodes, start)
+    result["zone"] = zone
+    return result
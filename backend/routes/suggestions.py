@@ -1,11 +1,15 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from sqlalchemy.orm import Session
+import json
 import uuid
-from typing import List, Dict
+from typing import List, Dict, Literal, Optional
 from datetime import datetime
 from models import SuggestionCreate, Suggestion, DockmasterEntry
 from database import get_db, SuggestionDB
 from utils.matcher import find_nearest_dockmaster
+from utils.suggestion_checks import find_review_flags
+from utils.suggestion_annotations import annotate_suggestion
+from utils.dockmaster_cache import get_dockmaster_index
 
 router = APIRouter()
 
@@ -30,7 +34,12 @@ def db_suggestion_to_pydantic(db_suggestion: SuggestionDB) -> Suggestion:
         pr_url=db_suggestion.pr_url,
         pr_number=db_suggestion.pr_number,
         pr_error=db_suggestion.pr_error,
-        pr_retry_count=db_suggestion.pr_retry_count or 0
+        pr_retry_count=db_suggestion.pr_retry_count or 0,
+        review_flags=json.loads(db_suggestion.review_flags) if db_suggestion.review_flags else [],
+        nearest_zone_id=db_suggestion.nearest_zone_id,
+        nearest_distance=db_suggestion.nearest_distance,
+        detected_zone=db_suggestion.detected_zone,
+        match_confidence=db_suggestion.match_confidence
     )
 
 @router.post("/", response_model=Suggestion)
@@ -50,6 +59,11 @@ async def create_suggestion(suggestion_data: SuggestionCreate, db: Session = Dep
     from utils.matcher import format_dockmaster_id
     suggestion_data.zone_id = format_dockmaster_id(suggestion_data.zone_id)
     
+    # Flag likely duplicates for the reviewer; the suggestion is still accepted
+    review_flags = find_review_flags(
+        db, suggestion_data.action, suggestion_data.zone_id, suggestion_data.x, suggestion_data.y
+    )
+    
     # Create suggestion in database
     db_suggestion = SuggestionDB(
         id=str(uuid.uuid4()),
@@ -63,24 +77,55 @@ async def create_suggestion(suggestion_data: SuggestionCreate, db: Session = Dep
         submitter_name=suggestion_data.submitter_name,
         submitter_discord=suggestion_data.submitter_discord,
         status="pending",
-        created_at=datetime.utcnow()
+        created_at=datetime.utcnow(),
+        review_flags=json.dumps(review_flags) if review_flags else None
     )
     
+    # Stored so the admin list can sort and filter without running the matcher
+    annotate_suggestion(db_suggestion, get_dockmaster_index(db, db_suggestion.map))
+    
     db.add(db_suggestion)
     db.commit()
     db.refresh(db_suggestion)
     
     return db_suggestion_to_pydantic(db_suggestion)
 
+# Sort keys accepted by GET /api/suggestions/
+SUGGESTION_SORT_COLUMNS = {
+    "created_at": SuggestionDB.created_at,
+    "confidence": SuggestionDB.match_confidence,
+    "distance": SuggestionDB.nearest_distance
+}
+
 @router.get("/", response_model=List[Suggestion])
-async def get_suggestions(status: str = None, db: Session = Depends(get_db)):
-    """Get all suggestions, optionally filtered by status"""
+async def get_suggestions(
+    status: str = None,
+    sort: Literal["created_at", "confidence", "distance"] = Query("created_at", description="Sort key"),
+    order: Literal["asc", "desc"] = Query("desc", description="Sort order"),
+    min_confidence: Optional[float] = Query(None, description="Only suggestions matched at least this confidently"),
+    max_confidence: Optional[float] = Query(None, description="Only suggestions matched at most this confidently"),
+    zone: Optional[str] = Query(None, description="Only suggestions whose coordinates fall in this zone"),
+    db: Session = Depends(get_db)
+):
+    """Get all suggestions, optionally filtered by status and match annotations"""
     query = db.query(SuggestionDB)
     
     if status:
         query = query.filter(SuggestionDB.status == status)
-    
-    suggestions = query.order_by(SuggestionDB.created_at.desc()).all()
+    if min_confidence is not None:
+        query = query.filter(SuggestionDB.match_confidence >= min_confidence)
+    if max_confidence is not None:
+        query = query.filter(SuggestionDB.match_confidence <= max_confidence)
+    if zone:
+        query = query.filter(SuggestionDB.detected_zone == zone)
+    
+    # Suggestions without annotations (removals) go last either way
+    column = SUGGESTION_SORT_COLUMNS[sort]
+    suggestions = query.order_by(
+        column.is_(None),
+        column.asc() if order == "asc" else column.desc(),
+        SuggestionDB.created_at.desc()
+    ).all()
     
     return [db_suggestion_to_pydantic(s) for s in suggestions]
 
@@ -168,6 +213,14 @@ async def update_suggestion(suggestion_id: str, suggestion_data: SuggestionCreat
     if suggestion_data.submitter_discord:
         db_suggestion.submitter_discord = suggestion_data.submitter_discord
     
+    # The old flags were for the old coordinates and zone ID
+    review_flags = find_review_flags(
+        db, db_suggestion.action, db_suggestion.zone_id, db_suggestion.x, db_suggestion.y,
+        db_suggestion.map or 7, exclude_id=db_suggestion.id
+    )
+    db_suggestion.review_flags = json.dumps(review_flags) if review_flags else None
+    annotate_suggestion(db_suggestion, get_dockmaster_index(db, db_suggestion.map or 7))
+    
     db.commit()
     db.refresh(db_suggestion)
     
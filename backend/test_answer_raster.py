@@ -0,0 +1,47 @@
+"""
+Answer raster build scheduling tests. The raster's answers themselves are
+checked against the index in test_matcher.py.
+"""
+
+import time
+from utils import answer_raster, dockmaster_cache
+from utils.answer_raster import schedule_answer_raster_build
+
+def wait_for_build():
+    deadline = time.time() + 10
+    while answer_raster._building is not None and time.time() < deadline:
+        time.sleep(0.01)
+
+def test_failed_build_waits_before_retrying(monkeypatch):
+    builds = []
+
+    def failing_build(index, version=None):
+        builds.append(version)
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(answer_raster, "build_answer_raster", failing_build)
+    monkeypatch.setattr(dockmaster_cache, "get_dockmaster_index", lambda db, map_id: None)
+    monkeypatch.setattr(answer_raster, "_raster", None)
+    monkeypatch.setattr(answer_raster, "_failed", None)
+    version = dockmaster_cache.invalidate_dockmaster_cache()
+
+    schedule_answer_raster_build()
+    wait_for_build()
+    assert builds == [version]
+
+    # Every later lookup used to start another build
+    for _ in range(5):
+        assert answer_raster.get_answer_raster() is None
+    wait_for_build()
+    assert builds == [version]
+
+    # Retried once the wait is over, or right away for a new dataset version
+    monkeypatch.setattr(answer_raster, "_failed", (version, time.time() - 1))
+    schedule_answer_raster_build()
+    wait_for_build()
+    assert builds == [version, version]
+
+    new_version = dockmaster_cache.invalidate_dockmaster_cache()
+    schedule_answer_raster_build()
+    wait_for_build()
+    assert builds == [version, version, new_version]
@@ -0,0 +1,26 @@
+"""
+Coverage map tests: cell distances must equal the index's nearest match.
+"""
+
+import numpy as np
+import pytest
+from benchmark_matcher import generate_dockmasters
+from utils.coverage import CoverageMap
+from utils.spatial_index import DockmasterIndex
+
+def test_coverage_matches_index():
+    entries = generate_dockmasters(300, seed=26)
+    index = DockmasterIndex(entries)
+    coverage = CoverageMap(index, 64)
+    summary = coverage.summary(300, 3)
+
+    for x, y, distance in zip(coverage.cx.tolist(), coverage.cy.tolist(), coverage.distances.tolist()):
+        nearest, _ = index.find_nearest(x, y)
+        if nearest is None:
+            assert np.isnan(distance) or np.isinf(distance)
+        else:
+            assert distance == pytest.approx(((nearest.x - x) ** 2 + (nearest.y - y) ** 2) ** 0.5)
+
+    for zone in summary["zones"].values():
+        assert zone["worst"][0]["distance"] == zone["max_distance"]
+        assert [area["distance"] for area in zone["worst"]] == sorted((area["distance"] for area in zone["worst"]), reverse=True)
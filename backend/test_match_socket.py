@@ -0,0 +1,105 @@
+"""
+Binary match socket tests: answers must equal the index's, in request order,
+malformed frames must still be answered, and a refresh must not stall it.
+"""
+
+import asyncio
+import os
+import socket
+import threading
+import time
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+import database
+from benchmark_matcher import generate_dockmasters, generate_points
+from database import Base, DockmasterDB
+from utils import dockmaster_cache, match_socket
+from utils.matcher import should_prompt_for_verification
+from utils.match_socket import (
+    REQUEST, STATUS_BAD_REQUEST, MatchSocketClient, answer_request, decode_response, start_match_socket, stop_match_socket
+)
+from utils.spatial_index import DockmasterIndex
+
+def test_match_socket_matches_index(tmp_path):
+    entries = generate_dockmasters(300, seed=23)
+    index = DockmasterIndex(entries)
+    xs, ys = generate_points(2000, seed=24)
+    path = str(tmp_path / "match.sock")
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    server = asyncio.run_coroutine_threadsafe(start_match_socket(path, lambda map_id: index), loop).result()
+    try:
+        client = MatchSocketClient(path)
+        results = client.match_many(zip(xs.tolist(), ys.tolist()))
+        client.close()
+    finally:
+        asyncio.run_coroutine_threadsafe(stop_match_socket(server), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+
+    expected = [index.find_nearest(x, y) for x, y in zip(xs.tolist(), ys.tolist())]
+    assert [r["request_id"] for r in results] == list(range(1, len(xs) + 1))
+    assert [r["zone_id"] for r in results] == [m.zone_id if m else None for m, _ in expected]
+    assert [r["confidence"] for r in results if r["zone_id"]] == [c for m, c in expected if m]
+    assert [r["needs_verification"] for r in results if r["zone_id"]] == [
+        should_prompt_for_verification(c, 0.8) for m, c in expected if m
+    ]
+    assert not os.path.exists(path)
+
+@pytest.mark.parametrize("payload, request_id", [
+    (b"", 0),
+    (b"\x07\x00", 0),
+    ((42).to_bytes(4, "little"), 42),
+    (REQUEST.pack(43, 7, 1500, 3600, 0.8) + b"\x00", 43)
+])
+def test_match_socket_bad_request_echoes_request_id(payload, request_id):
+    response = decode_response(answer_request(payload, lambda map_id: DockmasterIndex([]))[4:])
+    assert (response["request_id"], response["status"]) == (request_id, STATUS_BAD_REQUEST)
+
+def test_default_index_serves_previous_version_until_rebuilt(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(database, "SessionLocal", session_factory)
+    monkeypatch.setattr(dockmaster_cache, "SessionLocal", session_factory)
+    db = session_factory()
+    db.add(DockmasterDB(zone_id="1A-S", x=1500, y=3600, map=7, added_by="test"))
+    db.commit()
+
+    try:
+        dockmaster_cache.invalidate_dockmaster_cache()
+        match_socket._build_default_indexes()
+        old = match_socket._default_index(7)
+        assert old.find_nearest(1510, 3600)[0].zone_id == "1A-S"
+
+        db.add(DockmasterDB(zone_id="2A-S", x=1510, y=3600, map=7, added_by="test"))
+        db.commit()
+        dockmaster_cache.invalidate_dockmaster_cache()
+        # The old index answers while the new one is built in the background
+        assert match_socket._default_index(7) is old
+        deadline = time.time() + 10
+        while dockmaster_cache.get_latest_dockmaster_index(7)[0] is old and time.time() < deadline:
+            time.sleep(0.01)
+        assert match_socket._default_index(7).find_nearest(1510, 3600)[0].zone_id == "2A-S"
+    finally:
+        db.close()
+        dockmaster_cache.invalidate_dockmaster_cache()
+
+def test_match_socket_path_in_use(tmp_path):
+    path = str(tmp_path / "match.sock")
+    index = DockmasterIndex([])
+
+    async def run():
+        # A file left behind by a dead server is replaced
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(path)
+        stale.close()
+        server = await start_match_socket(path, lambda map_id: index)
+        try:
+            with pytest.raises(OSError, match="already being served"):
+                await start_match_socket(path, lambda map_id: index)
+        finally:
+            await stop_match_socket(server)
+
+    asyncio.run(run())
@@ -0,0 +1,332 @@
+"""
+Differential tests: every accelerated matcher engine must give exactly the
+brute-force answers. Run with: python -m pytest test_matcher.py
+"""
+
+import json
+import time
+import numpy as np
+import pytest
+from benchmark_matcher import (
+    check_engines,
+    generate_dockmasters,
+    generate_points,
+    reference_find_transition_zones,
+    reference_is_transition_point,
+    reference_zone_for_point
+)
+from models import DockmasterEntry
+from utils import zone_validator
+from utils.zone_validator import (
+    Point, ComplexZone, get_zone_for_point, is_transition_point, parse_zone_layouts, set_zone_layout
+)
+from utils.matcher import find_nearest_dockmaster, find_transition_zones
+from utils.spatial_index import DockmasterIndex
+from utils.batch_matcher import match_points
+from utils.stream_matcher import stream_match_results
+from utils import match_jobs
+from utils.match_jobs import shutdown_match_jobs, submit_match_job
+from utils.voronoi_impact import ImpactAnalyzer
+from utils.log_matcher import parse_log_bytes
+from match_logs import match_log
+from utils.dockmaster_store import FLAG_ENABLED, FLAG_REFERENCE, DockmasterStore
+from utils.matcher import is_reference_point, should_prompt_for_verification
+from utils.answer_raster import CLASS_CONFIDENT, CLASS_NONE, CLASS_VERIFY, build_answer_raster
+
+POLYGON_MAP = 9
+
+@pytest.fixture
+def polygon_layout(monkeypatch):
+    """Map 9 with overlapping rectangle and polygon zones, restored after the test."""
+    monkeypatch.setattr(zone_validator, "ZONE_LAYOUTS", zone_validator.ZONE_LAYOUTS)
+    triangle = ComplexZone("TRI", "XD")
+    triangle.add_polygon([(100, 100), (900, 250), (300, 800)])
+    box = ComplexZone("BOX", "E")
+    box.add_region(min_x=200, max_x=600, min_y=200, max_y=600)
+    box.add_polygon([(1000, 0), (1500, 0), (1500, 500), (1250, 200), (1000, 500)])
+    set_zone_layout(POLYGON_MAP, {"TRI": triangle, "BOX": box}, ["TRI", "BOX"])
+    return POLYGON_MAP
+
+def edge_points(map_id=None):
+    """Coordinates on and one unit either side of every region edge and vertex."""
+    points = []
+    for zone in zone_validator.get_zone_layout(map_id).zones.values():
+        for r in zone.regions:
+            for x in (r.min_x, r.max_x):
+                for y in (r.min_y, r.max_y, (r.min_y + r.max_y) // 2):
+                    points += [(x + dx, y + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+        for polygon in zone.polygons:
+            for x, y in polygon.vertices:
+                points += [(x + dx, y + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+    return np.array([p[0] for p in points]), np.array([p[1] for p in points])
+
+def test_zone_lookup_matches_reference():
+    xs, ys = generate_points(5000, seed=1)
+    edge_xs, edge_ys = edge_points()
+    for x, y in zip(np.concatenate([xs, edge_xs]).tolist(), np.concatenate([ys, edge_ys]).tolist()):
+        assert get_zone_for_point(Point(x, y)) == reference_zone_for_point(Point(x, y))
+
+@pytest.mark.parametrize("threshold", [0, 50, 200])
+def test_transition_bands_match_reference(threshold):
+    xs, ys = generate_points(3000, seed=2)
+    for x, y in zip(xs.tolist(), ys.tolist()):
+        assert is_transition_point(Point(x, y), threshold) == reference_is_transition_point(Point(x, y), threshold)
+
+def test_float_coordinates_match_reference():
+    rng = np.random.default_rng(3)
+    for x, y in zip(rng.uniform(-300, 5300, 2000).tolist(), rng.uniform(-300, 4300, 2000).tolist()):
+        assert get_zone_for_point(Point(x, y)) == reference_zone_for_point(Point(x, y))
+        assert is_transition_point(Point(x, y)) == reference_is_transition_point(Point(x, y))
+
+@pytest.mark.parametrize("size", [1, 2, 50, 500])
+def test_engines_match_brute_force(size):
+    entries = generate_dockmasters(size, seed=size)
+    xs, ys = generate_points(800, seed=size + 1)
+    assert check_engines(entries, xs, ys) == []
+
+def test_engines_match_brute_force_on_edges():
+    entries = generate_dockmasters(300, seed=4)
+    xs, ys = edge_points()
+    assert check_engines(entries, xs, ys) == []
+
+def test_engines_match_brute_force_with_ties():
+    # Equidistant dockmasters must resolve to the same entry as the brute-force sort
+    entries = [
+        DockmasterEntry(zone_id=zone_id, x=x, y=y, map=7, enabled=True)
+        for zone_id, x, y in [
+            ("1A-W", 500, 1500), ("2A-W", 700, 1500), ("3A-W", 600, 1400), ("4A-W", 600, 1600),
+            ("XD1", 3500, 2500), ("XD2", 3700, 2500), ("1A-S", 1000, 2700), ("2A-S", 1000, 2900),
+            # Two dockmasters on the same spot, queried exactly there
+            ("5A-S", 1500, 3600), ("5B-S", 1500, 3600)
+        ]
+    ]
+    xs = np.array([600, 600, 3600, 1000, 1000, 1200, 1500])
+    ys = np.array([1500, 1450, 2500, 2800, 2700, 2800, 3600])
+    assert check_engines(entries, xs, ys) == []
+
+def test_engines_match_brute_force_with_polygons(polygon_layout):
+    entries = generate_dockmasters(200, seed=5, map_id=polygon_layout)
+    xs, ys = generate_points(1500, seed=6, map_id=polygon_layout)
+    edge_xs, edge_ys = edge_points(polygon_layout)
+    assert check_engines(entries, np.concatenate([xs, edge_xs]), np.concatenate([ys, edge_ys]), polygon_layout) == []
+
+def test_find_transition_zones_matches_reference():
+    entries = generate_dockmasters(300, seed=7)
+    for threshold in (0, 100, 250):
+        expected = reference_find_transition_zones(entries, threshold)
+        found = find_transition_zones(entries, threshold)
+        assert [[e.zone_id for e in zone] for zone in found] == [[e.zone_id for e in zone] for zone in expected]
+
+def test_index_does_not_tag_shared_entries():
+    entries = generate_dockmasters(200, seed=8)
+    index = DockmasterIndex(entries)
+    xs, ys = generate_points(300, seed=9)
+    for x, y in zip(xs.tolist(), ys.tolist()):
+        index.find_nearest(x, y)
+    assert all(entry.transition_zone is None for entry in entries)
+
+def test_brute_force_ignores_reference_points():
+    entries = [
+        DockmasterEntry(zone_id="1A-W", x=500, y=1500, map=7, enabled=True),
+        DockmasterEntry(zone_id="2A-W", x=500, y=6142, map=7, enabled=True)
+    ]
+    nearest, confidence = find_nearest_dockmaster(500, 1500, entries)
+    assert nearest.zone_id == "1A-W"
+    assert DockmasterIndex(entries).find_nearest(500, 1500) == (nearest, confidence)
+
+@pytest.mark.parametrize("config, message", [
+    ({"maps": {}}, "non-empty 'maps'"),
+    ({"maps": {"7": {"zones": {"A": {"direction": "Q", "regions": [{"min_x": 0, "max_x": 1, "min_y": 0, "max_y": 1}]}}}}}, "direction"),
+    ({"maps": {"7": {"zones": {"A": {"direction": "S", "regions": [{"min_x": 0, "max_x": 3500, "min_y": 4000, "max_y": 3400}]}}}}}, "inverted"),
+    ({"maps": {"7": {"zones": {"A": {"direction": "S", "regions": [{"polygon": [[0, 0], [1, 1]]}]}}}}}, "at least 3"),
+    ({"maps": {"7": {"zones": {"A": {"direction": "S", "regions": [{"polygon": [[0, 0], [1, 1], [2, 2]]}]}}}}}, "no area"),
+    ({"maps": {"7": {"priority": ["B"], "zones": {"A": {"direction": "S", "regions": [{"min_x": 0, "max_x": 1, "min_y": 0, "max_y": 1}]}}}}}, "priority"),
+    ({"maps": {"8": {"zones": {"A": {"direction": "S", "regions": [{"min_x": 0, "max_x": 1, "min_y": 0, "max_y": 1}]}}}}}, "default map")
+])
+def test_zone_config_validation(config, message):
+    with pytest.raises(ValueError, match=message):
+        parse_zone_layouts(config)
+
+def test_shipped_zone_config_has_no_inverted_regions():
+    for layout in zone_validator.load_zone_layouts().values():
+        for zone in layout.zones.values():
+            assert all(r.min_x <= r.max_x and r.min_y <= r.max_y for r in zone.regions)
+
+def test_neighbour_queries_match_brute_force():
+    entries = generate_dockmasters(400, seed=10)
+    # Duplicated coordinates must keep insertion order like a stable sort
+    entries += [entry.model_copy(update={"zone_id": f"{entry.zone_id}X"}) for entry in entries[:5]]
+    index = DockmasterIndex(entries)
+    pool = [entry for entry in entries if entry.y != 6142]
+    xs, ys = generate_points(200, seed=11)
+    for x, y in zip(xs.tolist(), ys.tolist()):
+        ranked = sorted(pool, key=lambda e: (e.x - x) ** 2 + (e.y - y) ** 2)
+        assert [e.zone_id for e, _ in index.nearest_candidates(x, y, 7)] == [e.zone_id for e in ranked[:7]]
+        for radius in (0, 150, 600.5):
+            within = [e for e in ranked if (e.x - x) ** 2 + (e.y - y) ** 2 <= radius * radius]
+            assert [e.zone_id for e, _ in index.candidates_within(x, y, radius)] == [e.zone_id for e in within]
+
+@pytest.mark.parametrize("fmt", ["csv", "ndjson"])
+def test_stream_matches_batch(fmt):
+    entries = generate_dockmasters(300, seed=12)
+    index = DockmasterIndex(entries)
+    xs, ys = generate_points(250, seed=13)
+    if fmt == "csv":
+        lines = ["y,x\n"] + [f"{y},{x}\n" for x, y in zip(xs.tolist(), ys.tolist())] + ["oops\n"]
+    else:
+        lines = [json.dumps({"x": x, "y": y}) + "\n" for x, y in zip(xs.tolist(), ys.tolist())] + ["{}\n"]
+
+    rows = [json.loads(line) for part in stream_match_results(index, lines, fmt, chunk_size=64) for line in part.splitlines()]
+    matches, confidences = match_points(index, xs, ys)
+    assert [row.get("match") for row in rows[:-1]] == [m.model_dump() if m else None for m in matches]
+    assert [row["confidence"] for row in rows[:-1]] == confidences.tolist()
+    assert "error" in rows[-1]
+
+def test_store_index_matches_entry_index():
+    entries = generate_dockmasters(400, seed=14)
+    entries[3] = entries[3].model_copy(update={"x": 61420, "is_reference_point": True})
+    entries[5] = entries[5].model_copy(update={"enabled": False})
+    store = DockmasterStore(
+        [e.zone_id for e in entries], [e.x for e in entries], [e.y for e in entries],
+        [e.map for e in entries], [e.enabled for e in entries]
+    )
+    assert [bool(flags & FLAG_REFERENCE) for flags in store.flags] == [is_reference_point(e) for e in entries]
+    assert [store.entry(row) for row in range(len(store))] == entries
+
+    enabled = [e for e in entries if e.enabled]
+    assert list(store.entries(store.rows(7, require=FLAG_ENABLED))) == enabled
+    xs, ys = generate_points(300, seed=15)
+    from_store, from_entries = DockmasterIndex.from_store(store), DockmasterIndex(enabled)
+    for x, y in zip(xs.tolist(), ys.tolist()):
+        assert from_store.find_nearest(x, y) == from_entries.find_nearest(x, y)
+
+@pytest.mark.parametrize("resolution", [1, 16, 64])
+def test_answer_raster_matches_index(resolution):
+    entries = generate_dockmasters(300, seed=16)
+    index = DockmasterIndex(entries)
+    raster = build_answer_raster(index, resolution)
+    assert raster.decided_share > 0
+    xs, ys = generate_points(3000, seed=17)
+    edge_xs, edge_ys = edge_points()
+    for x, y in zip(np.concatenate([xs, edge_xs]).tolist(), np.concatenate([ys, edge_ys]).tolist()):
+        answer = raster.lookup(x, y)
+        if answer is None:
+            continue
+        nearest, confidence = index.find_nearest(x, y)
+        if nearest is None:
+            expected = (None, CLASS_NONE)
+        else:
+            expected = (nearest.zone_id, CLASS_VERIFY if should_prompt_for_verification(confidence) else CLASS_CONFIDENT)
+        assert answer == expected, (x, y)
+
+def test_match_job_matches_stream(monkeypatch):
+    monkeypatch.setattr(match_jobs, "JOB_CHUNK_POINTS", 400)
+    entries = generate_dockmasters(300, seed=18)
+    store = DockmasterStore.from_entries(entries)
+    xs, ys = generate_points(2500, seed=19)
+    lines = ["x,y\n", "1,oops\n"] + [f"{x},{y}\n" for x, y in zip(xs.tolist(), ys.tolist())] + ["2\n"]
+
+    job = submit_match_job(store, -1, 7, lines, "csv")
+    try:
+        deadline = time.time() + 60
+        while job.finished_at is None and time.time() < deadline:
+            time.sleep(0.1)
+    finally:
+        shutdown_match_jobs()
+    assert job.status == "completed", job.error
+
+    expected = "".join(stream_match_results(DockmasterIndex.from_store(store), lines, "csv"))
+    assert "".join(job.result_lines(chunk_size=1000)) == expected
+
+def wait_for_job(job):
+    deadline = time.time() + 60
+    while job.finished_at is None and time.time() < deadline:
+        time.sleep(0.05)
+
+def test_match_job_caps_invalid_lines_and_points(monkeypatch):
+    monkeypatch.setattr(match_jobs, "MAX_JOB_ERROR_LINES", 2)
+    monkeypatch.setattr(match_jobs, "MAX_JOB_POINTS", 3)
+    store = DockmasterStore.from_entries(generate_dockmasters(50, seed=35))
+
+    job = submit_match_job(store, -1, 7, ["x,y\n", "a\n", "1,2\n", "b\n", "c\n", "3,4\n"], "csv")
+    wait_for_job(job)
+    assert job.status == "completed", job.error
+    assert job.summary()["invalid_lines"] == 3
+    assert [json.loads(line).get("error") is not None for line in "".join(job.result_lines()).splitlines()] == [True, False, True, False]
+
+    job = submit_match_job(store, -1, 7, ["x,y\n"] + [f"{n},{n}\n" for n in range(4)], "csv")
+    wait_for_job(job)
+    assert job.status == "failed" and "At most 3 points" in job.error
+
+@pytest.mark.parametrize("action, zone_id, x, y", [
+    ("add", "9Z-W", 1200, 1700),
+    ("add", "XD77", 4100, 2900),
+    ("add", "9Z-S", 200, 2600),
+    ("remove", None, None, None)
+])
+def test_impact_matches_rematching(action, zone_id, x, y):
+    entries = generate_dockmasters(200, seed=20)
+    index = DockmasterIndex(entries)
+    if action == "add":
+        impact = ImpactAnalyzer(index).analyze_add(zone_id, x, y)
+        after = entries + [DockmasterEntry(zone_id=zone_id, x=x, y=y, map=7, enabled=True)]
+    else:
+        zone_id = index.find_nearest(1200, 1700)[0].zone_id
+        impact = ImpactAnalyzer(index).analyze_remove(zone_id)
+        after = [e for e in entries if e.zone_id != zone_id]
+
+    # Re-match a sample grid: a point changes exactly when it lies in an affected region
+    gx, gy = np.meshgrid(np.arange(-50, 5100, 17), np.arange(-50, 4100, 17))
+    gx, gy = gx.ravel(), gy.ravel()
+    before_matches, _ = match_points(index, gx, gy)
+    after_matches, _ = match_points(DockmasterIndex(after), gx, gy)
+    changed = np.array([
+        (a.zone_id, a.x, a.y) != (b.zone_id, b.x, b.y) if a and b else a is not b
+        for a, b in zip(before_matches, after_matches)
+    ])
+
+    lookup = zone_validator.get_zone_lookup()
+    codes = lookup.zone_codes_for(gx, gy)
+    inside = np.zeros(len(gx), dtype=bool)
+    on_edge = np.zeros(len(gx), dtype=bool)
+    for region in impact["regions"]:
+        polygon = region["polygon"]
+        distance = np.full(len(gx), np.inf)
+        for (px, py), (qx, qy) in zip(polygon, polygon[1:] + polygon[:1]):
+            distance = np.minimum(distance, ((qx - px) * (gy - py) - (qy - py) * (gx - px)) / np.hypot(qx - px, qy - py))
+        inside |= (distance > 0) & np.isin(codes, [lookup.names.index(name) for name in region["zones"]])
+        on_edge |= np.abs(distance) < 0.05
+
+    assert changed.any()
+    assert not ((changed != inside) & ~on_edge).any()
+    shares = sum(d["area"] for d in impact["dockmasters"] if d["change"] in ("gains", "loses"))
+    assert shares == pytest.approx(impact["affected_area"], abs=1)
+    assert changed.sum() * 17 * 17 == pytest.approx(impact["affected_area"], rel=0.1)
+
+def test_parse_log_bytes():
+    log = b"x,y\n12,34\n-5, 7\n2024-05-01 at 1234.5 -678\nnothing\n99999999999999999999 1 2\n8,9"
+    buf = np.frombuffer(log, dtype=np.uint8)
+    assert [a.tolist() for a in parse_log_bytes(buf)] == [[1, 2, 3, 6], [12, -5, 2024, 8], [34, 7, 5, 9]]
+    assert [a.tolist() for a in parse_log_bytes(buf, (3, 4))] == [[3], [1234], [-678]]
+
+def test_match_log_matches_batch(tmp_path, monkeypatch):
+    monkeypatch.setattr("utils.log_matcher.LOG_CHUNK_BYTES", 4096)
+    entries = generate_dockmasters(300, seed=21)
+    xs, ys = generate_points(3000, seed=22)
+    log = tmp_path / "log.txt"
+    log.write_text("".join(
+        f"player {i} at {x},{y}\n" if i % 7 else "no coordinates here\n"
+        for i, (x, y) in enumerate(zip(xs.tolist(), ys.tolist()))
+    ))
+    output = tmp_path / "results.csv"
+    summary = match_log(str(log), DockmasterStore.from_entries(entries), fields=(1, 2), output=str(output), workers=2)
+
+    kept = [i for i in range(len(xs)) if i % 7]
+    matches, confidences = match_points(DockmasterIndex(entries), xs[kept], ys[kept])
+    rows = [line.split(",") for line in output.read_text().splitlines()[1:]]
+    assert [int(row[0]) for row in rows] == [i + 1 for i in kept]
+    assert [row[4] for row in rows] == [m.zone_id if m else "" for m in matches]
+    assert [float(row[5]) for row in rows] == confidences.tolist()
+    assert summary["lines"] == len(xs)
+    assert summary["points"] == len(kept)
+    assert summary["matched"] == sum(1 for m in matches if m)
@@ -0,0 +1,96 @@
+"""
+Zone ID normalization tests, including a differential check of the
+precompiled normalizer against the original regex chain.
+"""
+
+import random
+import re
+import pytest
+from utils.matcher import format_dockmaster_id, validate_dockmaster_id
+from utils.zone_ids import normalize_zone_id, normalize_zone_ids, sort_zone_id
+from utils.zone_id_trie import ZoneIdTrie, autocomplete_key
+
+def reference_format_dockmaster_id(zone_id: str) -> str:
+    """The regex chain format_dockmaster_id used before zone IDs were classified."""
+    zone_id = zone_id.strip().upper()
+    xd_match = re.match(r"XD-?\s*(\d+)", zone_id, re.IGNORECASE)
+    if xd_match:
+        return f"XD{xd_match.group(1)}"
+    regular_match = re.match(r"(\d+)([A-Z])?-?([NSEW])", zone_id)
+    if regular_match:
+        num, letter, direction = regular_match.groups()
+        return f"{num}{letter or ''}-{direction}"
+    return zone_id
+
+def reference_is_valid(zone_id: str) -> bool:
+    formatted_id = reference_format_dockmaster_id(zone_id)
+    return bool(re.match(r"XD\d{1,2}", formatted_id) or re.match(r"\d+[A-Z]?-[NSEW]", formatted_id))
+
+@pytest.mark.parametrize("zone_id, expected, kind", [
+    ("XD1", "XD1", "xd"),
+    ("xd-7", "XD7", "xd"),
+    (" XD 12 ", "XD12", "xd"),
+    ("1A-S", "1A-S", "regular"),
+    ("1as", "1A-S", "regular"),
+    ("12-e", "12-E", "regular"),
+    ("xp-3", "XP3", "xp"),
+    ("m 12", "M12", "grid"),
+    ("gh", "GH", "special"),
+    ("the  gym", "The Gym", "special"),
+    ("gg-shelter", "GG-Shelter", "special"),
+    ("hello", "HELLO", "unknown")
+])
+def test_normalize_zone_id(zone_id, expected, kind):
+    assert normalize_zone_id(zone_id) == (expected, kind)
+
+def test_matches_reference_formatter():
+    # Anything the old formatter rewrote must be rewritten the same way; the
+    # only differences allowed are the newly recognised XP/M/named formats
+    rng = random.Random(1)
+    alphabet = "XDxd-12 3ANSEWswnPMGHTheym"
+    for _ in range(50000):
+        zone_id = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 7)))
+        expected = reference_format_dockmaster_id(zone_id)
+        normalized = normalize_zone_id(zone_id)
+        if normalized.kind in ("xp", "grid", "special"):
+            continue
+        assert format_dockmaster_id(zone_id) == expected, zone_id
+
+        try:
+            valid = validate_dockmaster_id(zone_id)
+        except ValueError:
+            valid = False
+        assert valid == reference_is_valid(zone_id), zone_id
+
+def test_validate_dockmaster_id_rejects_unknown_formats():
+    with pytest.raises(ValueError):
+        validate_dockmaster_id("hello")
+
+def test_normalize_zone_ids_reports_changes():
+    normalized, changed = normalize_zone_ids(["XD1", "xd-2", "1as", "1A-S"])
+    assert normalized == ["XD1", "XD2", "1A-S", "1A-S"]
+    assert changed == {"xd-2": "XD2", "1as": "1A-S"}
+
+def test_sort_zone_id_order():
+    zone_ids = ["M3", "XD10", "GH", "10A-N", "XD2", "The Gym", "1A-W", "XP1", "1A-E", "2B-S"]
+    assert sorted(zone_ids, key=sort_zone_id) == ["XD2", "XD10", "XP1", "1A-E", "1A-W", "2B-S", "10A-N", "GH", "The Gym", "M3"]
+
+def test_autocomplete_matches_sorted_scan():
+    rng = random.Random(4)
+    zone_ids = {"GH", "The Gym", "GG-Shelter"}
+    for _ in range(3000):
+        kind = rng.random()
+        if kind < 0.2:
+            zone_ids.add(f"XD{rng.randint(1, 200)}")
+        elif kind < 0.3:
+            zone_ids.add(f"XP{rng.randint(1, 40)}")
+        elif kind < 0.4:
+            zone_ids.add(f"M{rng.randint(1, 99)}")
+        else:
+            zone_ids.add(f"{rng.randint(1, 40)}{rng.choice('ABC')}-{rng.choice('NSEW')}")
+    trie = ZoneIdTrie(zone_ids)
+    ordered = sorted(zone_ids, key=lambda zone_id: (sort_zone_id(zone_id), zone_id))
+
+    for prefix in ["", "x", "XD1", "xp-", "m", "1", "12a", "12A-s", "g", "the g", "9Z"]:
+        expected = [z for z in ordered if autocomplete_key(z).startswith(autocomplete_key(prefix))][:25]
+        assert [match["zone_id"] for match in trie.complete(prefix, 25)] == expected
@@ -0,0 +1,33 @@
+"""
+Route planner tests: every stop visited once, distances that add up, and
+2-opt never worse than the nearest-neighbour order.
+"""
+
+import numpy as np
+import pytest
+from benchmark_matcher import generate_dockmasters
+from utils import route_planner
+from utils.dockmaster_store import DockmasterStore
+from utils.route_planner import DistanceGraph, nearest_neighbour_order, plan_route
+
+def test_route_visits_every_stop_once(monkeypatch):
+    entries = generate_dockmasters(400, seed=25)
+    graph = DistanceGraph(DockmasterStore.from_entries(entries))
+    nodes = list(range(0, len(graph), 3))
+    route = plan_route(graph, nodes, start=(2500, 2500))
+
+    assert sorted(graph.zone_ids[n] for n in nodes) == sorted(stop["match"].zone_id for stop in route["stops"])
+    points = [(2500, 2500)] + [(stop["match"].x, stop["match"].y) for stop in route["stops"]]
+    legs = [((ax - bx) ** 2 + (ay - by) ** 2) ** 0.5 for (ax, ay), (bx, by) in zip(points, points[1:])]
+    assert route["total_distance"] == pytest.approx(sum(legs), abs=0.1)
+
+    # 2-opt only ever shortens the nearest-neighbour path
+    dist = np.zeros((len(nodes) + 1, len(nodes) + 1))
+    dist[1:, 1:] = graph.distances(nodes)
+    dist[0, 1:] = dist[1:, 0] = np.hypot(graph.xs[nodes] - 2500, graph.ys[nodes] - 2500)
+    greedy = nearest_neighbour_order(dist)
+    assert route["total_distance"] <= sum(dist[a, b] for a, b in zip(greedy, greedy[1:])) + 0.1
+
+    # Without the precomputed matrix the same route comes out
+    monkeypatch.setattr(route_planner, "MAX_GRAPH_DOCKMASTERS", 0)
+    assert plan_route(DistanceGraph(graph.store), nodes, start=(2500, 2500)) == route
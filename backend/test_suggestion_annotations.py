@@ -0,0 +1,33 @@
+"""
+Suggestion annotation tests: a suggestion skipped after a dataset change must
+have kept exactly the annotations a fresh run gives.
+"""
+
+from types import SimpleNamespace
+from benchmark_matcher import generate_dockmasters, generate_points
+from utils.dockmaster_store import DockmasterStore
+from utils.spatial_index import DockmasterIndex
+from utils.suggestion_annotations import annotate_suggestion, changed_points, needs_reannotation
+from utils.zone_validator import DEFAULT_MAP
+
+def test_reannotation_skips_only_unaffected_suggestions():
+    before = generate_dockmasters(200, seed=29)
+    after = before[5:] + generate_dockmasters(5, seed=30)
+    after[40] = after[40].model_copy(update={"x": after[40].x + 150})
+    old_store, new_store = DockmasterStore.from_entries(before), DockmasterStore.from_entries(after)
+    old_index, new_index = DockmasterIndex.from_store(old_store), DockmasterIndex.from_store(new_store)
+    changed = changed_points(old_store, new_store)
+
+    columns = ("nearest_zone_id", "nearest_distance", "detected_zone", "match_confidence", "match_radius")
+    xs, ys = generate_points(1000, seed=31)
+    skipped = 0
+    for x, y in zip(xs.tolist(), ys.tolist()):
+        suggestion = SimpleNamespace(action="add", x=x, y=y, map=DEFAULT_MAP)
+        annotate_suggestion(suggestion, old_index)
+        if needs_reannotation(suggestion, changed):
+            continue
+        skipped += 1
+        fresh = SimpleNamespace(action="add", x=x, y=y, map=DEFAULT_MAP)
+        annotate_suggestion(fresh, new_index)
+        assert [getattr(suggestion, c) for c in columns] == [getattr(fresh, c) for c in columns]
+    assert skipped > 500
@@ -0,0 +1,75 @@
+"""
+Review flag tests: possible duplicates found for a suggestion, against a
+throwaway SQLite database.
+"""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from database import Base, DockmasterDB, SuggestionDB
+from utils.dockmaster_cache import invalidate_dockmaster_cache
+from utils.suggestion_checks import DUPLICATE_DISTANCE, find_review_flags
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        DockmasterDB(zone_id="1A-S", x=1500, y=3600, map=7, added_by="test"),
+        DockmasterDB(zone_id="2B-S", x=2500, y=3600, map=7, added_by="test"),
+        DockmasterDB(zone_id="3A-S", x=1600, y=3600, map=7, added_by="test", is_active=False),
+        DockmasterDB(zone_id="7A-S", x=1000, y=3000, map=7, added_by="test", enabled=False),
+        DockmasterDB(zone_id="8A-S", x=1500, y=3600, map=8, added_by="test"),
+    ])
+    session.add_all([
+        SuggestionDB(id="add-1", action="add", zone_id="4A-S", x=2000, y=3000, map=7, reason="test"),
+        SuggestionDB(id="add-2", action="add", zone_id="5A-S", x=2010, y=3000, map=7, reason="test", status="rejected"),
+        SuggestionDB(id="remove-1", action="remove", zone_id="2B-S", map=7, reason="test"),
+    ])
+    session.commit()
+    # The dockmaster cache is process-wide; load it from this database
+    invalidate_dockmaster_cache()
+    yield session
+    session.close()
+    invalidate_dockmaster_cache()
+
+def test_add_near_dockmaster(db):
+    flags = find_review_flags(db, "add", "6A-S", 1510, 3600)
+    assert flags == [{"type": "near_dockmaster", "zone_id": "1A-S", "x": 1500, "y": 3600, "distance": 10.0}]
+
+def test_add_near_disabled_dockmaster(db):
+    flags = find_review_flags(db, "add", "6A-S", 1000, 3030)
+    assert flags == [{"type": "near_dockmaster", "zone_id": "7A-S", "x": 1000, "y": 3000, "distance": 30.0}]
+
+def test_add_near_pending_suggestion(db):
+    # Only pending adds count; the rejected one is just as close
+    flags = find_review_flags(db, "add", "6A-S", 2000, 3020)
+    assert flags == [{
+        "type": "near_pending_suggestion", "suggestion_id": "add-1",
+        "zone_id": "4A-S", "x": 2000, "y": 3000, "distance": 20.0
+    }]
+
+def test_add_not_within_duplicate_distance(db):
+    # The inactive 3A-S is within range of this one
+    assert find_review_flags(db, "add", "6A-S", 1500 + DUPLICATE_DISTANCE + 1, 3600) == []
+    assert find_review_flags(db, "add", "6A-S", 2000, 3000 - DUPLICATE_DISTANCE - 1) == []
+    # Another map, with nothing there
+    assert find_review_flags(db, "add", "6A-S", 1000, 3000, map_id=8) == []
+
+def test_remove_unknown_zone_id(db):
+    # Inactive dockmasters don't count as existing
+    assert find_review_flags(db, "remove", "3A-S", None, None) == [{"type": "unknown_zone_id", "zone_id": "3A-S"}]
+    assert find_review_flags(db, "remove", "1A-S", None, None) == []
+    # 8A-S only exists on another map
+    assert find_review_flags(db, "remove", "8A-S", None, None) == [{"type": "unknown_zone_id", "zone_id": "8A-S"}]
+    assert find_review_flags(db, "remove", "8A-S", None, None, map_id=8) == []
+
+def test_remove_duplicate_pending_removal(db):
+    flags = find_review_flags(db, "remove", "2B-S", None, None)
+    assert flags == [{"type": "duplicate_pending_removal", "suggestion_id": "remove-1", "zone_id": "2B-S"}]
+
+def test_edited_suggestion_ignores_itself(db):
+    assert find_review_flags(db, "add", "4A-S", 2000, 3000, exclude_id="add-1") == []
+    assert find_review_flags(db, "remove", "2B-S", None, None, exclude_id="remove-1") == []
@@ -0,0 +1,31 @@
+"""
+Viewport index tests: the list and every bounding-box query must equal a
+plain filter and sort over the dockmasters.
+"""
+
+import random
+from benchmark_matcher import generate_dockmasters
+from utils.dockmaster_store import DockmasterStore
+from utils.viewport_index import ViewportIndex
+from utils.zone_ids import list_sort_zone_id
+from utils.zone_validator import DEFAULT_MAP
+
+def test_viewport_matches_filtered_list():
+    entries = generate_dockmasters(600, seed=32) + generate_dockmasters(100, seed=33, map_id=DEFAULT_MAP + 1)
+    entries[10] = entries[10].model_copy(update={"zone_id": "M10"})
+    store = DockmasterStore.from_entries(entries)
+
+    for map_id in (None, DEFAULT_MAP):
+        viewport = ViewportIndex(store, map_id)
+        listed = sorted(
+            (e for e in entries if e.y != 6142 and not e.zone_id.startswith("M") and map_id in (None, e.map)),
+            key=lambda e: list_sort_zone_id(e.zone_id)
+        )
+        assert [(item["zone_id"], item["x"], item["y"], item["map"]) for item in viewport.items] == [(e.zone_id, e.x, e.y, e.map) for e in listed]
+
+        rng = random.Random(34)
+        for _ in range(200):
+            x0, x1 = sorted(rng.randint(-500, 5500) for _ in range(2))
+            y0, y1 = sorted(rng.randint(-500, 5500) for _ in range(2))
+            expected = [item for item in viewport.items if x0 <= item["x"] <= x1 and y0 <= item["y"] <= y1]
+            assert viewport.within(x0, y0, x1, y1) == expected
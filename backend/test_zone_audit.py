@@ -0,0 +1,26 @@
+"""
+Zone audit tests: the stored verdicts must agree with /match validation.
+"""
+
+import random
+import numpy as np
+from benchmark_matcher import generate_dockmasters
+from utils.zone_audit import audit_points
+from utils.zone_validator import DEFAULT_MAP, Point, get_zone_for_point, validate_dockmaster_match
+
+def test_audit_matches_validate_dockmaster_match():
+    entries = generate_dockmasters(500, seed=27)
+    # Shuffle IDs so plenty of dockmasters sit in the wrong zone
+    zone_ids = [e.zone_id for e in entries]
+    random.Random(28).shuffle(zone_ids)
+    xs = np.array([e.x for e in entries] + [-100], dtype=np.int64)
+    ys = np.array([e.y for e in entries] + [-100], dtype=np.int64)
+    zone_ids.append("1A-S")
+
+    results = audit_points(zone_ids, xs, ys, DEFAULT_MAP)
+    for zone_id, x, y, result in zip(zone_ids, xs.tolist(), ys.tolist(), results):
+        point = Point(x, y)
+        assert result["valid"] == validate_dockmaster_match(point, zone_id, DEFAULT_MAP)
+        assert result["zone"] == get_zone_for_point(point, DEFAULT_MAP)
+        assert (result["issue"] is None) == result["valid"]
+    assert results[-1]["issue"] == "outside_zones"
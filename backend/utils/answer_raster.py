@@ -0,0 +1,342 @@
+import io
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from .batch_matcher import nearest_two
+from .spatial_index import DockmasterIndex
+from .zone_validator import DEFAULT_MAP, ZoneLookup, get_zone_lookup
+
+# Side of a raster cell in map units
+ANSWER_RASTER_RESOLUTION = max(1, int(os.getenv("ANSWER_RASTER_RESOLUTION", "16")))
+
+# Cell codes besides an index into zone_ids
+NO_MATCH = -1
+UNDECIDED = -2  # answer varies inside the cell; compute it exactly
+
+# Confidence classes against the default /match threshold
+CLASS_NONE = 0
+CLASS_VERIFY = 1
+CLASS_CONFIDENT = 2
+
+# Seconds before a failed build of the same dataset version is tried again
+ANSWER_RASTER_RETRY_SECONDS = int(os.getenv("ANSWER_RASTER_RETRY_SECONDS", "60"))
+
+# Float slack kept between a decided cell and the confidence threshold
+CONFIDENCE_MARGIN = 1e-9
+
+# Transition states while classifying cells
+_OUT, _IN, _MIXED = 0, 1, 2
+
+class AnswerRaster:
+    """
+    Precomputed /match answers over a map's zone extent. Cell [row, col]
+    covers x in [origin_x + col * resolution, + resolution) and the same for
+    y. It holds the matched zone ID (index into zone_ids), NO_MATCH, or
+    UNDECIDED where the answer changes inside the cell, plus the confidence
+    class of the match.
+    """
+
+    def __init__(
+        self,
+        origin_x: int,
+        origin_y: int,
+        resolution: int,
+        codes: np.ndarray,
+        classes: np.ndarray,
+        zone_ids: List[str],
+        map_id: int,
+        version: int,
+        threshold: float
+    ):
+        self.origin_x = origin_x
+        self.origin_y = origin_y
+        self.resolution = resolution
+        self.codes = codes
+        self.classes = classes
+        self.zone_ids = zone_ids
+        self.map_id = map_id
+        self.version = version
+        self.threshold = threshold
+        self._npz: Optional[bytes] = None
+
+    @property
+    def decided_share(self) -> float:
+        return float((self.codes != UNDECIDED).mean()) if self.codes.size else 1.0
+
+    def lookup(self, x: int, y: int) -> Optional[Tuple[Optional[str], int]]:
+        """(zone_id or None, confidence class) for a point, or None if the cell is undecided."""
+        col = (x - self.origin_x) // self.resolution
+        row = (y - self.origin_y) // self.resolution
+        if not (0 <= row < self.codes.shape[0] and 0 <= col < self.codes.shape[1]):
+            # Outside every zone
+            return None, CLASS_NONE
+        code = int(self.codes[row, col])
+        if code == UNDECIDED:
+            return None
+        return (self.zone_ids[code] if code >= 0 else None), int(self.classes[row, col])
+
+    def summary(self) -> dict:
+        return {
+            "map": self.map_id,
+            "dataset_version": self.version,
+            "origin_x": self.origin_x,
+            "origin_y": self.origin_y,
+            "resolution": self.resolution,
+            "rows": int(self.codes.shape[0]),
+            "columns": int(self.codes.shape[1]),
+            "confidence_threshold": self.threshold,
+            "decided_share": self.decided_share
+        }
+
+    def to_npz(self) -> bytes:
+        """The raster as a compressed .npz, built once."""
+        if self._npz is None:
+            buffer = io.BytesIO()
+            np.savez_compressed(
+                buffer,
+                codes=self.codes,
+                classes=self.classes,
+                zone_ids=np.array(self.zone_ids, dtype=str),
+                origin=np.array([self.origin_x, self.origin_y], dtype=np.int64),
+                resolution=np.array(self.resolution),
+                map=np.array(self.map_id),
+                dataset_version=np.array(self.version),
+                confidence_threshold=np.array(self.threshold)
+            )
+            self._npz = buffer.getvalue()
+        return self._npz
+
+def _axis_states(band, start: int, count: int, resolution: int) -> np.ndarray:
+    """_IN/_OUT/_MIXED per cell for one axis of a transition band."""
+    inside = band.contains_many(np.arange(start, start + count * resolution, dtype=np.int64)).reshape(count, resolution)
+    return np.where(inside.all(axis=1), _IN, np.where(inside.any(axis=1), _MIXED, _OUT))
+
+def _polygon_distances(polygon, cx: np.ndarray, cy: np.ndarray) -> np.ndarray:
+    """Distance from each point to a polygon's boundary."""
+    distances = np.full(cx.shape, np.inf)
+    vertices = polygon.vertices
+    for i in range(len(vertices)):
+        (ax, ay), (bx, by) = vertices[i], vertices[(i + 1) % len(vertices)]
+        dx, dy = bx - ax, by - ay
+        length2 = dx * dx + dy * dy
+        t = np.zeros(cx.shape) if length2 == 0 else np.clip(((cx - ax) * dx + (cy - ay) * dy) / length2, 0.0, 1.0)
+        distances = np.minimum(distances, np.hypot(cx - (ax + t * dx), cy - (ay + t * dy)))
+    return distances
+
+def _rect_distance(px: np.ndarray, py: np.ndarray, x0, x1, y0, y1) -> np.ndarray:
+    """Distance from points to axis-aligned rectangles."""
+    dx = np.maximum(np.maximum(x0 - px, px - x1), 0.0)
+    dy = np.maximum(np.maximum(y0 - py, py - y1), 0.0)
+    return np.hypot(dx, dy)
+
+def zone_grid(lookup: ZoneLookup, resolution: int) -> Tuple[int, int, int, int]:
+    """(origin_x, origin_y, columns, rows) of a grid of resolution-sized cells over every zone region."""
+    # Points outside the extent of the regions are in no zone
+    xs_extent = list(lookup.x_slots.breakpoints) + [x for _, p in lookup.polygons for x, _ in p.vertices]
+    ys_extent = list(lookup.y_slots.breakpoints) + [y for _, p in lookup.polygons for _, y in p.vertices]
+    if not xs_extent:
+        return 0, 0, 0, 0
+    origin_x, origin_y = min(xs_extent), min(ys_extent)
+    return origin_x, origin_y, (max(xs_extent) - origin_x) // resolution + 1, (max(ys_extent) - origin_y) // resolution + 1
+
+def build_answer_raster(
+    index: DockmasterIndex,
+    resolution: int = ANSWER_RASTER_RESOLUTION,
+    threshold: float = 0.8,
+    version: int = 0,
+    transition_threshold: int = 200
+) -> AnswerRaster:
+    """
+    Rasterize index.find_nearest over the zone extent of the index's map.
+
+    A cell is decided when its zone and transition state are constant and
+    all four corners have the same strictly nearest candidate (Voronoi cells
+    are convex, so then every point does). Confidence only depends on the
+    nearest/second-nearest distance ratio, whose superlevel sets are convex,
+    so a cell whose corners are all confident is confident throughout. A
+    cell is never confident if it lies outside the Apollonius disk of the
+    nearest candidate against one of its competitors. Anything else is left
+    UNDECIDED for an exact lookup.
+    """
+    lookup = get_zone_lookup(index.map_id)
+    bands = lookup.transition_bands(transition_threshold)
+
+    origin_x, origin_y, columns, rows = zone_grid(lookup, resolution)
+
+    # First and last integer coordinate covered by each column / row
+    col_x0 = origin_x + np.arange(columns, dtype=np.int64) * resolution
+    col_x1 = col_x0 + resolution - 1
+    row_y0 = origin_y + np.arange(rows, dtype=np.int64) * resolution
+    row_y1 = row_y0 + resolution - 1
+    x0, y0 = np.meshgrid(col_x0, row_y0)
+    x1, y1 = x0 + resolution - 1, y0 + resolution - 1
+
+    # Zone and overlap are constant if no region edge falls inside the cell
+    uniform = (
+        (lookup.x_slots.slots(col_x0) == lookup.x_slots.slots(col_x1))[None, :] &
+        (lookup.y_slots.slots(row_y0) == lookup.y_slots.slots(row_y1))[:, None]
+    )
+    cx, cy = (x0 + x1) / 2.0, (y0 + y1) / 2.0
+    half_diagonal = (resolution - 1) * math.sqrt(2) / 2
+    polygon_distances = [_polygon_distances(polygon, cx, cy) for _, polygon in lookup.polygons]
+    for distances in polygon_distances:
+        uniform &= distances > half_diagonal
+
+    masks = lookup.masks_for(x0.ravel(), y0.ravel()).reshape(x0.shape)
+    zone_codes = lookup.zone_codes_for(x0.ravel(), y0.ravel()).reshape(x0.shape)
+
+    # Transition state per cell: in if any part of the test is in for the whole cell
+    x_states = np.broadcast_to(_axis_states(bands.x_band, origin_x, columns, resolution)[None, :], x0.shape)
+    y_states = np.broadcast_to(_axis_states(bands.y_band, origin_y, rows, resolution)[:, None], x0.shape)
+    zone_counts = sum((masks >> bit) & 1 for bit in range(len(lookup.names)))
+    states = [x_states, y_states, np.where(zone_counts > 1, _IN, _OUT)]
+    for distances in polygon_distances:
+        states.append(np.where(
+            distances + half_diagonal <= transition_threshold, _IN,
+            np.where(distances - half_diagonal > transition_threshold, _OUT, _MIXED)
+        ))
+    any_in = np.zeros(x0.shape, dtype=bool)
+    any_mixed = np.zeros(x0.shape, dtype=bool)
+    for state in states:
+        any_in |= state == _IN
+        any_mixed |= state == _MIXED
+    in_transition = any_in
+    uniform &= any_in | ~any_mixed
+
+    codes = np.full(x0.shape, UNDECIDED, dtype=np.int32)
+    classes = np.full(x0.shape, CLASS_NONE, dtype=np.int8)
+    codes[uniform & (zone_codes < 0)] = NO_MATCH
+
+    zone_ids: List[str] = []
+    zone_id_codes: Dict[str, int] = {}
+
+    for code, zone_name in enumerate(lookup.names):
+        cells = np.flatnonzero((uniform & (zone_codes == code)).ravel())
+        if not len(cells):
+            continue
+        pool = index.pool_for_zone(zone_name) if index.entries else None
+        if pool is None:
+            codes.ravel()[cells] = NO_MATCH
+            continue
+
+        # Corners of each cell: (x0, y0), (x1, y0), (x0, y1), (x1, y1)
+        corner_xs = np.concatenate([x0.ravel()[cells], x1.ravel()[cells], x0.ravel()[cells], x1.ravel()[cells]])
+        corner_ys = np.concatenate([y0.ravel()[cells], y0.ravel()[cells], y1.ravel()[cells], y1.ravel()[cells]])
+        nearest_idx, nearest_d2, second_idx, second_d2 = (
+            part.reshape(4, len(cells)) for part in nearest_two(corner_xs, corner_ys, pool.xs, pool.ys)
+        )
+        site = nearest_idx[0]
+        decided = (nearest_idx == site).all(axis=0)
+        if len(pool.xs) > 1:
+            decided &= (second_d2 > nearest_d2).all(axis=0)
+
+        transition = in_transition.ravel()[cells]
+        factor = np.where(transition, 0.8, 1.0)
+        if zone_name == "XD":
+            confident = np.full(len(cells), 0.9 >= threshold)
+        elif len(pool.xs) == 1:
+            confident = factor >= threshold
+        else:
+            # Same arithmetic as the matcher at the four corners
+            with np.errstate(divide="ignore", invalid="ignore"):
+                corner_confidence = (1.0 - np.sqrt(nearest_d2) / np.sqrt(second_d2)) * factor
+            confident = (corner_confidence >= threshold + CONFIDENCE_MARGIN).all(axis=0)
+
+            # Never confident: outside the disk {p : |p - s| <= k |p - t|} for some competitor t
+            never = np.zeros(len(cells), dtype=bool)
+            k = 1.0 - threshold / factor
+            sx, sy = pool.xs[site].astype(np.float64), pool.ys[site].astype(np.float64)
+            rx0, rx1 = x0.ravel()[cells], x1.ravel()[cells]
+            ry0, ry1 = y0.ravel()[cells], y1.ravel()[cells]
+            never |= k < 0
+            on_site = _rect_distance(sx, sy, rx0, rx1, ry0, ry1) == 0
+            never |= (k == 0) & ~on_site
+            with np.errstate(divide="ignore", invalid="ignore"):
+                for corner in range(4):
+                    tx = pool.xs[second_idx[corner]].astype(np.float64)
+                    ty = pool.ys[second_idx[corner]].astype(np.float64)
+                    k2 = k * k
+                    centre_x = (sx - k2 * tx) / (1 - k2)
+                    centre_y = (sy - k2 * ty) / (1 - k2)
+                    radius = k * np.hypot(sx - tx, sy - ty) / (1 - k2)
+                    outside = _rect_distance(centre_x, centre_y, rx0, rx1, ry0, ry1) > radius * (1 + 1e-7) + 1e-6
+                    never |= (k > 0) & outside
+            decided &= confident | never
+
+        sites, site_cells = np.unique(site[decided], return_inverse=True)
+        site_codes = []
+        for entry_idx in sites.tolist():
+            zone_id = pool.entries[entry_idx].zone_id
+            if zone_id not in zone_id_codes:
+                zone_id_codes[zone_id] = len(zone_ids)
+                zone_ids.append(zone_id)
+            site_codes.append(zone_id_codes[zone_id])
+        codes.ravel()[cells[decided]] = np.array(site_codes, dtype=np.int32)[site_cells.reshape(-1)]
+        classes.ravel()[cells[decided]] = np.where(confident[decided], CLASS_CONFIDENT, CLASS_VERIFY)
+
+    return AnswerRaster(origin_x, origin_y, resolution, codes, classes, zone_ids, index.map_id, version, threshold)
+
+# Latest raster for the default map, rebuilt in the background per dataset version
+_lock = threading.Lock()
+_raster: Optional[AnswerRaster] = None
+_building: Optional[int] = None
+_failed: Optional[Tuple[int, float]] = None  # (dataset version, retry after)
+
+def get_answer_raster() -> Optional[AnswerRaster]:
+    """The raster for the current dataset version, or None while it is being built."""
+    from .dockmaster_cache import get_dataset_version
+
+    raster = _raster
+    if raster is not None and raster.version == get_dataset_version():
+        return raster
+    schedule_answer_raster_build()
+    return None
+
+def schedule_answer_raster_build():
+    """
+    Start building the raster for the current dataset version unless that is
+    already under way, or failed less than ANSWER_RASTER_RETRY_SECONDS ago.
+    """
+    global _building
+    from .dockmaster_cache import get_dataset_version
+
+    version = get_dataset_version()
+    with _lock:
+        if _building == version or (_raster is not None and _raster.version == version):
+            return
+        if _failed is not None and _failed[0] == version and time.time() < _failed[1]:
+            return
+        _building = version
+    threading.Thread(target=_build_in_background, args=(version,), daemon=True).start()
+
+def _build_in_background(version: int):
+    global _raster, _building, _failed
+    from database import SessionLocal
+    from .dockmaster_cache import get_dataset_version, get_dockmaster_index
+
+    db = SessionLocal()
+    try:
+        raster = build_answer_raster(get_dockmaster_index(db, DEFAULT_MAP), version=version)
+        print(f"Answer raster for dataset version {version}: {raster.codes.size} cells, {raster.decided_share:.1%} decided")
+    except Exception as e:
+        raster = None
+        print(f"Answer raster build for dataset version {version} failed: {str(e)}")
+    finally:
+        db.close()
+
+    with _lock:
+        if raster is not None and (_raster is None or _raster.version < raster.version):
+            _raster = raster
+        if _building == version:
+            _building = None
+        if raster is None:
+            _failed = (version, time.time() + ANSWER_RASTER_RETRY_SECONDS)
+        elif _failed is not None and _failed[0] <= version:
+            _failed = None
+
+    # The dataset changed while building; catch up
+    if raster is not None and get_dataset_version() != version:
+        schedule_answer_raster_build()
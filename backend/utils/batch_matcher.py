@@ -0,0 +1,141 @@
+from typing import List, Optional, Tuple
+import numpy as np
+from models import DockmasterEntry
+from .dockmaster_store import DockmasterStore
+from .spatial_index import DockmasterIndex
+from .zone_validator import get_zone_lookup
+
+# Distances are computed in blocks of at most this many point/dockmaster pairs
+CHUNK_PAIRS = 1 << 22
+
+NO_ZONE = -1
+
+def classify_zones(xs: np.ndarray, ys: np.ndarray, map_id: Optional[int] = None) -> np.ndarray:
+    """
+    Vectorized get_zone_for_point. Returns, per point, an index into the
+    map's zone lookup names, or NO_ZONE.
+    """
+    return get_zone_lookup(map_id).zone_codes_for(xs, ys, NO_ZONE)
+
+def transition_mask(xs: np.ndarray, ys: np.ndarray, threshold: int = 200, map_id: Optional[int] = None) -> np.ndarray:
+    """Vectorized is_transition_point."""
+    return get_zone_lookup(map_id).transition_bands(threshold).contains_many(xs, ys)
+
+def nearest_two(
+    xs: np.ndarray,
+    ys: np.ndarray,
+    pool_xs: np.ndarray,
+    pool_ys: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Nearest and second-nearest pool member for every point.
+    Returns (nearest_idx, nearest_d2, second_idx, second_d2); second_idx is -1
+    when the pool has a single member. Ties resolve to the lower pool index.
+    """
+    count = len(xs)
+    nearest_idx = np.empty(count, dtype=np.int64)
+    nearest_d2 = np.empty(count, dtype=np.int64)
+    second_idx = np.full(count, -1, dtype=np.int64)
+    second_d2 = np.zeros(count, dtype=np.int64)
+
+    step = max(1, CHUNK_PAIRS // max(1, len(pool_xs)))
+    for start in range(0, count, step):
+        stop = min(start + step, count)
+        d2 = (xs[start:stop, None] - pool_xs[None, :]) ** 2 + (ys[start:stop, None] - pool_ys[None, :]) ** 2
+        rows = np.arange(stop - start)
+        first = d2.argmin(axis=1)
+        nearest_idx[start:stop] = first
+        nearest_d2[start:stop] = d2[rows, first]
+        if d2.shape[1] > 1:
+            d2[rows, first] = np.iinfo(np.int64).max
+            second = d2.argmin(axis=1)
+            second_idx[start:stop] = second
+            second_d2[start:stop] = d2[rows, second]
+
+    return nearest_idx, nearest_d2, second_idx, second_d2
+
+def match_point_rows(
+    index: DockmasterIndex,
+    xs: np.ndarray,
+    ys: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    match_points as plain arrays: (rows, confidences, transition_codes).
+    rows are the matched store rows of the index (-1 for no match) and
+    transition_codes the zone code of points in a transition zone (-1 otherwise).
+    """
+    xs = np.asarray(xs, dtype=np.int64)
+    ys = np.asarray(ys, dtype=np.int64)
+    rows = np.full(len(xs), -1, dtype=np.int64)
+    confidences = np.zeros(len(xs), dtype=np.float64)
+    transition_codes = np.full(len(xs), NO_ZONE, dtype=np.int64)
+    if not index.entries or not len(xs):
+        return rows, confidences, transition_codes
+
+    codes = classify_zones(xs, ys, index.map_id)
+    in_transition = transition_mask(xs, ys, map_id=index.map_id)
+
+    for code, zone_name in enumerate(get_zone_lookup(index.map_id).names):
+        pool = index.pool_for_zone(zone_name)
+        selected = np.flatnonzero(codes == code)
+        if pool is None or not len(selected):
+            continue
+
+        # For coordinates in XD zone, only consider XD dockmasters
+        if zone_name == "XD":
+            nearest_idx, _, _, _ = nearest_two(xs[selected], ys[selected], pool.xs, pool.ys)
+            rows[selected] = pool.entries.rows[nearest_idx]
+            confidences[selected] = 0.9  # High confidence for XD zone matches
+            continue
+
+        nearest_idx, nearest_d2, second_idx, second_d2 = nearest_two(xs[selected], ys[selected], pool.xs, pool.ys)
+
+        # Same arithmetic as calculate_match_confidence, one column at a time
+        confidence = np.ones(len(selected), dtype=np.float64)
+        has_second = second_idx >= 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = np.sqrt(nearest_d2.astype(np.float64)) / np.sqrt(second_d2.astype(np.float64))
+        # Two dockmasters sitting exactly on the point leave the ratio undefined
+        ratio[has_second & (second_d2 == 0)] = 1.0
+        confidence[has_second] *= 1.0 - ratio[has_second]
+        transition = in_transition[selected]
+        confidence[transition] *= 0.8
+        confidences[selected] = confidence
+
+        rows[selected] = pool.entries.rows[nearest_idx]
+        transition_codes[selected[transition]] = code
+
+    return rows, confidences, transition_codes
+
+def resolve_matches(
+    store: DockmasterStore,
+    map_id: int,
+    rows: np.ndarray,
+    transition_codes: np.ndarray
+) -> List[Optional[DockmasterEntry]]:
+    """Entries for match_point_rows output, tagged with their transition zone."""
+    names = get_zone_lookup(map_id).names
+    matches: List[Optional[DockmasterEntry]] = []
+    tagged = {}
+    for row, code in zip(rows.tolist(), transition_codes.tolist()):
+        if row < 0:
+            matches.append(None)
+        elif code == NO_ZONE:
+            matches.append(store.entry(row))
+        else:
+            if (row, code) not in tagged:
+                tagged[row, code] = store.entry(row).model_copy(update={"transition_zone": f"transition_{names[code]}"})
+            matches.append(tagged[row, code])
+    return matches
+
+def match_points(
+    index: DockmasterIndex,
+    xs: np.ndarray,
+    ys: np.ndarray
+) -> Tuple[List[Optional[DockmasterEntry]], np.ndarray]:
+    """
+    Vectorized equivalent of DockmasterIndex.find_nearest over many points.
+    Returns (matches, confidences); unmatched points get None and 0.0.
+    """
+    rows, confidences, transition_codes = match_point_rows(index, xs, ys)
+    return resolve_matches(index.entries.store, index.map_id, rows, transition_codes), confidences
@@ -0,0 +1,111 @@
+from typing import Dict, List
+import numpy as np
+from .answer_raster import zone_grid
+from .batch_matcher import nearest_two
+from .spatial_index import DockmasterIndex
+from .zone_validator import get_zone_lookup
+
+# Cell values besides a distance
+OUTSIDE_ZONES = None
+NO_VALID_DOCKMASTER = -1
+
+class CoverageMap:
+    """
+    Distance from the centre of every grid cell to the nearest dockmaster
+    that may answer a point there (the zone's candidate pool, as in
+    find_nearest_dockmaster). NaN outside every zone, inf in a zone with no
+    valid dockmaster.
+    """
+
+    def __init__(self, index: DockmasterIndex, resolution: int):
+        lookup = get_zone_lookup(index.map_id)
+        self.map_id = index.map_id
+        self.resolution = resolution
+        self.origin_x, self.origin_y, columns, rows = zone_grid(lookup, resolution)
+        self.zone_names: List[str] = lookup.names
+
+        cx, cy = np.meshgrid(
+            self.origin_x + np.arange(columns, dtype=np.int64) * resolution + resolution // 2,
+            self.origin_y + np.arange(rows, dtype=np.int64) * resolution + resolution // 2
+        )
+        self.cx, self.cy = cx.ravel(), cy.ravel()
+        self.zone_codes = lookup.zone_codes_for(self.cx, self.cy)
+        self.distances = np.full(len(self.cx), np.nan)
+        self.nearest: Dict[int, np.ndarray] = {}
+        self.pools = {}
+
+        for code, zone_name in enumerate(self.zone_names):
+            cells = np.flatnonzero(self.zone_codes == code)
+            pool = index.pool_for_zone(zone_name) if index.entries else None
+            if pool is None or not len(pool.xs):
+                self.distances[cells] = np.inf
+                continue
+            nearest_idx, nearest_d2, _, _ = nearest_two(self.cx[cells], self.cy[cells], pool.xs, pool.ys)
+            self.distances[cells] = np.sqrt(nearest_d2)
+            self.nearest[code] = nearest_idx
+            self.pools[code] = pool
+        self.shape = (rows, columns)
+
+    def heatmap(self) -> List[List]:
+        """Rows of rounded cell distances (OUTSIDE_ZONES / NO_VALID_DOCKMASTER for the special cells)."""
+        values = np.where(np.isinf(self.distances), NO_VALID_DOCKMASTER, np.round(np.nan_to_num(self.distances)))
+        cells = values.astype(np.int64).reshape(self.shape).tolist()
+        outside = np.isnan(self.distances).reshape(self.shape)
+        for r, c in zip(*np.nonzero(outside)):
+            cells[r][c] = OUTSIDE_ZONES
+        return cells
+
+    def worst_areas(self, code: int, count: int) -> List[dict]:
+        """
+        The count worst-covered spots of a zone. Each pick rules out the cells
+        within half its distance, so the spots are separate gaps rather than
+        neighbouring cells of the same one.
+        """
+        cells = np.flatnonzero(self.zone_codes == code)
+        distances = self.distances[cells]
+        pool = self.pools.get(code)
+        nearest = self.nearest.get(code)
+        open_cells = np.ones(len(cells), dtype=bool)
+        areas = []
+        while len(areas) < count and open_cells.any():
+            pick = int(np.argmax(np.where(open_cells, distances, -1.0)))
+            distance = float(distances[pick])
+            x, y = int(self.cx[cells[pick]]), int(self.cy[cells[pick]])
+            areas.append({
+                "x": x,
+                "y": y,
+                "distance": round(distance, 2) if np.isfinite(distance) else None,
+                "nearest": pool.entries[int(nearest[pick])].zone_id if pool is not None else None
+            })
+            radius = max(distance / 2, self.resolution) if np.isfinite(distance) else np.inf
+            open_cells &= np.hypot(self.cx[cells] - x, self.cy[cells] - y) > radius
+        return areas
+
+    def summary(self, gap_distance: float, worst_count: int) -> dict:
+        """Per-zone coverage statistics and worst spots, plus the heatmap."""
+        zones = {}
+        for code, zone_name in enumerate(self.zone_names):
+            distances = self.distances[self.zone_codes == code]
+            if not len(distances):
+                continue
+            covered = distances[np.isfinite(distances)]
+            zones[zone_name] = {
+                "cells": len(distances),
+                "area": len(distances) * self.resolution ** 2,
+                "mean_distance": round(float(covered.mean()), 2) if len(covered) else None,
+                "p95_distance": round(float(np.percentile(covered, 95)), 2) if len(covered) else None,
+                "max_distance": round(float(covered.max()), 2) if len(covered) else None,
+                "gap_share": round(float(np.mean(distances > gap_distance)), 4),
+                "worst": self.worst_areas(code, worst_count)
+            }
+        return {
+            "map": self.map_id,
+            "resolution": self.resolution,
+            "origin_x": self.origin_x,
+            "origin_y": self.origin_y,
+            "rows": self.shape[0],
+            "columns": self.shape[1],
+            "gap_distance": gap_distance,
+            "zones": zones,
+            "heatmap": self.heatmap()
+        }
@@ -0,0 +1,203 @@
+import threading
+import time
+import numpy as np
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+from sqlalchemy.orm import Session
+from database import DockmasterDB, SessionLocal
+from models import DockmasterEntry
+from .match_cache import match_cache
+from .dockmaster_store import FLAG_ENABLED, DockmasterStore
+from .spatial_index import DockmasterIndex
+from .zone_validator import DEFAULT_MAP
+
+# Process-wide dockmaster dataset. The version is bumped whenever the
+# dockmasters table is replaced, and everything derived from the table is
+# rebuilt lazily on the next request.
+_lock = threading.RLock()
+_version = 0
+_store: Optional[DockmasterStore] = None
+_indexes: Optional[Dict[int, DockmasterIndex]] = None
+
+# Indexes of the last version built, kept after an invalidation so they can
+# be served until the next build finishes, and the background build state
+_latest_indexes: Optional[Dict[int, DockmasterIndex]] = None
+_index_building: Optional[int] = None
+_index_failed: Optional[Tuple[int, float]] = None  # (dataset version, retry after)
+
+# Seconds before a failed background index build is tried again
+INDEX_RETRY_SECONDS = 60
+
+# Results derived from an index, keyed on (name, version, map, *params)
+_derived: Dict[Tuple, Any] = {}
+MAX_DERIVED_RESULTS = 64
+
+T = TypeVar("T")
+_MISSING = object()
+
+def get_dataset_version() -> int:
+    """Current dockmaster dataset version."""
+    return _version
+
+def invalidate_dockmaster_cache() -> int:
+    """Drop cached dockmaster data after the table changed. Returns the new version."""
+    global _version, _store, _indexes
+    with _lock:
+        _version += 1
+        _store = None
+        _indexes = None
+        _derived.clear()
+        match_cache.clear()
+        return _version
+
+def schedule_derived_builds():
+    """Start the background jobs that keep data derived from the dataset current."""
+    from .answer_raster import schedule_answer_raster_build
+    from .suggestion_annotations import schedule_annotation_refresh
+    from .zone_audit import schedule_zone_audit
+
+    schedule_index_build()
+    schedule_answer_raster_build()
+    schedule_zone_audit()
+    schedule_annotation_refresh()
+
+def dataset_changed() -> int:
+    """
+    Call after the dockmasters table or the zone layouts changed: drops the
+    cached data and rebuilds everything derived from it. Returns the new version.
+    """
+    version = invalidate_dockmaster_cache()
+    schedule_derived_builds()
+    return version
+
+def load_dockmaster_store(db: Session) -> DockmasterStore:
+    """Read the dockmasters table into a packed store with a single column query."""
+    rows = db.query(
+        DockmasterDB.zone_id,
+        DockmasterDB.x,
+        DockmasterDB.y,
+        DockmasterDB.map,
+        DockmasterDB.enabled,
+        DockmasterDB.is_active
+    ).all()
+    zone_ids, xs, ys, maps, enabled, active = zip(*rows) if rows else ([],) * 6
+    # NULL flags fall back to the column defaults
+    return DockmasterStore(
+        zone_ids, xs, ys, maps,
+        [value is not False for value in enabled],
+        [value is not False for value in active]
+    )
+
+def get_dockmaster_store(db: Session) -> DockmasterStore:
+    """Return the packed dockmaster store, loading it on first use after a refresh."""
+    global _store
+    store = _store
+    if store is None:
+        with _lock:
+            if _store is None:
+                _store = load_dockmaster_store(db)
+            store = _store
+    return store
+
+def get_versioned_dockmaster_store(db: Session) -> Tuple[int, DockmasterStore]:
+    """The current dataset version and its store, read together so a refresh can't land in between."""
+    with _lock:
+        return _version, get_dockmaster_store(db)
+
+def load_dockmaster_entries(db: Session) -> List[DockmasterEntry]:
+    """Load the enabled dockmasters used for matching."""
+    store = get_dockmaster_store(db)
+    return list(store.entries(store.rows(require=FLAG_ENABLED)))
+
+def get_dockmaster_index(db: Session, map_id: int = DEFAULT_MAP) -> DockmasterIndex:
+    """Return the spatial index for one map of the current dataset, building all maps on first use."""
+    global _indexes, _latest_indexes
+    indexes = _indexes
+    if indexes is None:
+        with _lock:
+            if _indexes is None:
+                store = get_dockmaster_store(db)
+                enabled_maps = np.unique(store.maps[store.rows(require=FLAG_ENABLED)]).tolist()
+                _indexes = _latest_indexes = {
+                    entry_map: DockmasterIndex.from_store(store, entry_map) for entry_map in enabled_maps
+                }
+            indexes = _indexes
+
+    index = indexes.get(map_id)
+    if index is None:
+        # No dockmasters on this map
+        index = DockmasterIndex([], map_id)
+    return index
+
+def get_derived(
+    db: Session,
+    name: str,
+    params: Tuple,
+    build: Callable[[DockmasterIndex], T],
+    map_id: int = DEFAULT_MAP
+) -> T:
+    """
+    Return a result computed from one map's index, memoized per dataset
+    version, map and params until the next invalidation.
+    """
+    version = _version
+    key = (name, version, map_id) + tuple(params)
+    value = _derived.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    value = build(get_dockmaster_index(db, map_id))
+    with _lock:
+        # Don't store results computed against a dataset that was replaced meanwhile
+        if _version == version:
+            while len(_derived) >= MAX_DERIVED_RESULTS:
+                _derived.pop(next(iter(_derived)))
+            _derived[key] = value
+    return value
+
+def get_latest_dockmaster_index(map_id: int = DEFAULT_MAP) -> Tuple[Optional[DockmasterIndex], bool]:
+    """
+    The index of the most recently built dataset version for a map, without
+    touching the database, and whether that version is still current.
+    (None, False) before the first build.
+    """
+    with _lock:
+        indexes, current = _latest_indexes, _indexes is not None
+    if indexes is None:
+        return None, False
+    index = indexes.get(map_id)
+    if index is None:
+        index = DockmasterIndex([], map_id)
+    return index, current
+
+def schedule_index_build():
+    """
+    Build the indexes of the current dataset version in the background unless
+    they are built or under way, or failed less than INDEX_RETRY_SECONDS ago.
+    """
+    global _index_building
+    with _lock:
+        version = _version
+        if _indexes is not None or _index_building == version:
+            return
+        if _index_failed is not None and _index_failed[0] == version and time.time() < _index_failed[1]:
+            return
+        _index_building = version
+    threading.Thread(target=_build_indexes_in_background, args=(version,), daemon=True).start()
+
+def _build_indexes_in_background(version: int):
+    global _index_building, _index_failed
+    db = SessionLocal()
+    try:
+        get_dockmaster_index(db)
+        failed = False
+    except Exception as e:
+        failed = True
+        print(f"Dockmaster index build for dataset version {version} failed: {str(e)}")
+    finally:
+        db.close()
+
+    with _lock:
+        if _index_building == version:
+            _index_building = None
+        if failed:
+            _index_failed = (version, time.time() + INDEX_RETRY_SECONDS)
@@ -0,0 +1,67 @@
+from typing import Dict, List, Tuple
+from .zone_ids import normalize_zone_ids
+
+def _split_line(line: str) -> List[str]:
+    # Split by tabs first, then by multiple spaces as fallback
+    if '\t' in line:
+        parts = [part.strip() for part in line.split('\t')]
+    else:
+        # Split by whitespace and filter empty parts
+        parts = [part for part in line.split() if part]
+
+    # Filter out empty parts
+    parts = [part for part in parts if part]
+
+    # Rejoin multi-word zone IDs like "The Gym" when split on spaces
+    while len(parts) > 5 and not parts[1].lstrip('-').isdigit():
+        parts[0:2] = [f"{parts[0]} {parts[1]}"]
+    return parts
+
+def parse_dockmaster_file(content: str, log_prefix: str = "") -> Tuple[List[Dict], Dict[str, str]]:
+    """
+    Parse the GG DOCKMASTERS file into rows for DockmasterDB, normalizing
+    every zone ID in one pass.
+    Returns (rows, normalized_ids) where normalized_ids maps each zone ID
+    that was rewritten to its normalized form.
+    """
+    lines = content.strip().split('\n')
+    rows = []
+
+    for line_num, line in enumerate(lines, 1):
+        original_line = line
+        line = line.strip()
+
+        # Skip empty lines and comments
+        if not line or line.startswith('#'):
+            continue
+
+        # Remove leading + if present (GitHub diff format)
+        if line.startswith('+'):
+            line = line[1:].strip()
+
+        # Skip if still empty after cleaning
+        if not line:
+            continue
+
+        parts = _split_line(line)
+
+        if len(parts) >= 5:
+            try:
+                # Validate coordinates are numeric
+                rows.append({
+                    "zone_id": parts[0],
+                    "x": int(parts[1]),
+                    "y": int(parts[2]),
+                    "map": int(parts[3]),
+                    "enabled": parts[4].lower() in ['true', '1', 'yes', 'enabled']
+                })
+            except (ValueError, IndexError) as e:
+                print(f"{log_prefix}Line {line_num}: '{original_line}' -> '{line}' - {str(e)}")
+        elif len(parts) > 0:  # Non-empty line but insufficient parts
+            print(f"{log_prefix}Line {line_num}: '{original_line}' -> '{line}' - Expected 5 parts, got {len(parts)}: {parts}")
+
+    normalized, normalized_ids = normalize_zone_ids(row["zone_id"] for row in rows)
+    for row, zone_id in zip(rows, normalized):
+        row["zone_id"] = zone_id
+
+    return rows, normalized_ids
@@ -0,0 +1,148 @@
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+import numpy as np
+from models import DockmasterEntry
+from .zone_validator import get_dockmaster_direction
+
+# Per-row flag bits
+FLAG_ENABLED = 1
+FLAG_ACTIVE = 2
+FLAG_REFERENCE = 4  # "6142" in x or y; map-only point, never a match candidate
+FLAG_GRID = 8  # M# grid location
+FLAG_XD = 16  # XD-prefixed zone ID
+
+# Per-row array columns; together with zone_names and direction_names they are the whole store
+COLUMNS = ("zone_codes", "direction_codes", "xs", "ys", "maps", "flags")
+
+class DockmasterStore:
+    """
+    Read-only, column-packed copy of the dockmasters table. Coordinates and
+    maps are int32 arrays, zone IDs are interned (each row holds a code into
+    zone_names) and the per-row checks the matcher needs are precomputed
+    into a flags byte. DockmasterEntry models are only built for rows that
+    are actually returned, and then reused.
+    """
+
+    def __init__(
+        self,
+        zone_ids: Sequence[str],
+        xs: Sequence[int],
+        ys: Sequence[int],
+        maps: Sequence[int],
+        enabled: Sequence[bool],
+        active: Optional[Sequence[bool]] = None,
+        entries: Optional[Sequence[DockmasterEntry]] = None
+    ):
+        codes: Dict[str, int] = {}
+        self.zone_codes = np.array([codes.setdefault(zone_id, len(codes)) for zone_id in zone_ids], dtype=np.int32)
+        self.zone_names: List[str] = list(codes)
+        self.xs = np.array(xs, dtype=np.int32)
+        self.ys = np.array(ys, dtype=np.int32)
+        self.maps = np.array(maps, dtype=np.int32)
+
+        # Direction suffix per row, interned the same way
+        directions: Dict[str, int] = {}
+        name_directions = np.array(
+            [directions.setdefault(get_dockmaster_direction(name), len(directions)) for name in self.zone_names],
+            dtype=np.int32
+        )
+        self.direction_names: List[str] = list(directions)
+        self.direction_codes = name_directions[self.zone_codes] if len(self.zone_codes) else np.zeros(0, dtype=np.int32)
+
+        # Reference points are any coordinate containing "6142"; test each distinct value once
+        values = np.union1d(self.xs, self.ys)
+        reference_values = np.array([v for v in values.tolist() if "6142" in str(v)], dtype=np.int32)
+        name_xd = np.array([name.startswith("XD") for name in self.zone_names], dtype=bool)
+        name_grid = np.array([name.startswith("M") for name in self.zone_names], dtype=bool)
+
+        self.flags = np.zeros(len(self.xs), dtype=np.uint8)
+        self.flags[np.asarray(enabled, dtype=bool)] |= FLAG_ENABLED
+        self.flags[np.asarray(active if active is not None else [True] * len(self.xs), dtype=bool)] |= FLAG_ACTIVE
+        self.flags[np.isin(self.xs, reference_values) | np.isin(self.ys, reference_values)] |= FLAG_REFERENCE
+        if len(self.zone_codes):
+            self.flags[name_grid[self.zone_codes]] |= FLAG_GRID
+            self.flags[name_xd[self.zone_codes]] |= FLAG_XD
+
+        self._entries: List[Optional[DockmasterEntry]] = list(entries) if entries is not None else [None] * len(self.xs)
+
+    @classmethod
+    def from_entries(cls, entries: Sequence[DockmasterEntry]) -> "DockmasterStore":
+        """Pack existing entries; rows resolve back to the same entry objects."""
+        return cls(
+            [e.zone_id for e in entries],
+            [e.x for e in entries],
+            [e.y for e in entries],
+            [e.map for e in entries],
+            [e.enabled for e in entries],
+            entries=entries
+        )
+
+    @classmethod
+    def from_columns(
+        cls,
+        zone_names: List[str],
+        direction_names: List[str],
+        columns: Dict[str, np.ndarray]
+    ) -> "DockmasterStore":
+        """Wrap existing column arrays (e.g. views of shared memory) without copying them."""
+        store = cls.__new__(cls)
+        store.zone_names = list(zone_names)
+        store.direction_names = list(direction_names)
+        for name in COLUMNS:
+            setattr(store, name, columns[name])
+        store._entries = [None] * len(store.xs)
+        return store
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        return {name: getattr(self, name) for name in COLUMNS}
+
+    def __len__(self) -> int:
+        return len(self.xs)
+
+    def zone_id(self, row: int) -> str:
+        return self.zone_names[self.zone_codes[row]]
+
+    def entry(self, row: int) -> DockmasterEntry:
+        """DockmasterEntry for a row, built on first use."""
+        entry = self._entries[row]
+        if entry is None:
+            entry = self._entries[row] = DockmasterEntry(
+                zone_id=self.zone_id(row),
+                x=int(self.xs[row]),
+                y=int(self.ys[row]),
+                map=int(self.maps[row]),
+                enabled=bool(self.flags[row] & FLAG_ENABLED),
+                is_reference_point=bool(self.flags[row] & FLAG_REFERENCE)
+            )
+        return entry
+
+    def rows(self, map_id: Optional[int] = None, require: int = 0, exclude: int = 0) -> np.ndarray:
+        """Row numbers on a map (or all maps) with every require flag and no exclude flag set."""
+        selected = (self.flags & require) == require
+        if exclude:
+            selected &= (self.flags & exclude) == 0
+        if map_id is not None:
+            selected &= self.maps == map_id
+        return np.flatnonzero(selected)
+
+    def entries(self, rows: np.ndarray) -> "StoreEntries":
+        return StoreEntries(self, rows)
+
+class StoreEntries(Sequence):
+    """Lazy sequence of the DockmasterEntry models for some store rows."""
+
+    def __init__(self, store: DockmasterStore, rows: np.ndarray):
+        self.store = store
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self._row_list: List[int] = self.rows.tolist()
+
+    def __len__(self) -> int:
+        return len(self._row_list)
+
+    def __getitem__(self, i: Union[int, slice]):
+        if isinstance(i, slice):
+            return [self.store.entry(row) for row in self._row_list[i]]
+        return self.store.entry(self._row_list[i])
+
+    def __iter__(self) -> Iterator[DockmasterEntry]:
+        entry = self.store.entry
+        return (entry(row) for row in self._row_list)
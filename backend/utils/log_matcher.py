@@ -0,0 +1,153 @@
+import mmap
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from .batch_matcher import NO_ZONE, classify_zones, match_point_rows
+from .match_jobs import worker_index, worker_store
+from .zone_validator import get_zone_lookup
+
+# Bytes of log each worker task parses and matches
+LOG_CHUNK_BYTES = 32 << 20
+
+# Longer digit runs (ids, timestamps) can't be coordinates and would overflow int64
+MAX_DIGITS = 18
+
+RESULT_COLUMNS = "line,x,y,zone,dockmaster,confidence,needs_verification\n"
+
+def split_ranges(data: Sequence, chunk_bytes: Optional[int] = None) -> List[Tuple[int, int]]:
+    """Split a buffer into byte ranges of about chunk_bytes (LOG_CHUNK_BYTES) that end on a line break."""
+    chunk_bytes = chunk_bytes or LOG_CHUNK_BYTES
+    ranges = []
+    start = 0
+    size = len(data)
+    while start < size:
+        stop = min(start + chunk_bytes, size)
+        if stop < size:
+            newline = data.find(b"\n", stop - 1)
+            stop = size if newline < 0 else newline + 1
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+def count_lines(buf: np.ndarray) -> int:
+    return int(np.count_nonzero(buf == 10)) + (1 if len(buf) and buf[-1] != 10 else 0)
+
+def parse_log_bytes(buf: np.ndarray, fields: Tuple[int, int] = (0, 1)) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized coordinate extraction from the lines of a byte buffer: x and
+    y are the fields[0]-th and fields[1]-th integers on a line (a leading
+    "-" makes one negative unless it follows a letter or digit; decimal
+    fractions are dropped). Returns (line indexes, xs, ys) for the lines
+    that have both, line indexes counting from 0 at the start of buf.
+    """
+    empty = np.zeros(0, dtype=np.int64)
+    digit = (buf >= 48) & (buf <= 57)
+    edges = np.diff(digit.astype(np.int8), prepend=np.int8(0), append=np.int8(0))
+    starts = np.flatnonzero(edges == 1)
+    lengths = np.flatnonzero(edges == -1) - starts
+    if not len(starts):
+        return empty, empty, empty
+
+    word = digit | (((buf | 32) >= 97) & ((buf | 32) <= 122))
+    before = starts - 1
+    has_before = before >= 0
+    sign_char = np.zeros(len(starts), dtype=np.uint8)
+    sign_char[has_before] = buf[before[has_before]]
+    has_two_before = before >= 1
+    word_before_sign = np.zeros(len(starts), dtype=bool)
+    word_before_sign[has_two_before] = word[before[has_two_before] - 1]
+    negative = (sign_char == 45) & ~word_before_sign
+    fraction = (sign_char == 46) & word_before_sign
+
+    # Keep whole numbers only; the digits after a decimal point aren't a field of their own
+    keep = ~fraction
+    starts, lengths, negative = starts[keep], lengths[keep], negative[keep]
+
+    values = np.zeros(len(starts), dtype=np.int64)
+    for k in range(min(int(lengths.max()), MAX_DIGITS)):
+        more = lengths > k
+        values[more] = values[more] * 10 + (buf[starts[more] + k] - 48)
+    values[negative] = -values[negative]
+    valid = lengths <= MAX_DIGITS
+
+    # Field number of every integer within its line
+    lines = np.searchsorted(np.flatnonzero(buf == 10), starts, side="right")
+    order = np.arange(len(starts))
+    first = np.maximum.accumulate(np.where(np.r_[True, lines[1:] != lines[:-1]], order, 0))
+    rank = order - first
+
+    x_tokens = np.flatnonzero((rank == fields[0]) & valid)
+    y_tokens = np.flatnonzero((rank == fields[1]) & valid)
+    line_indexes, x_at, y_at = np.intersect1d(lines[x_tokens], lines[y_tokens], assume_unique=True, return_indices=True)
+    return line_indexes.astype(np.int64), values[x_tokens[x_at]], values[y_tokens[y_at]]
+
+def match_log_range(
+    path: str,
+    start: int,
+    stop: int,
+    map_id: int,
+    fields: Tuple[int, int],
+    confidence_threshold: float,
+    results_path: Optional[str]
+) -> Tuple[Dict[str, np.ndarray], int]:
+    """
+    SharedStorePool worker task: parse and match one byte range of a log.
+    Saves the per-line results to results_path (an .npz, if given) for
+    write_log_results, and returns per-zone tallies indexed by zone code + 1,
+    with index 0 for points in no zone, and the number of lines in the range.
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        buf = np.frombuffer(mm, dtype=np.uint8, count=stop - start, offset=start)
+        line_count = count_lines(buf)
+        line_indexes, xs, ys = parse_log_bytes(buf, fields)
+        del buf
+
+    rows, confidences, _ = match_point_rows(worker_index(map_id), xs, ys)
+    zones = classify_zones(xs, ys, map_id)
+    needs_verification = confidences < confidence_threshold
+    names = get_zone_lookup(map_id).names
+    slots = zones.astype(np.int64) - NO_ZONE
+    tallies = {
+        "points": np.bincount(slots, minlength=len(names) + 1),
+        "matched": np.bincount(slots, weights=rows >= 0, minlength=len(names) + 1).astype(np.int64),
+        "needs_verification": np.bincount(slots, weights=needs_verification, minlength=len(names) + 1).astype(np.int64)
+    }
+
+    if results_path:
+        np.savez(
+            results_path, line_indexes=line_indexes, xs=xs, ys=ys, slots=slots, rows=rows,
+            confidences=confidences, needs_verification=needs_verification
+        )
+    return tallies, line_count
+
+def write_log_results(results_path: str, part_path: str, first_line: int, map_id: int):
+    """
+    SharedStorePool worker task: write the results match_log_range saved as
+    CSV rows to part_path, numbering lines from first_line (0-based).
+    """
+    with np.load(results_path) as saved:
+        results = {name: saved[name] for name in saved.files}
+    store = worker_store()
+    rows = results["rows"]
+    matched = rows >= 0
+    dockmaster_codes = np.zeros(len(rows), dtype=np.int64)
+    dockmaster_codes[matched] = store.zone_codes[rows[matched]] + 1
+    dockmasters = np.array([""] + store.zone_names, dtype=object)[dockmaster_codes]
+    zone_names = np.array([""] + get_zone_lookup(map_id).names, dtype=object)[results["slots"]]
+    with open(part_path, "w") as out:
+        out.writelines(
+            f"{line},{x},{y},{zone},{dockmaster},{confidence},{'true' if verify else 'false'}\n"
+            for line, x, y, zone, dockmaster, confidence, verify in zip(
+                (results["line_indexes"] + first_line + 1).tolist(), results["xs"].tolist(), results["ys"].tolist(),
+                zone_names.tolist(), dockmasters.tolist(), results["confidences"].tolist(),
+                results["needs_verification"].tolist()
+            )
+        )
+
+def tally_by_zone(map_id: int, tallies: Dict[str, np.ndarray]) -> Dict[str, Dict[str, int]]:
+    """Summed worker tallies as {zone: {"points", "matched", "needs_verification"}}."""
+    names = ["none"] + get_zone_lookup(map_id).names
+    return {
+        name: {key: int(values[i]) for key, values in tallies.items()}
+        for i, name in enumerate(names)
+        if tallies["points"][i]
+    }
@@ -0,0 +1,327 @@
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from .batch_matcher import match_point_rows, resolve_matches
+from .dockmaster_store import FLAG_ENABLED, DockmasterStore
+from .spatial_index import DockmasterIndex
+from .stream_matcher import STREAM_CHUNK_POINTS, ParsedLine, format_result_lines, parse_coordinate_lines
+
+# Worker processes matching job chunks; defaults to one per core
+MATCH_JOB_WORKERS = int(os.getenv("MATCH_JOB_WORKERS", "0")) or os.cpu_count() or 1
+
+# Points per task handed to a worker
+JOB_CHUNK_POINTS = 50000
+
+MAX_JOB_POINTS = 5_000_000
+
+# Invalid lines kept for the result file; any beyond are only counted
+MAX_JOB_ERROR_LINES = 1000
+
+# Finished jobs kept around for download; the oldest are dropped first
+MAX_FINISHED_JOBS = 20
+
+# (array name, dtype, byte offset, length) of each array in a shared block
+Layout = List[Tuple[str, str, int, int]]
+
+def _share_arrays(arrays: Dict[str, np.ndarray]) -> Tuple[shared_memory.SharedMemory, Layout]:
+    """Copy arrays into a new shared memory block."""
+    layout: Layout = []
+    size = 0
+    for name, array in arrays.items():
+        size = -(-size // 8) * 8  # 8-byte align every array
+        layout.append((name, array.dtype.str, size, len(array)))
+        size += array.nbytes
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    for name, array in _attach(shm, layout).items():
+        array[:] = arrays[name]
+    return shm, layout
+
+def _attach(shm: shared_memory.SharedMemory, layout: Layout) -> Dict[str, np.ndarray]:
+    """Array views of a shared block; drop them before closing the block."""
+    return {
+        name: np.ndarray((length,), dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+        for name, dtype, offset, length in layout
+    }
+
+# Worker process state: the store of the pool's dataset version, indexes
+# built from it, and the shared arrays of the job being worked on
+_worker_store: Optional[DockmasterStore] = None
+_worker_shm: Optional[shared_memory.SharedMemory] = None
+_worker_indexes: Dict[int, DockmasterIndex] = {}
+_worker_job: Optional[Tuple[str, shared_memory.SharedMemory, Dict[str, np.ndarray]]] = None
+
+def _init_worker(name: str, layout: Layout, zone_names: List[str], direction_names: List[str]):
+    global _worker_shm, _worker_store
+    _worker_shm = shared_memory.SharedMemory(name=name)
+    _worker_store = DockmasterStore.from_columns(zone_names, direction_names, _attach(_worker_shm, layout))
+
+def worker_store() -> DockmasterStore:
+    """The shared store, inside a SharedStorePool worker."""
+    return _worker_store
+
+def worker_index(map_id: int) -> DockmasterIndex:
+    """Index over one map of the shared store, inside a SharedStorePool worker."""
+    index = _worker_indexes.get(map_id)
+    if index is None:
+        index = _worker_indexes[map_id] = DockmasterIndex.from_store(_worker_store, map_id)
+    return index
+
+def _match_range(name: str, layout: Layout, map_id: int, start: int, stop: int) -> int:
+    """Worker task: match points [start, stop) of a job into its shared output arrays."""
+    global _worker_job
+    if _worker_job is None or _worker_job[0] != name:
+        if _worker_job is not None:
+            _, shm, arrays = _worker_job
+            _worker_job = None
+            arrays.clear()
+            shm.close()
+        shm = shared_memory.SharedMemory(name=name)
+        _worker_job = (name, shm, _attach(shm, layout))
+    arrays = _worker_job[2]
+
+    rows, confidences, transition_codes = match_point_rows(worker_index(map_id), arrays["xs"][start:stop], arrays["ys"][start:stop])
+    arrays["rows"][start:stop] = rows
+    arrays["confidences"][start:stop] = confidences
+    arrays["transition_codes"][start:stop] = transition_codes
+    return stop - start
+
+class SharedStorePool:
+    """
+    A store's columns in shared memory, and a process pool whose workers
+    read them through worker_store() / worker_index(). Workers get the
+    block name once, at startup, so tasks only carry their own arguments.
+    """
+
+    def __init__(self, version: int, store: DockmasterStore, max_workers: int = MATCH_JOB_WORKERS):
+        self.version = version
+        self.jobs = 0
+        self.retired = False
+        self.shm, layout = _share_arrays(store.columns())
+        self.executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            # Forking a threaded server process isn't safe
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.shm.name, layout, store.zone_names, store.direction_names)
+        )
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.shm.close()
+        self.shm.unlink()
+
+_lock = threading.Lock()
+_dataset: Optional[SharedStorePool] = None
+_jobs: Dict[str, "MatchJob"] = {}
+
+def _acquire_dataset(store: DockmasterStore, version: int) -> SharedStorePool:
+    global _dataset
+    with _lock:
+        if _dataset is None or _dataset.version != version:
+            # Jobs still running on the old version keep its pool until they finish
+            if _dataset is not None:
+                _dataset.retired = True
+                if _dataset.jobs == 0:
+                    _dataset.close()
+            _dataset = SharedStorePool(version, store)
+        _dataset.jobs += 1
+        return _dataset
+
+def _release_dataset(dataset: SharedStorePool):
+    with _lock:
+        dataset.jobs -= 1
+        if dataset.retired and dataset.jobs == 0:
+            dataset.close()
+
+class MatchJob:
+    """A submitted match workload and, once completed, its results."""
+
+    def __init__(self, store: DockmasterStore, map_id: int, confidence_threshold: float):
+        self.job_id = uuid.uuid4().hex
+        self.store = store
+        self.map_id = map_id
+        self.line_numbers = np.zeros(0, dtype=np.int64)
+        self.xs = np.zeros(0, dtype=np.int64)
+        self.ys = np.zeros(0, dtype=np.int64)
+        self.errors: List[ParsedLine] = []
+        self.invalid_lines = 0
+        self.confidence_threshold = confidence_threshold
+        self.status = "parsing"
+        self.error: Optional[str] = None
+        self.completed = 0
+        self.created_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+        self.rows: Optional[np.ndarray] = None
+        self.confidences: Optional[np.ndarray] = None
+        self.transition_codes: Optional[np.ndarray] = None
+
+    def summary(self) -> dict:
+        total = len(self.xs)
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "map": self.map_id,
+            "total": total,
+            "completed": self.completed,
+            "progress": self.completed / total if total else 1.0,
+            "invalid_lines": self.invalid_lines,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "error": self.error
+        }
+
+    def parse(self, lines: Iterable[str], fmt: str):
+        """
+        Read coordinates into int64 arrays, a chunk at a time. Raises
+        ValueError if there are more than MAX_JOB_POINTS.
+        """
+        # Line numbers, xs and ys, one array per chunk each
+        columns: Tuple[List[np.ndarray], ...] = ([], [], [])
+        chunk: List[Tuple[int, int, int]] = []
+        total = 0
+
+        def flush():
+            block = np.array(chunk, dtype=np.int64).reshape(-1, 3)
+            for i, column in enumerate(columns):
+                column.append(block[:, i].copy())
+            chunk.clear()
+
+        for item in parse_coordinate_lines(lines, fmt):
+            if item[3] is not None:
+                self.invalid_lines += 1
+                if len(self.errors) < MAX_JOB_ERROR_LINES:
+                    self.errors.append(item)
+                continue
+            if total >= MAX_JOB_POINTS:
+                raise ValueError(f"At most {MAX_JOB_POINTS} points per job")
+            chunk.append(item[:3])
+            total += 1
+            if len(chunk) == JOB_CHUNK_POINTS:
+                flush()
+        flush()
+
+        arrays = []
+        for column in columns:
+            arrays.append(np.concatenate(column))
+            column.clear()
+        self.line_numbers, self.xs, self.ys = arrays
+
+    def result_lines(self, chunk_size: int = STREAM_CHUNK_POINTS) -> Iterator[str]:
+        """
+        Results as NDJSON in input order, formatted like /match/stream. Only
+        the first MAX_JOB_ERROR_LINES invalid lines are included.
+        """
+        errors = iter(self.errors)
+        error = next(errors, None)
+        for start in range(0, len(self.xs), chunk_size):
+            stop = min(start + chunk_size, len(self.xs))
+            chunk: List[ParsedLine] = []
+            for line_number, x, y in zip(
+                self.line_numbers[start:stop].tolist(), self.xs[start:stop].tolist(), self.ys[start:stop].tolist()
+            ):
+                while error is not None and error[0] < line_number:
+                    chunk.append(error)
+                    error = next(errors, None)
+                chunk.append((line_number, x, y, None))
+            matches = resolve_matches(self.store, self.map_id, self.rows[start:stop], self.transition_codes[start:stop])
+            yield format_result_lines(chunk, matches, self.confidences[start:stop], self.confidence_threshold)
+
+        remaining = ([error] if error is not None else []) + list(errors)
+        if remaining:
+            yield format_result_lines(remaining, [], np.zeros(0), self.confidence_threshold)
+
+def _run_job(job: MatchJob, version: int, lines: Iterable[str], fmt: str):
+    dataset = None
+    try:
+        try:
+            job.parse(lines, fmt)
+        finally:
+            close = getattr(lines, "close", None)
+            if close is not None:
+                close()
+        job.status = "queued"
+
+        total = len(job.xs)
+        if not total or not len(job.store.rows(job.map_id, require=FLAG_ENABLED)):
+            # Nothing worth starting the worker pool for
+            index = DockmasterIndex.from_store(job.store, job.map_id)
+            job.rows, job.confidences, job.transition_codes = match_point_rows(index, job.xs, job.ys)
+        else:
+            dataset = _acquire_dataset(job.store, version)
+            job.status = "running"
+            shm, layout = _share_arrays({
+                "xs": job.xs,
+                "ys": job.ys,
+                "rows": np.zeros(total, dtype=np.int64),
+                "confidences": np.zeros(total, dtype=np.float64),
+                "transition_codes": np.zeros(total, dtype=np.int64)
+            })
+            try:
+                futures = [
+                    dataset.executor.submit(_match_range, shm.name, layout, job.map_id, start, min(start + JOB_CHUNK_POINTS, total))
+                    for start in range(0, total, JOB_CHUNK_POINTS)
+                ]
+                try:
+                    for future in as_completed(futures):
+                        job.completed += future.result()
+                finally:
+                    for future in futures:
+                        future.cancel()
+                results = {name: array.copy() for name, array in _attach(shm, layout).items()}
+            finally:
+                shm.close()
+                shm.unlink()
+            job.rows, job.confidences, job.transition_codes = results["rows"], results["confidences"], results["transition_codes"]
+
+        job.completed = total
+        job.status = "completed"
+    except Exception as e:
+        job.status = "failed"
+        job.error = str(e)
+        print(f"Match job {job.job_id} failed: {e}")
+    finally:
+        job.finished_at = datetime.utcnow()
+        if dataset is not None:
+            _release_dataset(dataset)
+
+def submit_match_job(
+    store: DockmasterStore,
+    version: int,
+    map_id: int,
+    lines: Iterable[str],
+    fmt: str,
+    confidence_threshold: float = 0.8
+) -> MatchJob:
+    """
+    Parse coordinates from lines and match them on the worker pool, both in
+    the background, so this returns at once. lines is closed once read if it
+    is a file. More than MAX_JOB_POINTS points fail the job.
+    """
+    job = MatchJob(store, map_id, confidence_threshold)
+    with _lock:
+        finished = [job_id for job_id, other in _jobs.items() if other.finished_at is not None]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS + 1)]:
+            del _jobs[job_id]
+        _jobs[job.job_id] = job
+
+    threading.Thread(target=_run_job, args=(job, version, lines, fmt), daemon=True).start()
+    return job
+
+def get_match_job(job_id: str) -> Optional[MatchJob]:
+    return _jobs.get(job_id)
+
+def shutdown_match_jobs():
+    """Stop the worker pool and free its shared memory."""
+    global _dataset
+    with _lock:
+        if _dataset is not None:
+            _dataset.retired = True
+            if _dataset.jobs == 0:
+                _dataset.close()
+            _dataset = None
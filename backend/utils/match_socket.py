@@ -0,0 +1,208 @@
+import asyncio
+import os
+import socket
+import struct
+from typing import Callable, Iterable, List, Optional, Tuple
+from .matcher import should_prompt_for_verification
+from .spatial_index import DockmasterIndex
+
+# Unix socket path for the binary match protocol; the server is off when unset
+MATCH_SOCKET_PATH = os.getenv("MATCH_SOCKET_PATH")
+
+# Every frame is a little-endian u32 payload length followed by the payload.
+#
+# Request:  u32 request_id, u16 map, i32 x, i32 y, f64 confidence_threshold
+# Response: u32 request_id, u8 status, u8 flags, f64 confidence,
+#           i32 dockmaster x, i32 dockmaster y, u16 zone ID length, zone ID (UTF-8)
+#
+# Responses come back in request order, so requests can be pipelined.
+FRAME_HEADER = struct.Struct("<I")
+REQUEST = struct.Struct("<IHiid")
+RESPONSE = struct.Struct("<IBBdiiH")
+
+STATUS_OK = 0
+STATUS_NO_MATCH = 1
+STATUS_BAD_REQUEST = 2
+STATUS_ERROR = 3
+
+FLAG_NEEDS_VERIFICATION = 1
+FLAG_TRANSITION = 2
+
+# Frames of the wrong length up to this size get a bad request response;
+# anything longer drops the connection
+MAX_FRAME_BYTES = 4096
+
+# Stop answering until the client reads once this much is waiting to be sent
+WRITE_BUFFER_BYTES = 64 * 1024
+
+def encode_request(request_id: int, x: int, y: int, map_id: int = 7, confidence_threshold: float = 0.8) -> bytes:
+    return FRAME_HEADER.pack(REQUEST.size) + REQUEST.pack(request_id, map_id, x, y, confidence_threshold)
+
+def encode_response(
+    request_id: int,
+    status: int,
+    flags: int = 0,
+    confidence: float = 0.0,
+    x: int = 0,
+    y: int = 0,
+    zone_id: str = ""
+) -> bytes:
+    zone = zone_id.encode("utf-8")
+    payload = RESPONSE.pack(request_id, status, flags, confidence, x, y, len(zone)) + zone
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+def decode_response(payload: bytes) -> dict:
+    request_id, status, flags, confidence, x, y, length = RESPONSE.unpack_from(payload)
+    zone_id = payload[RESPONSE.size:RESPONSE.size + length].decode("utf-8")
+    return {
+        "request_id": request_id,
+        "status": status,
+        "zone_id": zone_id if status == STATUS_OK else None,
+        "x": x,
+        "y": y,
+        "confidence": confidence,
+        "needs_verification": bool(flags & FLAG_NEEDS_VERIFICATION),
+        "transition": bool(flags & FLAG_TRANSITION)
+    }
+
+def _default_index(map_id: int) -> Optional[DockmasterIndex]:
+    # The index is shared with the HTTP API. Nothing here touches the database:
+    # after a refresh the previous index answers until the new one is built
+    from .dockmaster_cache import get_latest_dockmaster_index, schedule_index_build
+    index, current = get_latest_dockmaster_index(map_id)
+    if not current:
+        schedule_index_build()
+    return index
+
+def _build_default_indexes():
+    from database import SessionLocal
+    from .dockmaster_cache import get_dockmaster_index
+    db = SessionLocal()
+    try:
+        get_dockmaster_index(db)
+    finally:
+        db.close()
+
+def answer_request(payload: bytes, index_for: Callable[[int], Optional[DockmasterIndex]]) -> bytes:
+    """Response frame for one request payload, with the same answer as GET /match."""
+    if len(payload) != REQUEST.size:
+        # Echo the request ID when there is one, so pipelined responses still line up
+        request_id, = struct.unpack_from("<I", payload) if len(payload) >= 4 else (0,)
+        return encode_response(request_id, STATUS_BAD_REQUEST)
+    request_id, map_id, x, y, confidence_threshold = REQUEST.unpack(payload)
+    index = index_for(map_id)
+    if index is None:
+        # No index built yet
+        return encode_response(request_id, STATUS_ERROR)
+    try:
+        nearest, confidence = index.find_nearest(x, y)
+    except Exception as e:
+        print(f"Match socket request {request_id} failed: {e}")
+        return encode_response(request_id, STATUS_ERROR)
+    if nearest is None:
+        return encode_response(request_id, STATUS_NO_MATCH)
+
+    flags = FLAG_TRANSITION if nearest.transition_zone else 0
+    if should_prompt_for_verification(confidence, confidence_threshold):
+        flags |= FLAG_NEEDS_VERIFICATION
+    return encode_response(request_id, STATUS_OK, flags, confidence, nearest.x, nearest.y, nearest.zone_id)
+
+async def _serve_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, index_for: Callable[[int], Optional[DockmasterIndex]]):
+    try:
+        while True:
+            try:
+                length, = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+            except asyncio.IncompleteReadError:
+                break
+            if length > MAX_FRAME_BYTES:
+                break
+            writer.write(answer_request(await reader.readexactly(length), index_for))
+
+            # Writes go straight to the socket; only wait when a slow client lets them pile up
+            if writer.transport.get_write_buffer_size() > WRITE_BUFFER_BYTES:
+                await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+async def start_match_socket(
+    path: Optional[str] = None,
+    index_for: Callable[[int], Optional[DockmasterIndex]] = _default_index
+) -> Optional[asyncio.AbstractServer]:
+    """
+    Start the binary match server on a Unix socket (MATCH_SOCKET_PATH by
+    default). Only one process can serve a path, so with several server
+    workers every one but the first fails to start it.
+    """
+    path = path or MATCH_SOCKET_PATH
+    if not path:
+        return None
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except OSError:
+            # Left behind by a previous run; it would make bind fail
+            os.unlink(path)
+        else:
+            raise OSError(f"Match socket {path} is already being served by another process")
+        finally:
+            probe.close()
+    if index_for is _default_index:
+        # Answer from the first request on, without blocking the event loop meanwhile
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, _build_default_indexes)
+        except Exception as e:
+            print(f"Match socket index build failed, retrying in the background: {str(e)}")
+    server = await asyncio.start_unix_server(
+        lambda reader, writer: _serve_connection(reader, writer, index_for), path=path
+    )
+    print(f"Match socket listening on {path}")
+    return server
+
+async def stop_match_socket(server: Optional[asyncio.AbstractServer]):
+    if server is None:
+        return
+    paths = [sock.getsockname() for sock in server.sockets]
+    server.close()
+    await server.wait_closed()
+    for path in paths:
+        if isinstance(path, str) and os.path.exists(path):
+            os.unlink(path)
+
+# Requests a client sends before reading their responses
+PIPELINE_WINDOW = 512
+
+class MatchSocketClient:
+    """Blocking client for the match socket, for bots and scripts."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path or MATCH_SOCKET_PATH)
+        self._file = self.sock.makefile("rb")
+        self._next_id = 0
+
+    def _read_response(self) -> dict:
+        length, = FRAME_HEADER.unpack(self._file.read(FRAME_HEADER.size))
+        return decode_response(self._file.read(length))
+
+    def match_many(self, points: Iterable[Tuple[int, int]], map_id: int = 7, confidence_threshold: float = 0.8) -> List[dict]:
+        """Pipeline requests, PIPELINE_WINDOW at a time so neither side's buffers fill up."""
+        points = list(points)
+        results = []
+        for start in range(0, len(points), PIPELINE_WINDOW):
+            frames = []
+            for x, y in points[start:start + PIPELINE_WINDOW]:
+                self._next_id = (self._next_id + 1) & 0xFFFFFFFF
+                frames.append(encode_request(self._next_id, x, y, map_id, confidence_threshold))
+            self.sock.sendall(b"".join(frames))
+            results += [self._read_response() for _ in frames]
+        return results
+
+    def match(self, x: int, y: int, map_id: int = 7, confidence_threshold: float = 0.8) -> dict:
+        return self.match_many([(x, y)], map_id, confidence_threshold)[0]
+
+    def close(self):
+        self._file.close()
+        self.sock.close()
@@ -1,7 +1,7 @@
-import re
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from models import DockmasterEntry
 import math
+from .zone_ids import normalize_zone_id
 from .zone_validator import Point, get_zone_for_point, validate_dockmaster_match, is_transition_point
 
 # Regex pattern for both traditional and XD dockmasters (after formatting)
@@ -9,35 +9,14 @@ DOCKMASTER_ID_PATTERN = r"(?:\d+[A-Z]?-[NSEW]|XD\d+)"  # Note: XD format no long
 
 def format_dockmaster_id(zone_id: str) -> str:
     """Format a dockmaster ID to the standardized format."""
-    # Clean the input
-    zone_id = zone_id.strip().upper()
-    
-    # Handle XD format
-    xd_match = re.match(r"XD-?\s*(\d+)", zone_id, re.IGNORECASE)
-    if xd_match:
-        return f"XD{xd_match.group(1)}"  # Format as XD1, XD2, etc. without hyphen
-    
-    # Handle regular format (e.g., 1A-S, 1AS)
-    regular_match = re.match(r"(\d+)([A-Z])?-?([NSEW])", zone_id)
-    if regular_match:
-        num, letter, direction = regular_match.groups()
-        return f"{num}{letter or ''}-{direction}"
-    
-    return zone_id
+    return normalize_zone_id(zone_id).zone_id
 
 def validate_dockmaster_id(zone_id: str) -> bool:
     """Validate a dockmaster ID against the allowed patterns."""
-    # Try to format the ID first
-    formatted_id = format_dockmaster_id(zone_id)
-    
-    # Handle XD zone format (allow one or two digits)
-    if re.match(r"XD\d{1,2}", formatted_id):
+    # Only XD and regular zone IDs can be matched to coordinates
+    if normalize_zone_id(zone_id).kind in ("xd", "regular"):
         return True
-    
-    # Handle regular zone IDs
-    if re.match(r"\d+[A-Z]?-[NSEW]", formatted_id):
-        return True
-        
+
     raise ValueError("Zone ID must be in format like '1A-S' or 'XD1' (caps and hyphens will be auto-formatted)")
 
 def calculate_distance(x1: int, y1: int, x2: int, y2: int) -> float:
@@ -48,30 +27,55 @@ def is_reference_point(entry: DockmasterEntry) -> bool:
     """Check if an entry is a reference-only point (e.g., contains 6142)."""
     return "6142" in str(entry.x) or "6142" in str(entry.y)
 
-def find_transition_zones(entries: List[DockmasterEntry], distance_threshold: int = 100) -> List[List[DockmasterEntry]]:
+def find_transition_zones(
+    entries: List[DockmasterEntry],
+    distance_threshold: int = 100,
+    map_id: Optional[int] = None
+) -> List[List[DockmasterEntry]]:
     """Identify potential transition zones based on proximity."""
+    # Only non-reference points inside a transition band can join a zone
+    candidates = [
+        i for i, entry in enumerate(entries)
+        if not is_reference_point(entry) and is_transition_point(Point(entry.x, entry.y), map_id=map_id)
+    ]
+
+    # Bucket candidates into a grid of threshold-sized cells, so every
+    # point within the threshold is in one of the 3x3 surrounding cells
+    cell_size = max(1, distance_threshold)
+    grid: Dict[Tuple[int, int], List[int]] = {}
+    for i in candidates:
+        grid.setdefault((entries[i].x // cell_size, entries[i].y // cell_size), []).append(i)
+
     zones = []
     processed = set()
 
-    for entry in entries:
-        if entry.zone_id in processed or is_reference_point(entry):
+    for i in candidates:
+        entry = entries[i]
+        if entry.zone_id in processed:
             continue
 
-        # Check if this point is in a transition zone
-        if is_transition_point(Point(entry.x, entry.y)):
-            zone = [entry]
-            for other in entries:
-                if other.zone_id == entry.zone_id or other.zone_id in processed or is_reference_point(other):
-                    continue
-
-                if is_transition_point(Point(other.x, other.y)):
-                    distance = calculate_distance(entry.x, entry.y, other.x, other.y)
-                    if distance <= distance_threshold:
-                        zone.append(other)
-
-            if len(zone) > 1:
-                zones.append(zone)
-                processed.update(e.zone_id for e in zone)
+        cell_x, cell_y = entry.x // cell_size, entry.y // cell_size
+        # Visit neighbours in input order so zones list members like a full scan would
+        neighbours = sorted(
+            j
+            for dx in (-1, 0, 1)
+            for dy in (-1, 0, 1)
+            for j in grid.get((cell_x + dx, cell_y + dy), ())
+        )
+
+        zone = [entry]
+        for j in neighbours:
+            other = entries[j]
+            if other.zone_id == entry.zone_id or other.zone_id in processed:
+                continue
+
+            distance = calculate_distance(entry.x, entry.y, other.x, other.y)
+            if distance <= distance_threshold:
+                zone.append(other)
+
+        if len(zone) > 1:
+            zones.append(zone)
+            processed.update(e.zone_id for e in zone)
 
     return zones
 
@@ -79,12 +83,17 @@ def find_nearest_dockmaster(
     x: int,
     y: int,
     entries: List[DockmasterEntry],
-    confidence_threshold: float = 0.8
+    confidence_threshold: float = 0.8,
+    map_id: Optional[int] = None
 ) -> Tuple[Optional[DockmasterEntry], float]:
     """
     Find the nearest dockmaster to given coordinates.
+    If map_id is given, only that map's dockmasters and zone layout are used.
     Returns (dockmaster, confidence_score).
     """
+    if map_id is not None:
+        entries = [e for e in entries if e.map == map_id]
+
     if not entries:
         return None, 0.0
 
@@ -94,9 +103,10 @@ def find_nearest_dockmaster(
         return None, 0.0
 
     point = Point(x, y)
+    zone = get_zone_for_point(point, map_id)
     
     # For coordinates in XD zone, only consider XD dockmasters
-    if 3000 <= x <= 5000 and 2000 <= y <= 4000:
+    if zone == "XD":
         # Filter to only XD dockmasters
         valid_entries = [e for e in filtered_entries if e.zone_id.startswith("XD")]
         if not valid_entries:
@@ -111,21 +121,11 @@ def find_nearest_dockmaster(
         return nearest, confidence
         
     # For other coordinates, proceed with normal zone matching
-    zone = get_zone_for_point(point)
     if not zone:
         return None, 0.0
 
-    # Filter out reference points and non-matching zone dockmasters
-    valid_entries = []
-    for entry in filtered_entries:  # Use filtered_entries instead of entries
-        # For XD zone coordinates, only allow XD dockmasters
-        if 3000 <= x <= 5000 and 2000 <= y <= 4000:
-            if entry.zone_id.startswith("XD"):
-                valid_entries.append(entry)
-        # For other zones, validate normally (excluding N dockmasters in XD zone)
-        elif not (entry.zone_id.endswith("-N") and 3000 <= x <= 5000 and 2000 <= y <= 4000):
-            if validate_dockmaster_match(point, entry.zone_id):
-                valid_entries.append(entry)
+    # Filter out non-matching zone dockmasters
+    valid_entries = [e for e in filtered_entries if validate_dockmaster_match(point, e.zone_id, map_id)]
 
     if not valid_entries:
         return None, 0.0
@@ -135,26 +135,44 @@ def find_nearest_dockmaster(
     distances.sort(key=lambda x: x[1])
 
     nearest, min_distance = distances[0]
-    
+    second_distance = distances[1][1] if len(distances) > 1 else None
+
+    # Check if this is in a transition zone
+    in_transition = is_transition_point(point, map_id=map_id)
+    confidence = calculate_match_confidence(zone, min_distance, second_distance, in_transition)
+    if in_transition:
+        nearest.transition_zone = f"transition_{zone}"
+
+    return nearest, confidence
+
+def calculate_match_confidence(
+    zone: str,
+    min_distance: float,
+    second_distance: Optional[float],
+    in_transition: bool
+) -> float:
+    """
+    Confidence for a zone match given the nearest and second-nearest
+    valid dockmaster distances (second_distance is None if there is only one).
+    """
     # Base confidence calculation
     confidence = 1.0
 
     # If there's more than one option, adjust confidence based on distances
-    if len(distances) > 1:
-        second_nearest, second_distance = distances[1]
-        distance_ratio = min_distance / second_distance
+    if second_distance is not None:
+        # Two dockmasters sitting exactly on the point leave the ratio undefined
+        distance_ratio = min_distance / second_distance if second_distance > 0 else 1.0
         confidence *= (1.0 - distance_ratio)
 
-    # Check if this is in a transition zone
-    if is_transition_point(point):
+    # Transition zones are less certain
+    if in_transition:
         confidence *= 0.8
-        nearest.transition_zone = f"transition_{zone}"
 
     # Extra confidence reduction for XD zone matches
     if zone == "XD":
         confidence *= 0.9  # Be a bit more conservative with XD matches
 
-    return nearest, confidence
+    return confidence
 
 def should_prompt_for_verification(confidence: float, threshold: float = 0.8) -> bool:
     """Determine if human verification is needed based on confidence score."""
@@ -0,0 +1,143 @@
+from typing import List, Optional, Tuple
+import numpy as np
+from models import DockmasterEntry
+from .dockmaster_store import FLAG_ACTIVE, FLAG_GRID, FLAG_REFERENCE, DockmasterStore
+from .zone_validator import DEFAULT_MAP, get_zone_lookup
+
+# Above this many dockmasters on a map the full distance matrix is not kept
+# (it grows with the square); routes then compute distances between their stops only
+MAX_GRAPH_DOCKMASTERS = 4000
+
+MAX_ROUTE_STOPS = 2000
+
+# Upper bound on 2-opt improvement passes over a route
+MAX_TWO_OPT_PASSES = 50
+
+def pairwise_distances(xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+    """Euclidean distance matrix between points, as float32."""
+    dx = xs[:, None].astype(np.float32) - xs[None, :].astype(np.float32)
+    dy = ys[:, None].astype(np.float32) - ys[None, :].astype(np.float32)
+    return np.sqrt(dx * dx + dy * dy)
+
+class DistanceGraph:
+    """
+    Complete distance graph over one map's active dockmasters (reference
+    points and M# grid locations left out, like GET /api/dockmasters/).
+    Nodes are numbered in store row order.
+    """
+
+    def __init__(self, store: DockmasterStore, map_id: int = DEFAULT_MAP):
+        self.store = store
+        self.map_id = map_id
+        self.rows = store.rows(map_id, require=FLAG_ACTIVE, exclude=FLAG_REFERENCE | FLAG_GRID)
+        self.xs = store.xs[self.rows].astype(np.int64)
+        self.ys = store.ys[self.rows].astype(np.int64)
+        self.zone_ids = [store.zone_id(row) for row in self.rows.tolist()]
+        self.matrix = pairwise_distances(self.xs, self.ys) if len(self.rows) <= MAX_GRAPH_DOCKMASTERS else None
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def entry(self, node: int) -> DockmasterEntry:
+        return self.store.entry(int(self.rows[node]))
+
+    def nodes_for_zone_ids(self, zone_ids: List[str]) -> Tuple[List[int], List[str]]:
+        """Nodes of the given dockmaster zone IDs, and the zone IDs that have none."""
+        by_zone_id = {}
+        for node, zone_id in enumerate(self.zone_ids):
+            by_zone_id.setdefault(zone_id, []).append(node)
+        nodes, missing = [], []
+        for zone_id in dict.fromkeys(zone_ids):
+            if zone_id in by_zone_id:
+                nodes += by_zone_id[zone_id]
+            else:
+                missing.append(zone_id)
+        return nodes, missing
+
+    def nodes_in_zone(self, zone: str) -> List[int]:
+        """Nodes located inside a map zone (e.g. "SOUTH")."""
+        lookup = get_zone_lookup(self.map_id)
+        codes = lookup.zone_codes_for(self.xs, self.ys)
+        return np.flatnonzero(codes == lookup.names.index(zone)).tolist()
+
+    def distances(self, nodes: List[int]) -> np.ndarray:
+        """Distance matrix between the given nodes, from the precomputed graph when there is one."""
+        nodes = np.asarray(nodes, dtype=np.int64)
+        if self.matrix is not None:
+            return self.matrix[np.ix_(nodes, nodes)].astype(np.float64)
+        return pairwise_distances(self.xs[nodes], self.ys[nodes]).astype(np.float64)
+
+def nearest_neighbour_order(dist: np.ndarray) -> List[int]:
+    """Greedy path over every node of a distance matrix, starting at node 0."""
+    n = len(dist)
+    visited = np.zeros(n, dtype=bool)
+    order = [0]
+    visited[0] = True
+    for _ in range(n - 1):
+        row = np.where(visited, np.inf, dist[order[-1]])
+        nxt = int(np.argmin(row))
+        order.append(nxt)
+        visited[nxt] = True
+    return order
+
+def two_opt(dist: np.ndarray, order: List[int]) -> List[int]:
+    """
+    Improve an open path by reversing segments while that shortens it. The
+    first node stays fixed; the last one may change.
+    """
+    path = np.array(order, dtype=np.int64)
+    n = len(path)
+    for _ in range(MAX_TWO_OPT_PASSES):
+        improved = False
+        for i in range(1, n - 1):
+            # Reverse path[i..j] for every j > i at once: edges (a, b) and (c, d) become (a, c) and (b, d)
+            a, b = path[i - 1], path[i]
+            c = path[i + 1:]
+            d = np.append(path[i + 2:], -1)
+            has_d = d >= 0
+            d_safe = np.where(has_d, d, 0)
+            gain = dist[a, b] + np.where(has_d, dist[c, d_safe], 0.0) - dist[a, c] - np.where(has_d, dist[b, d_safe], 0.0)
+            best = int(np.argmax(gain))
+            if gain[best] > 1e-9:
+                j = i + 1 + best
+                path[i:j + 1] = path[i:j + 1][::-1].copy()
+                improved = True
+        if not improved:
+            break
+    return path.tolist()
+
+def plan_route(graph: DistanceGraph, nodes: List[int], start: Optional[Tuple[int, int]] = None) -> dict:
+    """
+    Near-optimal order to visit the given nodes (nearest neighbour, then
+    2-opt), beginning as close to start as possible if one is given.
+    """
+    nodes = list(dict.fromkeys(nodes))
+    n = len(nodes)
+
+    # Node 0 of the working matrix is the start point, or a free start at distance 0 from every stop
+    dist = np.zeros((n + 1, n + 1))
+    dist[1:, 1:] = graph.distances(nodes)
+    if start is not None:
+        idx = np.asarray(nodes, dtype=np.int64)
+        dist[0, 1:] = dist[1:, 0] = np.hypot(graph.xs[idx] - start[0], graph.ys[idx] - start[1])
+
+    order = two_opt(dist, nearest_neighbour_order(dist)) if n else [0]
+
+    stops = []
+    total = 0.0
+    for position, k in enumerate(order[1:], 1):
+        leg = float(dist[order[position - 1], k]) if start is not None or position > 1 else 0.0
+        total += leg
+        stops.append({
+            "order": position,
+            "match": graph.entry(nodes[k - 1]),
+            "leg_distance": round(leg, 2),
+            "distance_so_far": round(total, 2)
+        })
+    return {
+        "map": graph.map_id,
+        "start": {"x": start[0], "y": start[1]} if start is not None else None,
+        "count": n,
+        "total_distance": round(total, 2),
+        "stops": stops
+    }
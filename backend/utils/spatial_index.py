@@ -0,0 +1,205 @@
+import heapq
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from models import DockmasterEntry
+from .matcher import calculate_distance, calculate_match_confidence
+from .dockmaster_store import FLAG_ENABLED, FLAG_REFERENCE, FLAG_XD, DockmasterStore, StoreEntries
+from .zone_validator import Point, DEFAULT_MAP, get_zone_layout, get_zone_for_point, is_transition_point
+
+class KDTree:
+    """
+    Static 2-d tree over integer points.
+    Query results are ordered by (squared distance, insertion order), which is
+    the same order a stable sort of a linear scan would give.
+    """
+
+    def __init__(self, points: Sequence[Tuple[int, int]]):
+        self.xs = [p[0] for p in points]
+        self.ys = [p[1] for p in points]
+        size = len(self.xs)
+        self._left = [-1] * size
+        self._right = [-1] * size
+        self._axis = [0] * size
+        self._root = self._build(list(range(size)), 0)
+
+    def __len__(self) -> int:
+        return len(self.xs)
+
+    def _build(self, indices: List[int], depth: int) -> int:
+        if not indices:
+            return -1
+        axis = depth % 2
+        coords = self.xs if axis == 0 else self.ys
+        indices.sort(key=lambda i: (coords[i], i))
+        middle = len(indices) // 2
+        node = indices[middle]
+        self._axis[node] = axis
+        self._left[node] = self._build(indices[:middle], depth + 1)
+        self._right[node] = self._build(indices[middle + 1:], depth + 1)
+        return node
+
+    def nearest(self, x: int, y: int, k: int = 1) -> List[Tuple[int, int]]:
+        """Return up to k (squared distance, point index) pairs, closest first."""
+        if k <= 0 or self._root < 0:
+            return []
+        xs, ys = self.xs, self.ys
+        left, right, axes = self._left, self._right, self._axis
+        # Max-heap of the best k so far, keyed on (-d2, -index)
+        heap: List[Tuple[int, int]] = []
+
+        def visit(node: int):
+            px, py = xs[node], ys[node]
+            d2 = (px - x) ** 2 + (py - y) ** 2
+            item = (-d2, -node)
+            if len(heap) < k:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+
+            diff = x - px if axes[node] == 0 else y - py
+            near, far = (left[node], right[node]) if diff < 0 else (right[node], left[node])
+            if near >= 0:
+                visit(near)
+            if far >= 0 and (len(heap) < k or diff * diff <= -heap[0][0]):
+                visit(far)
+
+        visit(self._root)
+        return sorted((-d2, -node) for d2, node in heap)
+
+    def within(self, x: int, y: int, radius: float) -> List[Tuple[int, int]]:
+        """Return every (squared distance, point index) pair within radius, closest first."""
+        if radius < 0 or self._root < 0:
+            return []
+        xs, ys = self.xs, self.ys
+        left, right, axes = self._left, self._right, self._axis
+        r2 = radius * radius
+        found: List[Tuple[int, int]] = []
+        stack = [self._root]
+
+        while stack:
+            node = stack.pop()
+            px, py = xs[node], ys[node]
+            d2 = (px - x) ** 2 + (py - y) ** 2
+            if d2 <= r2:
+                found.append((d2, node))
+
+            diff = x - px if axes[node] == 0 else y - py
+            near, far = (left[node], right[node]) if diff < 0 else (right[node], left[node])
+            if near >= 0:
+                stack.append(near)
+            if far >= 0 and diff * diff <= r2:
+                stack.append(far)
+
+        found.sort()
+        return found
+
+class _Pool:
+    """One candidate pool of dockmasters with its own KD-tree and coordinate arrays."""
+
+    def __init__(self, store: DockmasterStore, rows: np.ndarray):
+        self.entries = store.entries(rows)
+        self.xs = store.xs[rows].astype(np.int64)
+        self.ys = store.ys[rows].astype(np.int64)
+        self.tree = KDTree(list(zip(self.xs.tolist(), self.ys.tolist())))
+
+class DockmasterIndex:
+    """
+    Nearest-dockmaster lookup for one map, built once per dataset load.
+
+    Entries are split into the same candidate pools find_nearest_dockmaster
+    filters down to: XD-prefixed IDs for the XD zone, and one pool per
+    direction suffix for the cardinal zones. A match then only has to query
+    the two closest points of a single pool.
+
+    Pools are built straight from DockmasterStore columns; entries can also
+    be given as a list, which is packed into a store first.
+    """
+
+    def __init__(self, entries: Sequence[DockmasterEntry], map_id: int = DEFAULT_MAP):
+        self.map_id = map_id
+        if isinstance(entries, StoreEntries):
+            store, rows = entries.store, entries.rows
+        else:
+            store = DockmasterStore.from_entries(entries)
+            rows = np.arange(len(store))
+
+        # Reference points (6142) are never match candidates
+        rows = rows[(store.flags[rows] & FLAG_REFERENCE) == 0]
+        self.entries = store.entries(rows)
+
+        xd_rows = rows[(store.flags[rows] & FLAG_XD) != 0]
+        self.xd_pool = _Pool(store, xd_rows) if len(xd_rows) else None
+
+        # Every candidate regardless of zone, for ranked neighbour queries
+        self.all_pool = _Pool(store, rows)
+
+        direction_codes = store.direction_codes[rows]
+        self.direction_pools = {
+            store.direction_names[code]: _Pool(store, rows[direction_codes == code])
+            for code in np.unique(direction_codes).tolist()
+        }
+
+    @classmethod
+    def from_store(cls, store: DockmasterStore, map_id: int = DEFAULT_MAP) -> "DockmasterIndex":
+        """Index over one map's enabled dockmasters in a store."""
+        return cls(store.entries(store.rows(map_id, require=FLAG_ENABLED)), map_id)
+
+    def pool_for_zone(self, zone: str) -> Optional[_Pool]:
+        """Candidate pool that can validly answer a point in the given zone."""
+        if zone == "XD":
+            return self.xd_pool
+        return self.direction_pools.get(get_zone_layout(self.map_id).zones[zone].primary_direction)
+
+    def find_nearest(self, x: int, y: int) -> Tuple[Optional[DockmasterEntry], float]:
+        """
+        Indexed equivalent of find_nearest_dockmaster(x, y, entries, map_id=map_id).
+        Returns (dockmaster, confidence_score).
+        """
+        if not self.entries:
+            return None, 0.0
+
+        point = Point(x, y)
+        zone = get_zone_for_point(point, self.map_id)
+        if not zone:
+            return None, 0.0
+
+        pool = self.pool_for_zone(zone)
+        if pool is None:
+            return None, 0.0
+
+        # For coordinates in XD zone, only consider XD dockmasters
+        if zone == "XD":
+            _, nearest_idx = pool.tree.nearest(x, y, 1)[0]
+            return pool.entries[nearest_idx], 0.9  # High confidence for XD zone matches
+
+        hits = pool.tree.nearest(x, y, 2)
+        nearest = pool.entries[hits[0][1]]
+        min_distance = calculate_distance(x, y, nearest.x, nearest.y)
+        second_distance = None
+        if len(hits) > 1:
+            second = hits[1][1]
+            second_distance = calculate_distance(x, y, pool.tree.xs[second], pool.tree.ys[second])
+
+        in_transition = is_transition_point(point, map_id=self.map_id)
+        confidence = calculate_match_confidence(zone, min_distance, second_distance, in_transition)
+        if in_transition:
+            # Entries are shared across requests, so tag a copy
+            nearest = nearest.model_copy(update={"transition_zone": f"transition_{zone}"})
+
+        return nearest, confidence
+
+    def nearest_candidates(self, x: int, y: int, k: int) -> List[Tuple[DockmasterEntry, float]]:
+        """The k closest dockmasters of any zone as (dockmaster, distance), closest first."""
+        entries = self.all_pool.entries
+        return [
+            (entries[i], calculate_distance(x, y, entries[i].x, entries[i].y))
+            for _, i in self.all_pool.tree.nearest(x, y, k)
+        ]
+
+    def candidates_within(self, x: int, y: int, radius: float) -> List[Tuple[DockmasterEntry, float]]:
+        """Dockmasters of any zone within radius as (dockmaster, distance), closest first."""
+        entries = self.all_pool.entries
+        return [
+            (entries[i], calculate_distance(x, y, entries[i].x, entries[i].y))
+            for _, i in self.all_pool.tree.within(x, y, radius)
+        ]
@@ -0,0 +1,114 @@
+import csv
+import json
+from typing import Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from models import DockmasterEntry
+from .batch_matcher import match_points
+from .matcher import should_prompt_for_verification
+from .spatial_index import DockmasterIndex
+
+# Points matched per chunk of a streamed upload; memory stays bounded by this
+STREAM_CHUNK_POINTS = 10000
+
+STREAM_FORMATS = ("csv", "ndjson")
+
+# (line number, x, y, error); x and y are None when the line couldn't be read
+ParsedLine = Tuple[int, Optional[int], Optional[int], Optional[str]]
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> str:
+    """Guess the upload format from its name or content type, defaulting to CSV."""
+    name = (filename or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in (content_type or "") or "jsonl" in (content_type or ""):
+        return "ndjson"
+    return "csv"
+
+def _parse_csv(lines: Iterable[str]) -> Iterator[ParsedLine]:
+    reader = csv.reader(lines)
+    x_column, y_column = 0, 1
+    first_row = True
+    for row in reader:
+        cells = [cell.strip() for cell in row]
+        if not any(cells):
+            continue
+
+        # Optional header naming the x and y columns
+        if first_row:
+            first_row = False
+            header = [cell.lower() for cell in cells]
+            if "x" in header and "y" in header:
+                x_column, y_column = header.index("x"), header.index("y")
+                continue
+
+        try:
+            yield reader.line_num, int(cells[x_column]), int(cells[y_column]), None
+        except (ValueError, IndexError):
+            yield reader.line_num, None, None, f"Expected integer x and y, got {row}"
+
+def _parse_ndjson(lines: Iterable[str]) -> Iterator[ParsedLine]:
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            x, y = record["x"], record["y"]
+            if type(x) is not int or type(y) is not int:
+                raise ValueError
+            yield line_number, x, y, None
+        except (ValueError, KeyError, TypeError):
+            yield line_number, None, None, "Expected an object with integer x and y"
+
+def parse_coordinate_lines(lines: Iterable[str], fmt: str) -> Iterator[ParsedLine]:
+    """Lazily read coordinates from CSV (x,y columns) or NDJSON ({"x": .., "y": ..}) lines."""
+    return _parse_ndjson(lines) if fmt == "ndjson" else _parse_csv(lines)
+
+def _match_chunk(index: DockmasterIndex, chunk: List[ParsedLine], confidence_threshold: float) -> str:
+    parsed = [item for item in chunk if item[3] is None]
+    xs = np.array([item[1] for item in parsed], dtype=np.int64)
+    ys = np.array([item[2] for item in parsed], dtype=np.int64)
+    matches, confidences = match_points(index, xs, ys)
+    return format_result_lines(chunk, matches, confidences, confidence_threshold)
+
+def format_result_lines(
+    chunk: List[ParsedLine],
+    matches: List[Optional[DockmasterEntry]],
+    confidences: np.ndarray,
+    confidence_threshold: float
+) -> str:
+    """NDJSON for parsed lines, given the matches of the lines without an error in order."""
+    results = iter(zip(matches, confidences.tolist()))
+
+    out = []
+    for line_number, x, y, error in chunk:
+        if error is not None:
+            out.append(json.dumps({"line": line_number, "error": error}))
+            continue
+        nearest, confidence = next(results)
+        out.append(json.dumps({
+            "line": line_number,
+            "x": x,
+            "y": y,
+            "match": nearest.model_dump() if nearest is not None else None,
+            "confidence": confidence,
+            "needs_verification": should_prompt_for_verification(confidence, confidence_threshold)
+        }))
+    return "\n".join(out) + "\n"
+
+def stream_match_results(
+    index: DockmasterIndex,
+    lines: Iterable[str],
+    fmt: str,
+    confidence_threshold: float = 0.8,
+    chunk_size: int = STREAM_CHUNK_POINTS
+) -> Iterator[str]:
+    """
+    Match coordinates read from lines chunk by chunk, yielding NDJSON with one
+    result (or error) per input line, in input order.
+    """
+    chunk: List[ParsedLine] = []
+    for item in parse_coordinate_lines(lines, fmt):
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield _match_chunk(index, chunk, confidence_threshold)
+            chunk = []
+    if chunk:
+        yield _match_chunk(index, chunk, confidence_threshold)
@@ -0,0 +1,136 @@
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from database import SuggestionDB
+from .dockmaster_store import DockmasterStore
+from .matcher import calculate_distance
+from .spatial_index import DockmasterIndex
+from .zone_audit import layout_fingerprint
+from .zone_validator import DEFAULT_MAP, Point, get_zone_for_point
+
+# Dataset the stored annotations of pending suggestions reflect: the store
+# and the zone layout fingerprint of every map annotated against it
+_lock = threading.Lock()
+_baseline: Optional[Tuple[DockmasterStore, Dict[int, str]]] = None
+
+def annotate_suggestion(db_suggestion: SuggestionDB, index: DockmasterIndex):
+    """
+    Store the nearest valid dockmaster, its distance, the detected zone and
+    the match confidence on an add suggestion (cleared for removals).
+
+    match_radius is how far out a dockmaster change can affect the result:
+    the second-nearest candidate (the nearest in XD, whose confidence is
+    fixed). NULL means any change on the map can.
+    """
+    db_suggestion.annotated_at = datetime.utcnow()
+    if db_suggestion.action != "add" or db_suggestion.x is None or db_suggestion.y is None:
+        db_suggestion.nearest_zone_id = None
+        db_suggestion.nearest_distance = None
+        db_suggestion.detected_zone = None
+        db_suggestion.match_confidence = None
+        db_suggestion.match_radius = None
+        return
+
+    x, y = db_suggestion.x, db_suggestion.y
+    zone = get_zone_for_point(Point(x, y), index.map_id)
+    nearest, confidence = index.find_nearest(x, y)
+    db_suggestion.detected_zone = zone
+    db_suggestion.nearest_zone_id = nearest.zone_id if nearest else None
+    db_suggestion.nearest_distance = round(calculate_distance(x, y, nearest.x, nearest.y), 2) if nearest else None
+    db_suggestion.match_confidence = confidence if nearest else None
+
+    pool = index.pool_for_zone(zone) if zone and index.entries else None
+    if zone is None:
+        # Outside every zone nothing matches, whatever the dockmasters
+        db_suggestion.match_radius = 0.0
+    elif pool is None:
+        db_suggestion.match_radius = None
+    else:
+        hits = pool.tree.nearest(x, y, 1 if zone == "XD" else 2)
+        if zone != "XD" and len(hits) < 2:
+            db_suggestion.match_radius = None
+        else:
+            _, i = hits[-1]
+            db_suggestion.match_radius = calculate_distance(x, y, pool.tree.xs[i], pool.tree.ys[i])
+
+def _store_rows(store: DockmasterStore) -> Counter:
+    return Counter(zip(
+        (store.zone_names[code] for code in store.zone_codes.tolist()),
+        store.xs.tolist(), store.ys.tolist(), store.maps.tolist(), store.flags.tolist()
+    ))
+
+def changed_points(old: DockmasterStore, new: DockmasterStore) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+    """Coordinates of the rows added, removed or changed between two stores, per map."""
+    old_rows, new_rows = _store_rows(old), _store_rows(new)
+    points: Dict[int, list] = {}
+    for _, x, y, map_id, _ in (old_rows - new_rows) + (new_rows - old_rows):
+        points.setdefault(map_id, []).append((x, y))
+    return {
+        map_id: (np.array([p[0] for p in pts], dtype=np.int64), np.array([p[1] for p in pts], dtype=np.int64))
+        for map_id, pts in points.items()
+    }
+
+def needs_reannotation(db_suggestion: SuggestionDB, changed: Dict[int, Tuple[np.ndarray, np.ndarray]]) -> bool:
+    """Whether a dockmaster change lies close enough to have changed a suggestion's annotations."""
+    map_id = db_suggestion.map or DEFAULT_MAP
+    if map_id not in changed:
+        return False
+    if db_suggestion.match_radius is None:
+        return True
+    xs, ys = changed[map_id]
+    distances = np.hypot(xs - db_suggestion.x, ys - db_suggestion.y)
+    return bool((distances <= db_suggestion.match_radius + 1e-6).any())
+
+def refresh_suggestion_annotations(db: Session) -> dict:
+    """
+    Bring the annotations of pending add suggestions up to date with the
+    current dataset. Only suggestions near a changed dockmaster, on a map
+    whose zones changed, or never annotated are recomputed; the first run
+    in a process only fills in missing annotations.
+    """
+    global _baseline
+    from .dockmaster_cache import get_dockmaster_index, get_dockmaster_store
+
+    with _lock:
+        store = get_dockmaster_store(db)
+        pending = db.query(SuggestionDB).filter(
+            SuggestionDB.status == "pending",
+            SuggestionDB.action == "add"
+        ).all()
+        maps = {s.map or DEFAULT_MAP for s in pending}
+        fingerprints = {map_id: layout_fingerprint(map_id) for map_id in maps}
+
+        changed = {}
+        if _baseline is not None and _baseline[0] is not store:
+            changed = changed_points(_baseline[0], store)
+
+        recomputed = 0
+        for db_suggestion in pending:
+            map_id = db_suggestion.map or DEFAULT_MAP
+            layout_changed = _baseline is not None and _baseline[1].get(map_id, fingerprints[map_id]) != fingerprints[map_id]
+            if db_suggestion.annotated_at is None or layout_changed or needs_reannotation(db_suggestion, changed):
+                annotate_suggestion(db_suggestion, get_dockmaster_index(db, map_id))
+                recomputed += 1
+        db.commit()
+
+        _baseline = (store, {**(_baseline[1] if _baseline else {}), **fingerprints})
+        return {"pending": len(pending), "recomputed": recomputed}
+
+def schedule_annotation_refresh():
+    """Refresh suggestion annotations in the background, e.g. after a dataset refresh."""
+    threading.Thread(target=_refresh_in_background, daemon=True).start()
+
+def _refresh_in_background():
+    from database import SessionLocal
+    db = SessionLocal()
+    try:
+        result = refresh_suggestion_annotations(db)
+        print(f"Suggestion annotations: {result['recomputed']} of {result['pending']} pending recomputed")
+    except Exception as e:
+        db.rollback()
+        print(f"Suggestion annotation refresh failed: {str(e)}")
+    finally:
+        db.close()
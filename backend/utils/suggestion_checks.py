@@ -0,0 +1,96 @@
+import os
+from typing import List, Optional, Tuple
+from sqlalchemy.orm import Session
+from database import DockmasterDB, SuggestionDB
+from models import DockmasterEntry
+from .dockmaster_cache import get_derived, get_dockmaster_store
+from .dockmaster_store import FLAG_ACTIVE, FLAG_REFERENCE, DockmasterStore
+from .matcher import calculate_distance
+from .spatial_index import KDTree
+
+# Adds within this many units of a dockmaster or pending add are flagged as possible duplicates
+DUPLICATE_DISTANCE = int(os.getenv("SUGGESTION_DUPLICATE_DISTANCE", "50"))
+
+class ActiveDockmasters:
+    """A map's active dockmasters, disabled ones included, with a KD-tree for duplicate checks."""
+
+    def __init__(self, store: DockmasterStore, map_id: int):
+        # Reference points (6142) mark the map, they aren't dockmasters
+        self.entries = store.entries(store.rows(map_id, require=FLAG_ACTIVE, exclude=FLAG_REFERENCE))
+        self.tree = KDTree([(entry.x, entry.y) for entry in self.entries])
+
+    def within(self, x: int, y: int, radius: float) -> List[Tuple[DockmasterEntry, float]]:
+        """(dockmaster, distance) pairs within radius, closest first."""
+        return [
+            (self.entries[i], calculate_distance(x, y, self.entries[i].x, self.entries[i].y))
+            for _, i in self.tree.within(x, y, radius)
+        ]
+
+def find_review_flags(
+    db: Session,
+    action: str,
+    zone_id: str,
+    x: Optional[int],
+    y: Optional[int],
+    map_id: int = 7,
+    exclude_id: Optional[str] = None
+) -> List[dict]:
+    """
+    Possible duplicates of a suggestion, for the reviewer: dockmasters and
+    pending adds within DUPLICATE_DISTANCE of an add, and for a removal a
+    zone ID that doesn't exist on the map or already has a pending removal.
+    Every lookup goes through a KD-tree or an indexed query. exclude_id
+    leaves a suggestion being edited out of the pending ones.
+    """
+    flags = []
+    if action == "add":
+        # Disabled dockmasters count too; an add on top of one is still a duplicate
+        active = get_derived(
+            db, "active_dockmasters", (), lambda index: ActiveDockmasters(get_dockmaster_store(db), map_id), map_id=map_id
+        )
+        for entry, distance in active.within(x, y, DUPLICATE_DISTANCE):
+            flags.append({
+                "type": "near_dockmaster",
+                "zone_id": entry.zone_id,
+                "x": entry.x,
+                "y": entry.y,
+                "distance": round(distance, 2)
+            })
+
+        # Bounding box first, so the (status, x, y) index narrows the rows
+        pending = db.query(SuggestionDB).filter(
+            SuggestionDB.status == "pending",
+            SuggestionDB.x.between(x - DUPLICATE_DISTANCE, x + DUPLICATE_DISTANCE),
+            SuggestionDB.y.between(y - DUPLICATE_DISTANCE, y + DUPLICATE_DISTANCE),
+            SuggestionDB.action == "add",
+            SuggestionDB.id != exclude_id
+        ).all()
+        for other in pending:
+            distance = calculate_distance(x, y, other.x, other.y)
+            if (other.map or 7) == map_id and distance <= DUPLICATE_DISTANCE:
+                flags.append({
+                    "type": "near_pending_suggestion",
+                    "suggestion_id": other.id,
+                    "zone_id": other.zone_id,
+                    "x": other.x,
+                    "y": other.y,
+                    "distance": round(distance, 2)
+                })
+    else:
+        exists = db.query(DockmasterDB.id).filter(
+            DockmasterDB.zone_id == zone_id,
+            DockmasterDB.map == map_id,
+            DockmasterDB.is_active == True
+        ).first()
+        if not exists:
+            flags.append({"type": "unknown_zone_id", "zone_id": zone_id})
+
+        pending = db.query(SuggestionDB.id).filter(
+            SuggestionDB.status == "pending",
+            SuggestionDB.zone_id == zone_id,
+            SuggestionDB.action == "remove",
+            SuggestionDB.id != exclude_id
+        ).all()
+        for other_id, in pending:
+            flags.append({"type": "duplicate_pending_removal", "suggestion_id": other_id, "zone_id": zone_id})
+    return flags
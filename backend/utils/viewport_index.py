@@ -0,0 +1,73 @@
+from typing import List, Optional
+import numpy as np
+from .dockmaster_store import FLAG_ACTIVE, FLAG_ENABLED, DockmasterStore
+from .zone_ids import list_sort_zone_id
+
+# Side of a grid cell in map units
+VIEWPORT_CELL_SIZE = 256
+
+class ViewportIndex:
+    """
+    The dockmasters GET /api/dockmasters/ lists (active, not a 6142
+    reference point, not an M# grid location), on one map or all of them,
+    already in list order, with a uniform grid over them for bounding-box
+    queries. Points are kept sorted by cell, row-major, so every row of
+    cells a box covers is one contiguous slice.
+    """
+
+    def __init__(self, store: DockmasterStore, map_id: Optional[int] = None):
+        rows = store.rows(map_id, require=FLAG_ACTIVE)
+        zone_ids = [store.zone_names[code] for code in store.zone_codes[rows].tolist()]
+        visible = (store.ys[rows] != 6142) & ~np.array([z[:1] in ("M", "m") for z in zone_ids], dtype=bool)
+        rows = rows[visible]
+
+        # List order: zone ID order, stable for equal keys
+        order = sorted(range(len(rows)), key=lambda i: list_sort_zone_id(store.zone_id(rows[i])))
+        rows = rows[np.array(order, dtype=np.int64)] if len(order) else rows
+        self.items = [
+            {
+                "zone_id": store.zone_id(row),
+                "x": int(store.xs[row]),
+                "y": int(store.ys[row]),
+                "map": int(store.maps[row]),
+                "enabled": bool(store.flags[row] & FLAG_ENABLED)
+            }
+            for row in rows.tolist()
+        ]
+        self.xs = store.xs[rows].astype(np.int64)
+        self.ys = store.ys[rows].astype(np.int64)
+
+        if len(rows):
+            self.min_cx, self.min_cy = int(self.xs.min() // VIEWPORT_CELL_SIZE), int(self.ys.min() // VIEWPORT_CELL_SIZE)
+            self.max_cx, self.max_cy = int(self.xs.max() // VIEWPORT_CELL_SIZE), int(self.ys.max() // VIEWPORT_CELL_SIZE)
+        else:
+            self.min_cx = self.min_cy = 0
+            self.max_cx = self.max_cy = -1
+        self.columns = self.max_cx - self.min_cx + 1
+        cells = self._cell_keys(self.xs // VIEWPORT_CELL_SIZE, self.ys // VIEWPORT_CELL_SIZE)
+        self.by_cell = np.argsort(cells, kind="stable")
+        self.cells = cells[self.by_cell]
+
+    def _cell_keys(self, cx: np.ndarray, cy: np.ndarray) -> np.ndarray:
+        return (cy - self.min_cy) * self.columns + (cx - self.min_cx)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def within(self, min_x: int, min_y: int, max_x: int, max_y: int) -> List[dict]:
+        """Dockmasters inside the box (edges included), in list order."""
+        cx0 = max(min_x // VIEWPORT_CELL_SIZE, self.min_cx)
+        cx1 = min(max_x // VIEWPORT_CELL_SIZE, self.max_cx)
+        cy0 = max(min_y // VIEWPORT_CELL_SIZE, self.min_cy)
+        cy1 = min(max_y // VIEWPORT_CELL_SIZE, self.max_cy)
+        if cx0 > cx1 or cy0 > cy1:
+            return []
+
+        cell_rows = np.arange(cy0, cy1 + 1, dtype=np.int64)
+        starts = np.searchsorted(self.cells, self._cell_keys(np.full(len(cell_rows), cx0), cell_rows), side="left")
+        stops = np.searchsorted(self.cells, self._cell_keys(np.full(len(cell_rows), cx1), cell_rows), side="right")
+        candidates = np.concatenate([self.by_cell[start:stop] for start, stop in zip(starts.tolist(), stops.tolist())])
+
+        xs, ys = self.xs[candidates], self.ys[candidates]
+        inside = candidates[(xs >= min_x) & (xs <= max_x) & (ys >= min_y) & (ys <= max_y)]
+        return [self.items[i] for i in np.sort(inside).tolist()]
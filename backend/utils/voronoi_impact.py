@@ -0,0 +1,412 @@
+import math
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from models import DockmasterEntry
+from .matcher import is_reference_point
+from .spatial_index import DockmasterIndex, _Pool
+from .zone_validator import get_dockmaster_direction, get_zone_layout, get_zone_lookup
+
+Polygon = List[Tuple[float, float]]
+
+# Super-triangle half size; every real coordinate must be well inside it
+SUPER_SIZE = 1 << 30
+MAX_COORDINATE = SUPER_SIZE >> 4
+
+# Sample budget per region when polygon zones force a sampled area estimate
+AREA_SAMPLES = 20000
+
+def _orient(a: Tuple[int, int], b: Tuple[int, int], x: int, y: int) -> int:
+    return (b[0] - a[0]) * (y - a[1]) - (b[1] - a[1]) * (x - a[0])
+
+def _in_circle(a: Tuple[int, int], b: Tuple[int, int], c: Tuple[int, int], x: int, y: int) -> bool:
+    """True if (x, y) is strictly inside the circumcircle of the CCW triangle abc."""
+    adx, ady = a[0] - x, a[1] - y
+    bdx, bdy = b[0] - x, b[1] - y
+    cdx, cdy = c[0] - x, c[1] - y
+    return (
+        (adx * adx + ady * ady) * (bdx * cdy - cdx * bdy)
+        - (bdx * bdx + bdy * bdy) * (adx * cdy - cdx * ady)
+        + (cdx * cdx + cdy * cdy) * (adx * bdy - bdx * ady)
+    ) > 0
+
+class Delaunay:
+    """
+    Incremental (Bowyer-Watson) Delaunay triangulation of integer points in
+    exact integer arithmetic. Vertices are point indexes; -1..-3 are the
+    corners of the super-triangle. A point at the same position as an
+    earlier one isn't inserted and is recorded in duplicates instead.
+    """
+
+    def __init__(self, xs: Iterable[int], ys: Iterable[int]):
+        self.points: Dict[int, Tuple[int, int]] = {
+            -1: (-SUPER_SIZE, -SUPER_SIZE), -2: (SUPER_SIZE, -SUPER_SIZE), -3: (0, SUPER_SIZE)
+        }
+        self.positions: Dict[Tuple[int, int], int] = {}
+        self.duplicates: Dict[int, int] = {}
+        self.triangles: Dict[int, Tuple[int, int, int]] = {}
+        # Directed edge (a, b) -> the triangle on its left
+        self._edges: Dict[Tuple[int, int], int] = {}
+        self._next_id = 0
+        self._last = self._add_triangle(-1, -2, -3)
+
+        for i, position in enumerate(zip(xs, ys)):
+            first = self.positions.get(position)
+            if first is not None:
+                self.duplicates[i] = first
+                continue
+            self.positions[position] = i
+            self.points[i] = position
+            self.insert(i)
+
+    def _add_triangle(self, a: int, b: int, c: int) -> int:
+        tid = self._next_id
+        self._next_id += 1
+        self.triangles[tid] = (a, b, c)
+        self._edges[a, b] = self._edges[b, c] = self._edges[c, a] = tid
+        return tid
+
+    def _locate(self, x: int, y: int) -> int:
+        """Triangle containing (x, y), by walking towards it from the last one created."""
+        tid = self._last if self._last in self.triangles else next(iter(self.triangles))
+        while True:
+            a, b, c = self.triangles[tid]
+            for u, v in ((a, b), (b, c), (c, a)):
+                if _orient(self.points[u], self.points[v], x, y) < 0:
+                    tid = self._edges[v, u]
+                    break
+            else:
+                return tid
+
+    def cavity(self, x: int, y: int) -> Tuple[Set[int], List[Tuple[int, int]]]:
+        """Triangles whose circumcircle contains (x, y), and the CCW edges bounding them."""
+        if abs(x) > MAX_COORDINATE or abs(y) > MAX_COORDINATE:
+            raise ValueError(f"Coordinates ({x}, {y}) are out of range")
+        start = self._locate(x, y)
+        bad = {start}
+        stack = [start]
+        while stack:
+            a, b, c = self.triangles[stack.pop()]
+            for u, v in ((a, b), (b, c), (c, a)):
+                other = self._edges.get((v, u))
+                if other is not None and other not in bad and _in_circle(*(self.points[w] for w in self.triangles[other]), x, y):
+                    bad.add(other)
+                    stack.append(other)
+
+        boundary = []
+        for tid in bad:
+            a, b, c = self.triangles[tid]
+            boundary += [(u, v) for u, v in ((a, b), (b, c), (c, a)) if self._edges.get((v, u)) not in bad]
+        return bad, boundary
+
+    def insert(self, i: int):
+        x, y = self.points[i]
+        bad, boundary = self.cavity(x, y)
+        for tid in bad:
+            a, b, c = self.triangles.pop(tid)
+            for edge in ((a, b), (b, c), (c, a)):
+                del self._edges[edge]
+        for u, v in boundary:
+            self._last = self._add_triangle(u, v, i)
+
+    def natural_neighbours(self, x: int, y: int) -> Set[int]:
+        """Points that would share a Delaunay edge with (x, y) if it were inserted."""
+        _, boundary = self.cavity(x, y)
+        return {u for u, _ in boundary if u >= 0}
+
+    def neighbours(self, i: int) -> Set[int]:
+        """Delaunay neighbours of an inserted point."""
+        if not hasattr(self, "_adjacency"):
+            self._adjacency: Dict[int, Set[int]] = {}
+            for a, b in self._edges:
+                if a >= 0 and b >= 0:
+                    self._adjacency.setdefault(a, set()).add(b)
+                    self._adjacency.setdefault(b, set()).add(a)
+        return self._adjacency.get(i, set())
+
+def _clip(polygon: Polygon, a: float, b: float, c: float) -> Polygon:
+    """Part of a convex polygon where a*x + b*y <= c."""
+    out: Polygon = []
+    for i, p in enumerate(polygon):
+        q = polygon[(i + 1) % len(polygon)]
+        fp = a * p[0] + b * p[1] - c
+        fq = a * q[0] + b * q[1] - c
+        if fp <= 0:
+            out.append(p)
+        if (fp < 0 < fq) or (fq < 0 < fp):
+            t = fp / (fp - fq)
+            out.append((p[0] + t * (q[0] - p[0]), p[1] + t * (q[1] - p[1])))
+    return out if len(out) >= 3 else []
+
+def _clip_closer(polygon: Polygon, site: Tuple[int, int], rival: Tuple[int, int]) -> Polygon:
+    """Part of a convex polygon at least as close to site as to rival."""
+    return _clip(
+        polygon,
+        2 * (rival[0] - site[0]),
+        2 * (rival[1] - site[1]),
+        rival[0] ** 2 + rival[1] ** 2 - site[0] ** 2 - site[1] ** 2
+    )
+
+def _polygon_area(polygon: Polygon) -> float:
+    return abs(sum(
+        p[0] * q[1] - q[0] * p[1] for p, q in zip(polygon, polygon[1:] + polygon[:1])
+    )) / 2
+
+def _owned_region(
+    pool: _Pool,
+    site: Tuple[int, int],
+    rivals: Iterable[int],
+    region: Polygon,
+    excluded: Set[int]
+) -> Tuple[Polygon, Set[int]]:
+    """
+    The part of region at least as close to site as to any pool member not in
+    excluded, and the members it was clipped against. Rivals (Delaunay
+    neighbours) bound it to start with; any member found strictly closer at
+    one of its vertices is added and the region clipped again, so the result
+    is exact even where the triangulation isn't.
+    """
+    positions = list(zip(pool.tree.xs, pool.tree.ys))
+    rivals = {r for r in rivals if r not in excluded and positions[r] != site}
+    while True:
+        polygon = region
+        for r in rivals:
+            polygon = _clip_closer(polygon, site, positions[r])
+            if not polygon:
+                return [], rivals
+
+        missing = set()
+        for vx, vy in polygon:
+            d2 = (vx - site[0]) ** 2 + (vy - site[1]) ** 2
+            for other_d2, r in pool.tree.within(vx, vy, math.sqrt(d2)):
+                if other_d2 < d2 - 1e-9 * d2 - 1e-6 and r not in excluded and r not in rivals:
+                    missing.add(r)
+        if not missing:
+            return polygon, rivals
+        rivals |= missing
+
+class ImpactAnalyzer:
+    """
+    Which part of a map changes its nearest dockmaster when one is added or
+    removed. Each candidate pool keeps a Delaunay triangulation, built once
+    per dataset version, whose neighbours bound the Voronoi cell involved;
+    the cell is then split between the dockmasters that gain or lose it.
+    """
+
+    def __init__(self, index: DockmasterIndex):
+        self.index = index
+        self.map_id = index.map_id
+        self.layout = get_zone_layout(index.map_id)
+        self.lookup = get_zone_lookup(index.map_id)
+        self._triangulations: Dict[int, Delaunay] = {}
+
+        # Elementary cells of the zone table with the zone that wins there
+        bx, by = self.lookup.x_slots.breakpoints, self.lookup.y_slots.breakpoints
+        columns = self.lookup.y_slots.count
+        self._cells = [
+            (self.lookup.resolved[2 * i * columns + 2 * j], bx[i - 1], bx[i], by[j - 1], by[j])
+            for i in range(1, len(bx)) for j in range(1, len(by))
+        ]
+
+    def _triangulation(self, pool: _Pool) -> Delaunay:
+        triangulation = self._triangulations.get(id(pool))
+        if triangulation is None:
+            triangulation = self._triangulations[id(pool)] = Delaunay(pool.tree.xs, pool.tree.ys)
+        return triangulation
+
+    def _pools_for(self, zone_id: str) -> List[Tuple[Optional[_Pool], List[str]]]:
+        """Candidate pools a dockmaster ID belongs to, with the zones each pool answers."""
+        pools = []
+        if zone_id.startswith("XD") and "XD" in self.layout.zones:
+            pools.append((self.index.xd_pool, ["XD"]))
+        direction = get_dockmaster_direction(zone_id)
+        served = [name for name, zone in self.layout.zones.items() if name != "XD" and zone.primary_direction == direction]
+        if served:
+            pools.append((self.index.direction_pools.get(direction), served))
+        return pools
+
+    def _extent(self, served: List[str]) -> Polygon:
+        xs, ys = [], []
+        for name in served:
+            zone = self.layout.zones[name]
+            for r in zone.regions:
+                xs += [r.min_x, r.max_x]
+                ys += [r.min_y, r.max_y]
+            for polygon in zone.polygons:
+                xs += [x for x, _ in polygon.vertices]
+                ys += [y for _, y in polygon.vertices]
+        return [(min(xs), min(ys)), (max(xs), min(ys)), (max(xs), max(ys)), (min(xs), max(ys))]
+
+    def _zone_areas(self, polygon: Polygon, served: List[str]) -> Dict[str, float]:
+        """Area of a convex polygon inside each served zone."""
+        areas: Dict[str, float] = {}
+        if not polygon:
+            return areas
+
+        if not self.lookup.polygons:
+            for zone, x0, x1, y0, y1 in self._cells:
+                if zone not in served:
+                    continue
+                part = polygon
+                for a, b, c in ((1, 0, x1), (-1, 0, -x0), (0, 1, y1), (0, -1, -y0)):
+                    part = _clip(part, a, b, c)
+                    if not part:
+                        break
+                if part:
+                    areas[zone] = areas.get(zone, 0.0) + _polygon_area(part)
+            return areas
+
+        # Polygon zones aren't in the cell table; estimate from a sample grid over the region
+        xs = [p[0] for p in polygon]
+        ys = [p[1] for p in polygon]
+        step = max(1.0, math.sqrt((max(xs) - min(xs)) * (max(ys) - min(ys)) / AREA_SAMPLES))
+        gx, gy = np.meshgrid(np.arange(min(xs) + step / 2, max(xs), step), np.arange(min(ys) + step / 2, max(ys), step))
+        gx, gy = gx.ravel(), gy.ravel()
+        inside = np.ones(len(gx), dtype=bool)
+        for (px, py), (qx, qy) in zip(polygon, polygon[1:] + polygon[:1]):
+            inside &= (qx - px) * (gy - py) - (qy - py) * (gx - px) >= 0
+        codes = self.lookup.zone_codes_for(gx[inside], gy[inside])
+        for name in served:
+            count = int((codes == self.lookup.names.index(name)).sum())
+            if count:
+                areas[name] = count * step * step
+        return areas
+
+    def _region(self, polygon: Polygon, served: List[str]) -> dict:
+        zones = self._zone_areas(polygon, served)
+        return {
+            "polygon": [[round(float(x), 2), round(float(y), 2)] for x, y in polygon],
+            "area": sum(zones.values()),
+            "zones": zones
+        }
+
+    def _result(self, regions: List[dict], dockmasters: List[dict]) -> dict:
+        zones: Dict[str, float] = {}
+        for region in regions:
+            for name, area in region["zones"].items():
+                zones[name] = zones.get(name, 0.0) + area
+        for item in regions + dockmasters:
+            item["area"] = round(item["area"], 1)
+        for region in regions:
+            region["zones"] = {name: round(area, 1) for name, area in region["zones"].items()}
+        return {
+            "affected_area": round(sum(zones.values()), 1),
+            "zones": {name: round(area, 1) for name, area in zones.items()},
+            "regions": regions,
+            "dockmasters": dockmasters,
+            # Areas are sampled rather than exact where the map has polygon zones
+            "estimated": bool(self.lookup.polygons)
+        }
+
+    def _shares(
+        self,
+        pool: _Pool,
+        cell: Polygon,
+        candidates: Set[int],
+        excluded: Set[int],
+        served: List[str]
+    ) -> Dict[int, float]:
+        """How much of a cell each candidate would be (or was) nearest for."""
+        positions = list(zip(pool.tree.xs, pool.tree.ys))
+        # Of members sharing a position, the first one wins ties
+        first = {}
+        for i in sorted(candidates - excluded):
+            first.setdefault(positions[i], i)
+
+        shares = {}
+        for position, i in first.items():
+            part, _ = _owned_region(pool, position, set(first.values()), cell, excluded)
+            area = sum(self._zone_areas(part, served).values())
+            if area > 0:
+                shares[i] = area
+        return shares
+
+    def analyze_add(self, zone_id: str, x: int, y: int, enabled: bool = True) -> dict:
+        """Area that would match a new dockmaster at (x, y), and who it is taken from."""
+        entry = DockmasterEntry(zone_id=zone_id, x=x, y=y, map=self.map_id, enabled=enabled)
+        regions, dockmasters = [], []
+        # Disabled entries and reference points never match
+        if not enabled or is_reference_point(entry):
+            return self._result(regions, dockmasters)
+
+        site = (x, y)
+        losers: Dict[Tuple[str, int, int], float] = {}
+        for pool, served in self._pools_for(zone_id):
+            region = self._extent(served)
+            if pool is None:
+                # First dockmaster of its direction: it takes the whole zone
+                regions.append(self._region(region, served))
+                continue
+
+            triangulation = self._triangulation(pool)
+            if site in triangulation.positions:
+                # An existing dockmaster on the same spot keeps winning ties
+                continue
+            cell, rivals = _owned_region(pool, site, triangulation.natural_neighbours(x, y), region, set())
+            if not cell:
+                continue
+            regions.append(self._region(cell, served))
+
+            # Everything in the new cell was nearest to one of its natural neighbours
+            for i, area in self._shares(pool, cell, rivals, set(), served).items():
+                loser = pool.entries[i]
+                key = (loser.zone_id, loser.x, loser.y)
+                losers[key] = losers.get(key, 0.0) + area
+
+        total = sum(region["area"] for region in regions)
+        if total > 0:
+            dockmasters.append({"zone_id": zone_id, "x": x, "y": y, "change": "added", "area": total})
+        dockmasters += [
+            {"zone_id": key[0], "x": key[1], "y": key[2], "change": "loses", "area": area}
+            for key, area in sorted(losers.items(), key=lambda item: -item[1])
+        ]
+        return self._result(regions, dockmasters)
+
+    def analyze_remove(self, zone_id: str) -> dict:
+        """Area currently matching dockmasters with this ID, and who would take it over."""
+        regions, dockmasters = [], []
+        removed_areas: Dict[Tuple[str, int, int], float] = {}
+        gainers: Dict[Tuple[str, int, int], float] = {}
+        for pool, served in self._pools_for(zone_id):
+            if pool is None:
+                continue
+            removed = {i for i, entry in enumerate(pool.entries) if entry.zone_id == zone_id}
+            if not removed:
+                continue
+
+            triangulation = self._triangulation(pool)
+            region = self._extent(served)
+            cells = []
+            # The area of removed cells goes to members whose cells touch them:
+            # Delaunay neighbours, or a member at the same position
+            candidates: Set[int] = set()
+            for i in sorted(removed):
+                # Later duplicates of a position never win, so they have no cell
+                if i in triangulation.duplicates:
+                    continue
+                cell, rivals = _owned_region(pool, triangulation.points[i], triangulation.neighbours(i), region, set())
+                candidates |= rivals
+                candidates |= {j for j, first in triangulation.duplicates.items() if first == i}
+                described = self._region(cell, served) if cell else None
+                if described and described["area"] > 0:
+                    cells.append((i, cell, described))
+
+            for i, cell, described in cells:
+                regions.append(described)
+                entry = pool.entries[i]
+                key = (entry.zone_id, entry.x, entry.y)
+                removed_areas[key] = removed_areas.get(key, 0.0) + described["area"]
+
+                for j, area in self._shares(pool, cell, candidates, removed, served).items():
+                    gainer = pool.entries[j]
+                    key = (gainer.zone_id, gainer.x, gainer.y)
+                    gainers[key] = gainers.get(key, 0.0) + area
+
+        dockmasters += [
+            {"zone_id": key[0], "x": key[1], "y": key[2], "change": "removed", "area": area}
+            for key, area in removed_areas.items()
+        ]
+        dockmasters += [
+            {"zone_id": key[0], "x": key[1], "y": key[2], "change": "gains", "area": area}
+            for key, area in sorted(gainers.items(), key=lambda item: -item[1])
+        ]
+        return self._result(regions, dockmasters)
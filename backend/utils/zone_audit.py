@@ -0,0 +1,149 @@
+import hashlib
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from sqlalchemy.orm import Session
+from database import DockmasterAuditDB
+from .dockmaster_store import FLAG_ACTIVE, FLAG_GRID, FLAG_REFERENCE
+from .zone_validator import get_zone_layout, zone_match_issue
+
+# Rows deleted per statement, below SQLite's bound parameter limit
+DELETE_BATCH = 500
+
+_run_lock = threading.Lock()
+_last_run: Optional[dict] = None
+
+def layout_fingerprint(map_id: int) -> str:
+    """Hash of a map's zone layout; stored results are only reused while it is unchanged."""
+    layout = get_zone_layout(map_id)
+    parts = [repr(layout.priority)]
+    for name, zone in sorted(layout.zones.items()):
+        parts.append(repr((
+            name,
+            zone.primary_direction,
+            [(r.min_x, r.max_x, r.min_y, r.max_y) for r in zone.regions],
+            [polygon.vertices for polygon in zone.polygons]
+        )))
+    return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()
+
+def audit_points(zone_ids: Sequence[str], xs: np.ndarray, ys: np.ndarray, map_id: int) -> List[dict]:
+    """
+    validate_dockmaster_match(Point(x, y), zone_id, map_id) for many
+    dockmasters at once, with the zone each one sits in and why it fails.
+    """
+    layout = get_zone_layout(map_id)
+    lookup = layout.lookup
+    zone_codes = lookup.zone_codes_for(np.asarray(xs), np.asarray(ys)).tolist()
+    results = []
+    for zone_id, code in zip(zone_ids, zone_codes):
+        zone = lookup.names[code] if code >= 0 else None
+        # The same rule /match validates with
+        issue = zone_match_issue(zone, zone_id, map_id)
+        detail = None
+        if issue == "outside_zones":
+            detail = f"{zone_id} is outside every zone"
+        elif issue == "not_xd_in_xd":
+            detail = f"{zone_id} sits inside XD bounds but is not an XD dockmaster"
+        elif issue == "xd_outside_xd":
+            detail = f"{zone_id} sits in {zone}, outside XD bounds"
+        elif issue == "wrong_direction":
+            detail = f"{zone_id} sits in {zone}, which expects -{layout.zones[zone].primary_direction} dockmasters"
+        results.append({"zone": zone, "valid": issue is None, "issue": issue, "detail": detail})
+    return results
+
+def run_zone_audit(db: Session, full: bool = False) -> dict:
+    """
+    Check every active dockmaster against its zone and store the results.
+    Rows already stored for the same zone ID, coordinates, map and zone
+    layout are kept as they are unless full is set, so after a refresh only
+    new or moved dockmasters are checked.
+    """
+    global _last_run
+    from .dockmaster_cache import get_versioned_dockmaster_store
+
+    with _run_lock:
+        started = time.time()
+        version, store = get_versioned_dockmaster_store(db)
+        rows = store.rows(require=FLAG_ACTIVE, exclude=FLAG_REFERENCE | FLAG_GRID)
+
+        current: Dict[tuple, int] = {}
+        for row, zone_code, x, y, map_id in zip(
+            rows.tolist(), store.zone_codes[rows].tolist(), store.xs[rows].tolist(),
+            store.ys[rows].tolist(), store.maps[rows].tolist()
+        ):
+            current.setdefault((store.zone_names[zone_code], x, y, map_id), row)
+        fingerprints = {map_id: layout_fingerprint(map_id) for map_id in {key[3] for key in current}}
+
+        stale = []
+        kept = set()
+        for record in db.query(
+            DockmasterAuditDB.id, DockmasterAuditDB.zone_id, DockmasterAuditDB.x,
+            DockmasterAuditDB.y, DockmasterAuditDB.map, DockmasterAuditDB.layout_key
+        ):
+            key = (record.zone_id, record.x, record.y, record.map)
+            if full or key not in current or key in kept or record.layout_key != fingerprints[record.map]:
+                stale.append(record.id)
+            else:
+                kept.add(key)
+        for start in range(0, len(stale), DELETE_BATCH):
+            db.query(DockmasterAuditDB).filter(
+                DockmasterAuditDB.id.in_(stale[start:start + DELETE_BATCH])
+            ).delete(synchronize_session=False)
+
+        pending = [key for key in current if key not in kept]
+        checked_at = datetime.utcnow()
+        for map_id in sorted({key[3] for key in pending}):
+            keys = [key for key in pending if key[3] == map_id]
+            results = audit_points(
+                [key[0] for key in keys],
+                np.array([key[1] for key in keys], dtype=np.int64),
+                np.array([key[2] for key in keys], dtype=np.int64),
+                map_id
+            )
+            db.bulk_insert_mappings(DockmasterAuditDB, [
+                {
+                    "zone_id": zone_id, "x": x, "y": y, "map": map_id,
+                    "layout_key": fingerprints[map_id], "checked_at": checked_at, **result
+                }
+                for (zone_id, x, y, _), result in zip(keys, results)
+            ])
+        db.commit()
+
+        by_issue = {}
+        for issue, in db.query(DockmasterAuditDB.issue).filter(DockmasterAuditDB.valid == False):
+            by_issue[issue] = by_issue.get(issue, 0) + 1
+        _last_run = {
+            "dataset_version": version,
+            "full": full,
+            "total": len(current),
+            "checked": len(pending),
+            "reused": len(kept),
+            "removed": len(stale),
+            "issues": sum(by_issue.values()),
+            "by_issue": by_issue,
+            "seconds": round(time.time() - started, 3),
+            "finished_at": checked_at.isoformat()
+        }
+        return _last_run
+
+def get_last_audit_run() -> Optional[dict]:
+    """Summary of the most recent audit run in this process."""
+    return _last_run
+
+def schedule_zone_audit(full: bool = False):
+    """Run the audit in the background, e.g. after a refresh; runs queue behind each other."""
+    threading.Thread(target=_audit_in_background, args=(full,), daemon=True).start()
+
+def _audit_in_background(full: bool):
+    from database import SessionLocal
+    db = SessionLocal()
+    try:
+        summary = run_zone_audit(db, full)
+        print(f"Zone audit: {summary['checked']} checked, {summary['reused']} unchanged, {summary['issues']} issues")
+    except Exception as e:
+        db.rollback()
+        print(f"Zone audit failed: {str(e)}")
+    finally:
+        db.close()
@@ -0,0 +1,56 @@
+from typing import Dict, Iterable, List
+from .dockmaster_store import FLAG_ACTIVE, DockmasterStore
+from .zone_ids import normalize_zone_id, sort_zone_id
+
+# Most matches a lookup can return; every trie node keeps this many
+MAX_AUTOCOMPLETE_MATCHES = 50
+
+def autocomplete_key(text: str) -> str:
+    """Upper-cased letters and digits only, so "1a-s", "1AS" and "1A-S" are the same prefix."""
+    return "".join(ch for ch in text.upper() if ch.isalnum())
+
+class _Node:
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.top: List[str] = []
+
+class ZoneIdTrie:
+    """
+    Prefix trie over zone IDs. IDs are inserted in sort_zone_id order and
+    every node keeps the first MAX_AUTOCOMPLETE_MATCHES IDs below it, so a
+    lookup walks the prefix and returns a ready-sorted list.
+    """
+
+    def __init__(self, zone_ids: Iterable[str]):
+        self.root = _Node()
+        self.zone_ids = sorted(set(zone_ids), key=lambda zone_id: (sort_zone_id(zone_id), zone_id))
+        for zone_id in self.zone_ids:
+            path = [self.root]
+            for ch in autocomplete_key(zone_id):
+                path.append(path[-1].children.setdefault(ch, _Node()))
+            for node in path:
+                if len(node.top) < MAX_AUTOCOMPLETE_MATCHES:
+                    node.top.append(zone_id)
+
+    @classmethod
+    def from_store(cls, store: DockmasterStore, map_id: int) -> "ZoneIdTrie":
+        """Trie over the IDs of a map's active dockmasters, grid locations and reference points included."""
+        rows = store.rows(map_id, require=FLAG_ACTIVE)
+        return cls(store.zone_names[code] for code in set(store.zone_codes[rows].tolist()))
+
+    def __len__(self) -> int:
+        return len(self.zone_ids)
+
+    def complete(self, prefix: str, limit: int = 10) -> List[dict]:
+        """Zone IDs starting with prefix (ignoring case and punctuation), in sort_zone_id order."""
+        node = self.root
+        for ch in autocomplete_key(prefix):
+            node = node.children.get(ch)
+            if node is None:
+                return []
+        return [
+            {"zone_id": zone_id, "kind": normalize_zone_id(zone_id).kind}
+            for zone_id in node.top[:limit]
+        ]
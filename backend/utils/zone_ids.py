@@ -0,0 +1,123 @@
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+# Precompiled zone ID formats, checked in this order against the cleaned (upper-cased) ID
+XD_ID_PATTERN = re.compile(r"XD-?\s*(\d+)")
+REGULAR_ID_PATTERN = re.compile(r"(\d+)([A-Z])?-?([NSEW])")
+XP_ID_PATTERN = re.compile(r"XP-?\s*(\d+)")
+GRID_ID_PATTERN = re.compile(r"M-?\s*(\d+)")
+
+# Number, letters and direction of a regular ID, for sorting
+SORT_REGULAR_ID_PATTERN = re.compile(r"(\d+)([A-Z]*)(-([NSEW]))?")
+LIST_SORT_REGULAR_ID_PATTERN = re.compile(r"(\d+)([A-Z]*)(-.*)?")
+
+# Named zones that keep their own spelling, keyed by upper-cased name
+SPECIAL_ZONE_IDS = {name.upper(): name for name in ("GH", "The Gym", "GG-Shelter")}
+
+class NormalizedZoneId(NamedTuple):
+    zone_id: str
+    kind: str  # "xd", "regular", "xp", "grid", "special" or "unknown"
+
+@lru_cache(maxsize=4096)
+def normalize_zone_id(zone_id: str) -> NormalizedZoneId:
+    """Normalize a dockmaster ID to the standardized format and classify it."""
+    # Clean the input
+    cleaned = zone_id.strip().upper()
+
+    # Handle XD format (XD1, XD2, etc. without hyphen)
+    match = XD_ID_PATTERN.match(cleaned)
+    if match:
+        return NormalizedZoneId(f"XD{match.group(1)}", "xd")
+
+    # Handle regular format (e.g., 1A-S, 1AS)
+    match = REGULAR_ID_PATTERN.match(cleaned)
+    if match:
+        num, letter, direction = match.groups()
+        return NormalizedZoneId(f"{num}{letter or ''}-{direction}", "regular")
+
+    # Handle XP and M# grid formats (XP1, M12)
+    match = XP_ID_PATTERN.fullmatch(cleaned)
+    if match:
+        return NormalizedZoneId(f"XP{match.group(1)}", "xp")
+    match = GRID_ID_PATTERN.fullmatch(cleaned)
+    if match:
+        return NormalizedZoneId(f"M{match.group(1)}", "grid")
+
+    special = SPECIAL_ZONE_IDS.get(" ".join(cleaned.split()))
+    if special:
+        return NormalizedZoneId(special, "special")
+
+    return NormalizedZoneId(cleaned, "unknown")
+
+def normalize_zone_ids(zone_ids: Iterable[str]) -> Tuple[List[str], Dict[str, str]]:
+    """
+    Normalize a batch of IDs, e.g. every ID in the dockmasters file.
+    Returns (normalized_ids, changed) where changed maps each original ID
+    that was rewritten to its normalized form.
+    """
+    normalized = []
+    changed = {}
+    for zone_id in zone_ids:
+        new_id = normalize_zone_id(zone_id).zone_id
+        normalized.append(new_id)
+        if new_id != zone_id:
+            changed[zone_id] = new_id
+    return normalized, changed
+
+def sort_zone_id(zone_id: str) -> tuple:
+    """Sort key giving the order of the dockmasters file: XD, XP, numbered, special zones, then M#."""
+    # Handle XD zones numerically (XD1, XD2, ..., XD10, XD11)
+    if zone_id.startswith("XD"):
+        try:
+            return (0, int(zone_id[2:]))  # 0 to put XD zones first, then numeric
+        except ValueError:
+            return (0, 9999)  # Invalid XD numbers go to end of XD section
+    # Handle XP zones (similar to XD)
+    elif zone_id.startswith("XP"):
+        try:
+            return (0.1, int(zone_id[2:]))  # 0.1 to put XP zones after XD
+        except ValueError:
+            return (0.1, 9999)
+    # Handle M zones (put them at the very end)
+    elif zone_id.startswith("M"):
+        try:
+            return (99, int(zone_id[1:]))  # 99 to put M zones at the very end
+        except ValueError:
+            return (99, 9999)
+    # Handle special zones (GH, The Gym, GG-Shelter, etc.)
+    elif not zone_id[0].isdigit():
+        return (50, zone_id)  # 50 to put special zones in middle
+    # Handle regular zones (numbers + letters + direction)
+    else:
+        # Extract number and letters for proper sorting
+        match = SORT_REGULAR_ID_PATTERN.match(zone_id)
+        if match:
+            number = int(match.group(1))
+            letters = match.group(2) or ""
+            direction = match.group(4) or ""
+            # Sort by number first, then letters, then direction (E, N, S, W)
+            direction_order = {"E": 1, "N": 2, "S": 3, "W": 4, "": 5}
+            return (1, number, letters, direction_order.get(direction, 5))
+        else:
+            return (2, zone_id)  # Fallback alphabetical
+
+def list_sort_zone_id(zone_id: str) -> tuple:
+    """Sort key of the dockmaster list: XD zones, then regular zones, then anything else alphabetically."""
+    # Handle XD zones numerically (XD1, XD2, ..., XD10, XD11)
+    if zone_id.startswith("XD"):
+        try:
+            return (0, int(zone_id[2:]))  # 0 to put XD zones first, then numeric
+        except ValueError:
+            return (0, 9999)  # Invalid XD numbers go to end of XD section
+    # Handle regular zones (numbers + letters)
+    else:
+        # Extract number and letters for proper sorting
+        match = LIST_SORT_REGULAR_ID_PATTERN.match(zone_id)
+        if match:
+            number = int(match.group(1))
+            letters = match.group(2) or ""
+            suffix = match.group(3) or ""
+            return (1, number, letters, suffix)  # 1 to put after XD zones
+        else:
+            return (2, zone_id)  # Fallback alphabetical
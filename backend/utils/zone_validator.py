@@ -1,4 +1,8 @@
+import bisect
+import json
 import math
+import os
+import numpy as np
 from typing import List, Tuple, Dict, Optional
 from dataclasses import dataclass
 from enum import Enum, auto
@@ -25,132 +29,570 @@ class Direction(Enum):
 
 from typing import List
 
+class _AxisSlots:
+    """
+    Splits one axis at a sorted set of breakpoints into elementary slots:
+    slot 2i + 1 is exactly breakpoints[i] and slot 2i is the open interval
+    just below it. Integer coordinates inside the breakpoint span are mapped
+    through a direct table, anything else falls back to a binary search.
+    """
+
+    def __init__(self, breakpoints: List[int]):
+        self.breakpoints = sorted(set(breakpoints))
+        self.count = 2 * len(self.breakpoints) + 1
+        self._origin = self.breakpoints[0] if self.breakpoints else 0
+        self._direct: List[int] = []
+        i = 0
+        for value in range(self._origin, self.breakpoints[-1] + 1 if self.breakpoints else self._origin):
+            if value > self.breakpoints[i]:
+                i += 1
+            self._direct.append(2 * i + 1 if value == self.breakpoints[i] else 2 * i)
+
+    def slot(self, value) -> int:
+        offset = value - self._origin
+        if type(value) is int and 0 <= offset < len(self._direct):
+            return self._direct[offset]
+        i = bisect.bisect_left(self.breakpoints, value)
+        if i < len(self.breakpoints) and self.breakpoints[i] == value:
+            return 2 * i + 1
+        return 2 * i
+
+    def slots(self, values: np.ndarray) -> np.ndarray:
+        """Vectorized slot() for an array of coordinates."""
+        breakpoints = np.asarray(self.breakpoints)
+        i = np.searchsorted(breakpoints, values, side="left")
+        exact = np.zeros(values.shape, dtype=bool)
+        inside = i < len(breakpoints)
+        exact[inside] = breakpoints[i[inside]] == values[inside]
+        return 2 * i + exact
+
+# Side of the uniform grid cells polygon regions are rasterized into
+POLYGON_CELL_SIZE = 64
+
+# Grid cell states: decided for every point in the cell, or left to the exact test
+CELL_OUTSIDE, CELL_INSIDE, CELL_EDGE = 0, 1, 2
+
+def _segment_distance(px: float, py: float, ax: float, ay: float, bx: float, by: float) -> float:
+    """Distance from a point to the segment a-b."""
+    dx, dy = bx - ax, by - ay
+    length2 = dx * dx + dy * dy
+    t = 0.0 if length2 == 0 else max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length2))
+    return math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+def point_in_polygon(x, y, vertices: List[Tuple[int, int]]) -> bool:
+    """Even-odd test. Points on an edge count as inside, like rectangle edges do."""
+    inside = False
+    count = len(vertices)
+    for i in range(count):
+        ax, ay = vertices[i]
+        bx, by = vertices[(i + 1) % count]
+        # On the edge itself
+        if (bx - ax) * (y - ay) == (by - ay) * (x - ax) and \
+                min(ax, bx) <= x <= max(ax, bx) and min(ay, by) <= y <= max(ay, by):
+            return True
+        if (ay > y) != (by > y) and x < ax + (y - ay) * (bx - ax) / (by - ay):
+            inside = not inside
+    return inside
+
+class _PolygonGrid:
+    """
+    Uniform grid over a polygon's bounding box grown by a margin. Each cell
+    is classified once from its center; points outside the grid are
+    CELL_OUTSIDE.
+    """
+
+    def __init__(self, vertices: List[Tuple[int, int]], margin: float, classify):
+        self.min_x = min(x for x, _ in vertices) - margin
+        self.min_y = min(y for _, y in vertices) - margin
+        self.columns = int((max(x for x, _ in vertices) + margin - self.min_x) // POLYGON_CELL_SIZE) + 1
+        self.rows = int((max(y for _, y in vertices) + margin - self.min_y) // POLYGON_CELL_SIZE) + 1
+        half_diagonal = POLYGON_CELL_SIZE * math.sqrt(2) / 2
+        self.states = np.array([
+            classify(self.min_x + (i + 0.5) * POLYGON_CELL_SIZE, self.min_y + (j + 0.5) * POLYGON_CELL_SIZE, half_diagonal)
+            for i in range(self.columns) for j in range(self.rows)
+        ], dtype=np.int8)
+
+    def state(self, x, y) -> int:
+        i = int((x - self.min_x) // POLYGON_CELL_SIZE)
+        j = int((y - self.min_y) // POLYGON_CELL_SIZE)
+        if 0 <= i < self.columns and 0 <= j < self.rows:
+            return int(self.states[i * self.rows + j])
+        return CELL_OUTSIDE
+
+    def states_for(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """Vectorized state() for arrays of coordinates."""
+        i = np.floor_divide(xs - self.min_x, POLYGON_CELL_SIZE).astype(np.int64)
+        j = np.floor_divide(ys - self.min_y, POLYGON_CELL_SIZE).astype(np.int64)
+        inside = (i >= 0) & (i < self.columns) & (j >= 0) & (j < self.rows)
+        states = np.full(xs.shape, CELL_OUTSIDE, dtype=np.int8)
+        states[inside] = self.states[i[inside] * self.rows + j[inside]]
+        return states
+
+class PolygonRegion:
+    """
+    A polygon zone region. Containment is answered from a coarse grid, and
+    only points in cells crossed by an edge get the exact polygon test.
+    """
+
+    def __init__(self, vertices: List[Tuple[int, int]]):
+        self.vertices = [(x, y) for x, y in vertices]
+        self._grid = _PolygonGrid(self.vertices, 0, self._classify_cell)
+        self._near_grids: Dict[int, _PolygonGrid] = {}
+
+    def boundary_distance(self, x, y) -> float:
+        """Distance from a point to the nearest polygon edge."""
+        count = len(self.vertices)
+        return min(
+            _segment_distance(x, y, *self.vertices[i], *self.vertices[(i + 1) % count])
+            for i in range(count)
+        )
+
+    def _classify_cell(self, cx: float, cy: float, half_diagonal: float) -> int:
+        if self.boundary_distance(cx, cy) <= half_diagonal:
+            return CELL_EDGE
+        return CELL_INSIDE if point_in_polygon(cx, cy, self.vertices) else CELL_OUTSIDE
+
+    def contains(self, x, y) -> bool:
+        state = self._grid.state(x, y)
+        if state == CELL_EDGE:
+            return point_in_polygon(x, y, self.vertices)
+        return state == CELL_INSIDE
+
+    def contains_many(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """Vectorized contains() for arrays of coordinates."""
+        states = self._grid.states_for(xs, ys)
+        result = states == CELL_INSIDE
+        for i in np.flatnonzero(states == CELL_EDGE):
+            result[i] = point_in_polygon(xs[i], ys[i], self.vertices)
+        return result
+
+    def _near_grid(self, threshold: int) -> _PolygonGrid:
+        grid = self._near_grids.get(threshold)
+        if grid is None:
+            def classify(cx, cy, half_diagonal):
+                distance = self.boundary_distance(cx, cy)
+                if distance + half_diagonal <= threshold:
+                    return CELL_INSIDE
+                if distance - half_diagonal > threshold:
+                    return CELL_OUTSIDE
+                return CELL_EDGE
+            grid = self._near_grids[threshold] = _PolygonGrid(self.vertices, max(threshold, 0), classify)
+        return grid
+
+    def near_boundary(self, x, y, threshold: int) -> bool:
+        """True if the point is within the threshold of an edge."""
+        state = self._near_grid(threshold).state(x, y)
+        if state == CELL_EDGE:
+            return self.boundary_distance(x, y) <= threshold
+        return state == CELL_INSIDE
+
+    def near_boundary_many(self, xs: np.ndarray, ys: np.ndarray, threshold: int) -> np.ndarray:
+        """Vectorized near_boundary() for arrays of coordinates."""
+        states = self._near_grid(threshold).states_for(xs, ys)
+        result = states == CELL_INSIDE
+        for i in np.flatnonzero(states == CELL_EDGE):
+            result[i] = self.boundary_distance(xs[i], ys[i]) <= threshold
+        return result
+
+class ZoneLookup:
+    """
+    Point-in-zone table compiled from a set of ComplexZones.
+
+    Every region edge becomes a breakpoint on its axis, so each elementary
+    cell is either entirely inside or entirely outside every region. A cell
+    stores a bitmask of the zones containing it (bit i is names[i]) and the
+    zone that wins under the priority order, so a lookup is two slot lookups
+    and a list index. Polygon regions are tested on top of the table through
+    their own grids.
+    """
+
+    def __init__(self, zones: Dict[str, "ComplexZone"], priority: List[str]):
+        self.names = list(zones)
+        regions = [(bit, region) for bit, zone in enumerate(zones.values()) for region in zone.regions]
+        self.x_slots = _AxisSlots([v for _, r in regions for v in (r.min_x, r.max_x)])
+        self.y_slots = _AxisSlots([v for _, r in regions for v in (r.min_y, r.max_y)])
+
+        columns = self.y_slots.count
+        self.masks = [0] * (self.x_slots.count * columns)
+        for bit, region in regions:
+            # Inverted regions contain no points
+            if region.min_x > region.max_x or region.min_y > region.max_y:
+                continue
+            for sx in range(self.x_slots.slot(region.min_x), self.x_slots.slot(region.max_x) + 1):
+                for sy in range(self.y_slots.slot(region.min_y), self.y_slots.slot(region.max_y) + 1):
+                    self.masks[sx * columns + sy] |= 1 << bit
+
+        self.polygons = [(bit, polygon) for bit, zone in enumerate(zones.values()) for polygon in zone.polygons]
+        self._bands: Dict[int, TransitionBands] = {}
+        self._ranked = [(1 << self.names.index(name), name) for name in priority if name in zones]
+        self.resolved: List[Optional[str]] = [self.resolve(mask) for mask in self.masks]
+
+    def resolve(self, mask: int) -> Optional[str]:
+        """Highest priority zone in a zone bitmask."""
+        return next((name for bit, name in self._ranked if mask & bit), None)
+
+    def transition_bands(self, threshold: int) -> "TransitionBands":
+        """Transition bands for this layout, compiled once per threshold."""
+        bands = self._bands.get(threshold)
+        if bands is None:
+            bands = self._bands[threshold] = TransitionBands(self, threshold)
+        return bands
+
+    def _cell(self, x, y) -> int:
+        return self.x_slots.slot(x) * self.y_slots.count + self.y_slots.slot(y)
+
+    def mask_for(self, point: Point) -> int:
+        """Bitmask of the zones containing the point."""
+        mask = self.masks[self._cell(point.x, point.y)]
+        for bit, polygon in self.polygons:
+            if not mask & (1 << bit) and polygon.contains(point.x, point.y):
+                mask |= 1 << bit
+        return mask
+
+    def zone_for(self, point: Point) -> Optional[str]:
+        """Highest priority zone containing the point."""
+        if self.polygons:
+            return self.resolve(self.mask_for(point))
+        return self.resolved[self._cell(point.x, point.y)]
+
+    def cells_for(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """Vectorized cell index for arrays of coordinates."""
+        return self.x_slots.slots(xs) * self.y_slots.count + self.y_slots.slots(ys)
+
+    def masks_for(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """Vectorized mask_for() for arrays of coordinates."""
+        masks = np.array(self.masks, dtype=np.int64)[self.cells_for(xs, ys)]
+        for bit, polygon in self.polygons:
+            masks[polygon.contains_many(xs, ys)] |= 1 << bit
+        return masks
+
+    def zone_codes_for(self, xs: np.ndarray, ys: np.ndarray, missing: int = -1) -> np.ndarray:
+        """Vectorized zone_for() as indexes into names, or missing for no zone."""
+        masks, inverse = np.unique(self.masks_for(xs, ys), return_inverse=True)
+        codes = np.array([
+            self.names.index(name) if name is not None else missing
+            for name in map(self.resolve, masks.tolist())
+        ], dtype=np.int16)
+        return codes[inverse.reshape(-1)]
+
+class _Band:
+    """Union of the closed intervals [edge - threshold, edge + threshold] on one axis."""
+
+    def __init__(self, edges: List[int], threshold: int):
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        if threshold >= 0:
+            for edge in sorted(edges):
+                if self.ends and edge - threshold <= self.ends[-1]:
+                    self.ends[-1] = edge + threshold
+                else:
+                    self.starts.append(edge - threshold)
+                    self.ends.append(edge + threshold)
+
+        # Direct membership table for integer coordinates
+        self._origin = self.starts[0] if self.starts else 0
+        self._direct = bytearray()
+        if self.starts and type(threshold) is int:
+            self._direct = bytearray(self.ends[-1] - self._origin + 1)
+            for start, end in zip(self.starts, self.ends):
+                self._direct[start - self._origin:end - self._origin + 1] = b"\x01" * (end - start + 1)
+
+    def contains(self, value) -> bool:
+        offset = value - self._origin
+        if type(value) is int and self._direct:
+            return 0 <= offset < len(self._direct) and self._direct[offset] == 1
+        i = bisect.bisect_right(self.starts, value) - 1
+        return i >= 0 and value <= self.ends[i]
+
+    def contains_many(self, values: np.ndarray) -> np.ndarray:
+        i = np.searchsorted(np.asarray(self.starts), values, side="right") - 1
+        inside = i >= 0
+        result = np.zeros(values.shape, dtype=bool)
+        result[inside] = values[inside] <= np.asarray(self.ends)[i[inside]]
+        return result
+
+class TransitionBands:
+    """
+    is_transition_point answers for one zone layout and threshold: points
+    covered by more than one zone, plus points within the threshold of any
+    rectangle edge on either axis or of any polygon edge.
+    """
+
+    def __init__(self, lookup: ZoneLookup, threshold: int):
+        self.lookup = lookup
+        self.threshold = threshold
+        self.x_band = _Band(lookup.x_slots.breakpoints, threshold)
+        self.y_band = _Band(lookup.y_slots.breakpoints, threshold)
+        self.overlapping = [bin(mask).count("1") > 1 for mask in lookup.masks]
+
+    def contains(self, point: Point) -> bool:
+        if self.x_band.contains(point.x) or self.y_band.contains(point.y):
+            return True
+        if not self.lookup.polygons:
+            return self.overlapping[self.lookup._cell(point.x, point.y)]
+        if any(polygon.near_boundary(point.x, point.y, self.threshold) for _, polygon in self.lookup.polygons):
+            return True
+        return bin(self.lookup.mask_for(point)).count("1") > 1
+
+    def contains_many(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """Vectorized contains() for arrays of coordinates."""
+        result = self.x_band.contains_many(xs) | self.y_band.contains_many(ys)
+        if not self.lookup.polygons:
+            return result | np.array(self.overlapping, dtype=bool)[self.lookup.cells_for(xs, ys)]
+        for _, polygon in self.lookup.polygons:
+            result |= polygon.near_boundary_many(xs, ys, self.threshold)
+        masks = self.lookup.masks_for(xs, ys)
+        zone_counts = sum((masks >> bit) & 1 for bit in range(len(self.lookup.names)))
+        return result | (zone_counts > 1)
+
 class ComplexZone:
+    # Bumped on every region change so compiled lookups know to rebuild
+    generation = 0
+
     def __init__(self, name: str, primary_direction: str):
         self.name = name
         self.primary_direction = primary_direction
         self.regions: List[Zone] = []
+        self.polygons: List[PolygonRegion] = []
+        self._lookup: Optional[ZoneLookup] = None
 
     def add_region(self, min_x: int, max_x: int, min_y: int, max_y: int):
         self.regions.append(Zone(min_x=min_x, max_x=max_x, min_y=min_y, max_y=max_y, primary_direction=self.primary_direction))
+        self._lookup = None
+        ComplexZone.generation += 1
 
-    def contains_point(self, point: Point) -> bool:
-        return any(
-            region.min_x <= point.x <= region.max_x and
-            region.min_y <= point.y <= region.max_y
-            for region in self.regions
-        )
+    def add_polygon(self, vertices: List[Tuple[int, int]]):
+        self.polygons.append(PolygonRegion(vertices))
+        self._lookup = None
+        ComplexZone.generation += 1
 
-# Define complex zones with multiple regions
-COMPLEX_ZONES = {
-    "XD": ComplexZone("XD", "XD"),
-    "SOUTH": ComplexZone("SOUTH", "S"),
-    "EAST": ComplexZone("EAST", "E"),
-    "WEST": ComplexZone("WEST", "W"),
-}
-
-# XD Zone: x:3000-5000, y:2000-4000
-COMPLEX_ZONES["XD"].add_region(min_x=3000, max_x=5000, min_y=2000, max_y=4000)
-
-# South Zone - Multiple regions
-# Main southern area
-COMPLEX_ZONES["SOUTH"].add_region(min_x=0, max_x=3000, min_y=2500, max_y=3000)
-# Extended area
-COMPLEX_ZONES["SOUTH"].add_region(min_x=0, max_x=3500, min_y=3500, max_y=4000)
-# South Islands
-COMPLEX_ZONES["SOUTH"].add_region(min_x=0, max_x=3500, min_y=4000, max_y=3400)
-
-# East Zone
-COMPLEX_ZONES["EAST"].add_region(min_x=3200, max_x=5000, min_y=0, max_y=2000)
-
-# West Zone - Complex shape
-COMPLEX_ZONES["WEST"].add_region(min_x=0, max_x=800, min_y=0, max_y=600)
-COMPLEX_ZONES["WEST"].add_region(min_x=0, max_x=1300, min_y=700, max_y=800)
-COMPLEX_ZONES["WEST"].add_region(min_x=0, max_x=1500, min_y=800, max_y=1000)
-COMPLEX_ZONES["WEST"].add_region(min_x=0, max_x=3600, min_y=1000, max_y=2500)
+    def contains_point(self, point: Point) -> bool:
+        if self._lookup is None:
+            self._lookup = ZoneLookup({self.name: self}, [self.name])
+        return self._lookup.mask_for(point) != 0
 
 def calculate_distance(p1: Point, p2: Point) -> float:
     """Calculate Euclidean distance between two points."""
     return math.sqrt((p2.x - p1.x) ** 2 + (p2.y - p1.y) ** 2)
 
-def get_zone_for_point(point: Point) -> Optional[str]:
+# Directions a zone can validate dockmaster IDs against
+ZONE_DIRECTIONS = ("N", "S", "E", "W", "XD")
+
+class ZoneLayout:
+    """The zones of one map and the priority order they are checked in."""
+
+    def __init__(self, zones: Dict[str, ComplexZone], priority: Optional[List[str]] = None):
+        self.zones = zones
+        self.priority = priority if priority is not None else list(zones)
+        self._compiled: Tuple[int, Optional[ZoneLookup]] = (-1, None)
+
+    @property
+    def lookup(self) -> ZoneLookup:
+        """Compiled lookup for this layout, rebuilt only after a region change."""
+        generation, lookup = self._compiled
+        if lookup is None or generation != ComplexZone.generation:
+            generation = ComplexZone.generation
+            lookup = ZoneLookup(self.zones, self.priority)
+            self._compiled = (generation, lookup)
+        return lookup
+
+DEFAULT_MAP = 7
+
+# Zone definitions are data, so fixing a zone doesn't need a code change
+ZONES_CONFIG_PATH = os.getenv(
+    "ZONES_CONFIG_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "zones.json")
+)
+
+def _parse_coordinate(value, where: str) -> int:
+    # bool is an int subclass, but never a coordinate
+    if type(value) is not int:
+        raise ValueError(f"{where}: coordinates must be integers, got {value!r}")
+    return value
+
+def _parse_zone(name: str, config, where: str) -> ComplexZone:
+    if not isinstance(config, dict):
+        raise ValueError(f"{where}: expected an object")
+    direction = config.get("direction")
+    if direction not in ZONE_DIRECTIONS:
+        raise ValueError(f"{where}: direction must be one of {', '.join(ZONE_DIRECTIONS)}, got {direction!r}")
+    regions = config.get("regions")
+    if not isinstance(regions, list) or not regions:
+        raise ValueError(f"{where}: needs a non-empty 'regions' list")
+
+    zone = ComplexZone(name, direction)
+    for i, region in enumerate(regions, 1):
+        if not isinstance(region, dict):
+            raise ValueError(f"{where}, region {i}: expected an object")
+        region_where = f"{where}, region {region.get('label', i)}"
+
+        if "polygon" in region:
+            vertices = region["polygon"]
+            if not isinstance(vertices, list) or len(vertices) < 3:
+                raise ValueError(f"{region_where}: a polygon needs at least 3 vertices")
+            points = []
+            for vertex in vertices:
+                if not isinstance(vertex, list) or len(vertex) != 2:
+                    raise ValueError(f"{region_where}: vertices must be [x, y] pairs, got {vertex!r}")
+                points.append((_parse_coordinate(vertex[0], region_where), _parse_coordinate(vertex[1], region_where)))
+            # Shoelace area; zero means every vertex is on one line
+            area = sum(
+                points[j][0] * points[(j + 1) % len(points)][1] - points[(j + 1) % len(points)][0] * points[j][1]
+                for j in range(len(points))
+            )
+            if area == 0:
+                raise ValueError(f"{region_where}: polygon has no area")
+            zone.add_polygon(points)
+        else:
+            bounds = {}
+            for key in ("min_x", "max_x", "min_y", "max_y"):
+                if key not in region:
+                    raise ValueError(f"{region_where}: missing {key}")
+                bounds[key] = _parse_coordinate(region[key], region_where)
+            if bounds["min_x"] > bounds["max_x"] or bounds["min_y"] > bounds["max_y"]:
+                raise ValueError(f"{region_where}: rectangle is inverted ({bounds})")
+            zone.add_region(**bounds)
+    return zone
+
+def parse_zone_layouts(config) -> Dict[int, ZoneLayout]:
+    """
+    Validate a zones config and compile a layout per map.
+    Raises ValueError describing the first problem found.
+    """
+    maps = config.get("maps") if isinstance(config, dict) else None
+    if not isinstance(maps, dict) or not maps:
+        raise ValueError("Zones config needs a non-empty 'maps' object")
+
+    layouts: Dict[int, ZoneLayout] = {}
+    for map_key, map_config in maps.items():
+        try:
+            map_id = int(map_key)
+        except ValueError:
+            raise ValueError(f"Map ID {map_key!r} is not a number")
+        where = f"map {map_id}"
+        zone_configs = map_config.get("zones") if isinstance(map_config, dict) else None
+        if not isinstance(zone_configs, dict) or not zone_configs:
+            raise ValueError(f"{where}: needs a non-empty 'zones' object")
+
+        zones = {
+            name: _parse_zone(name, zone_config, f"{where}, zone {name}")
+            for name, zone_config in zone_configs.items()
+        }
+
+        priority = map_config.get("priority", list(zones))
+        if (not isinstance(priority, list) or not all(isinstance(name, str) for name in priority) or
+                len(priority) != len(zones) or set(priority) != set(zones)):
+            raise ValueError(f"{where}: priority must list every zone exactly once, got {priority!r}")
+        layouts[map_id] = ZoneLayout(zones, priority)
+
+    if DEFAULT_MAP not in layouts:
+        raise ValueError(f"Zones config has no layout for the default map {DEFAULT_MAP}")
+
+    # Compile before anything can see the layouts, so requests never pay for it
+    for layout in layouts.values():
+        layout.lookup.transition_bands(200)
+    return layouts
+
+def load_zone_layouts(path: Optional[str] = None) -> Dict[int, ZoneLayout]:
+    """Load and compile the zone layouts from the zones config file."""
+    with open(path or ZONES_CONFIG_PATH) as f:
+        try:
+            config = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Zones config is not valid JSON: {e}")
+    return parse_zone_layouts(config)
+
+# Zone layouts per map; maps without a layout of their own use the default map's.
+# Replaced as a whole on reload, never modified in place.
+ZONE_LAYOUTS: Dict[int, ZoneLayout] = load_zone_layouts()
+
+# The default map's zones, as used before layouts were per map
+COMPLEX_ZONES = ZONE_LAYOUTS[DEFAULT_MAP].zones
+ZONE_PRIORITY = ZONE_LAYOUTS[DEFAULT_MAP].priority
+
+def reload_zone_layouts(path: Optional[str] = None) -> Dict[int, ZoneLayout]:
+    """
+    Re-read the zones config and swap it in. Everything is validated and
+    compiled before the swap, so a bad config leaves the current layouts
+    in place and lookups never see a half-loaded set.
+    """
+    global ZONE_LAYOUTS, COMPLEX_ZONES, ZONE_PRIORITY
+    layouts = load_zone_layouts(path)
+    ZONE_LAYOUTS = layouts
+    COMPLEX_ZONES = layouts[DEFAULT_MAP].zones
+    ZONE_PRIORITY = layouts[DEFAULT_MAP].priority
+    return layouts
+
+def get_zone_layout(map_id: Optional[int] = None) -> ZoneLayout:
+    """Zone layout for a map."""
+    layouts = ZONE_LAYOUTS
+    layout = layouts.get(DEFAULT_MAP if map_id is None else map_id)
+    return layout if layout is not None else layouts[DEFAULT_MAP]
+
+def set_zone_layout(map_id: int, zones: Dict[str, ComplexZone], priority: Optional[List[str]] = None):
+    """Configure the zone layout used for a map."""
+    global ZONE_LAYOUTS
+    ZONE_LAYOUTS = {**ZONE_LAYOUTS, map_id: ZoneLayout(zones, priority)}
+
+def get_zone_lookup(map_id: Optional[int] = None) -> ZoneLookup:
+    """Compiled point-in-zone lookup for a map."""
+    return get_zone_layout(map_id).lookup
+
+def get_zone_for_point(point: Point, map_id: Optional[int] = None) -> Optional[str]:
     """Determine which zone a point belongs to."""
-    # XD zone takes absolute priority if coordinates are in its range
-    if 3000 <= point.x <= 5000 and 2000 <= point.y <= 4000:
-        return "XD"
-        
-    # Check other zones in priority order (S > E > W)
-    priority_order = ["SOUTH", "EAST", "WEST"]
-    
-    for zone_name in priority_order:
-        zone = COMPLEX_ZONES[zone_name]
-        if zone.contains_point(point):
-            return zone_name
-    return None
+    return get_zone_lookup(map_id).zone_for(point)
 
-def is_transition_point(point: Point, threshold: int = 200) -> bool:
+def is_transition_point(point: Point, threshold: int = 200, map_id: Optional[int] = None) -> bool:
     """
     Determine if a point is in a transition area between zones.
     Returns True if the point is near the boundary of any zone or if it's in multiple zones.
     """
-    # Count how many zones this point could belong to
-    matching_zones = sum(1 for zone in COMPLEX_ZONES.values() if zone.contains_point(point))
-    if matching_zones > 1:
-        return True
-    
-    # Check if we're near any zone boundaries
-    for zone in COMPLEX_ZONES.values():
-        for region in zone.regions:
-            # Check if point is near any region boundary
-            near_x_boundary = (
-                abs(point.x - region.min_x) <= threshold or 
-                abs(point.x - region.max_x) <= threshold
-            )
-            near_y_boundary = (
-                abs(point.y - region.min_y) <= threshold or 
-                abs(point.y - region.max_y) <= threshold
-            )
-            if near_x_boundary or near_y_boundary:
-                return True
-    return False
+    return get_zone_lookup(map_id).transition_bands(threshold).contains(point)
 
-def validate_dockmaster_match(point: Point, matched_dm: str) -> bool:
+def get_dockmaster_direction(matched_dm: str) -> str:
+    """Extract the direction suffix a dockmaster ID is validated against."""
+    if "-" in matched_dm:
+        return matched_dm.split("-")[-1]
+    # If no hyphen, take the last character
+    return matched_dm[-1:]
+
+def zone_match_issue(zone: Optional[str], matched_dm: str, map_id: Optional[int] = None) -> Optional[str]:
     """
-    Validate if a matched dockmaster makes sense for the given coordinates.
-    Returns True if the match is valid, False otherwise.
+    Why a dockmaster can't answer a point in the given zone (None when it can):
+    "outside_zones", "not_xd_in_xd", "xd_outside_xd" or "wrong_direction".
     """
-    # For XD zone, strictly enforce boundaries
-    if 3000 <= point.x <= 5000 and 2000 <= point.y <= 4000:
-        return matched_dm.startswith("XD")
-        
-    zone = get_zone_for_point(point)
     if not zone:
-        return False
+        return "outside_zones"
     
-    # Handle XD zone specially
+    # For XD zone, strictly enforce boundaries (XD also wins over any overlapping zone)
     if zone == "XD":
-        return matched_dm.startswith("XD")
+        return None if matched_dm.startswith("XD") else "not_xd_in_xd"
         
     # For cardinal directions, extract direction from the end
-    if "-" in matched_dm:
-        dm_direction = matched_dm.split("-")[-1]
-    else:
-        # If no hyphen, take the last character
-        dm_direction = matched_dm[-1]
-    
-    # Prevent N matches in XD zone
-    if dm_direction == "N" and 3000 <= point.x <= 5000 and 2000 <= point.y <= 4000:
-        return False
+    dm_direction = get_dockmaster_direction(matched_dm)
     
     # For cardinal directions
-    zone_obj = COMPLEX_ZONES[zone]
-    return dm_direction == zone_obj.primary_direction
+    zone_obj = get_zone_layout(map_id).zones[zone]
+    if dm_direction == zone_obj.primary_direction:
+        return None
+    return "xd_outside_xd" if matched_dm.startswith("XD") else "wrong_direction"
+
+def validate_dockmaster_match(point: Point, matched_dm: str, map_id: Optional[int] = None) -> bool:
+    """
+    Validate if a matched dockmaster makes sense for the given coordinates.
+    Returns True if the match is valid, False otherwise.
+    """
+    return zone_match_issue(get_zone_for_point(point, map_id), matched_dm, map_id) is None
 
-def suggest_correct_dockmaster(point: Point, available_dockmasters: List[str]) -> Optional[str]:
+def suggest_correct_dockmaster(
+    point: Point,
+    available_dockmasters: List[str],
+    map_id: Optional[int] = None
+) -> Optional[str]:
     """
     Suggest the most appropriate dockmaster based on coordinates.
     """
-    zone = get_zone_for_point(point)
+    zone = get_zone_for_point(point, map_id)
     if not zone:
         return None
     
@@ -161,7 +603,7 @@ def suggest_correct_dockmaster(point: Point, available_dockmasters: List[str]) -
             if dm.startswith("XD-"):
                 valid_dms.append(dm)
         else:
-            zone_obj = COMPLEX_ZONES[zone]
+            zone_obj = get_zone_layout(map_id).zones[zone]
             if dm.endswith(zone_obj.primary_direction):
                 valid_dms.append(dm)
     
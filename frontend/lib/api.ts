@@ -18,6 +18,11 @@ export interface DockmasterEntry {
   enabled: boolean
 }
 
+export interface ZoneIdMatch {
+  zone_id: string
+  kind: 'xd' | 'regular' | 'xp' | 'grid' | 'special' | 'unknown'
+}
+
 export interface SuggestionCreate {
   action: 'add' | 'remove'
   zone_id: string
@@ -30,6 +35,15 @@ export interface SuggestionCreate {
   submitter_discord?: string
 }
 
+export interface ReviewFlag {
+  type: 'near_dockmaster' | 'near_pending_suggestion' | 'unknown_zone_id' | 'duplicate_pending_removal'
+  zone_id: string
+  suggestion_id?: string
+  x?: number
+  y?: number
+  distance?: number
+}
+
 export interface Suggestion extends SuggestionCreate {
   id: string
   status: 'pending' | 'approved' | 'rejected'
@@ -41,6 +55,19 @@ export interface Suggestion extends SuggestionCreate {
   pr_number?: number
   pr_error?: string
   pr_retry_count?: number
+  review_flags?: ReviewFlag[]
+  nearest_zone_id?: string
+  nearest_distance?: number
+  detected_zone?: string
+  match_confidence?: number
+}
+
+export interface SuggestionQuery {
+  sort?: 'created_at' | 'confidence' | 'distance'
+  order?: 'asc' | 'desc'
+  min_confidence?: number
+  max_confidence?: number
+  zone?: string
 }
 
 export interface Admin {
@@ -59,11 +86,17 @@ export interface AdminCreate {
 // API functions
 export const apiService = {
   // GitHub/Dockmasters
-  async getDockmasters(): Promise<DockmasterEntry[]> {
-    const response = await api.get('/api/dockmasters/')
+  async getDockmasters(viewport?: { bbox: [number, number, number, number], map?: number }): Promise<DockmasterEntry[]> {
+    const params = viewport ? { bbox: viewport.bbox.join(','), map: viewport.map } : undefined
+    const response = await api.get('/api/dockmasters/', { params })
     return response.data
   },
 
+  async autocompleteZoneIds(prefix: string, limit = 10): Promise<ZoneIdMatch[]> {
+    const response = await api.get('/api/dockmasters/autocomplete', { params: { prefix, limit } })
+    return response.data.matches
+  },
+
   async refreshDockmasters(): Promise<{ message: string, total_dockmasters: number, active_visible_dockmasters: number }> {
     const response = await api.post('/api/dockmasters/refresh')
     return response.data
@@ -75,8 +108,8 @@ export const apiService = {
     return response.data
   },
 
-  async getSuggestions(status?: string): Promise<Suggestion[]> {
-    const params = status ? { status } : {}
+  async getSuggestions(status?: string, query: SuggestionQuery = {}): Promise<Suggestion[]> {
+    const params = status ? { status, ...query } : query
     const response = await api.get('/api/suggestions/', { params })
     return response.data
   },
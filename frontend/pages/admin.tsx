@@ -16,6 +16,7 @@ export default function AdminPage() {
   })
   const [loading, setLoading] = useState(true)
   const [filter, setFilter] = useState<string>('all')
+  const [sort, setSort] = useState<'created_at' | 'confidence'>('created_at')
   const [showAdminManagement, setShowAdminManagement] = useState(false)
   const [newAdminData, setNewAdminData] = useState<AdminCreate>({ discord_id: '', username: '' })
   const [editingSuggestion, setEditingSuggestion] = useState<Suggestion | null>(null)
@@ -40,7 +41,7 @@ export default function AdminPage() {
     if (isSuperAdmin) {
       loadAdmins()
     }
-  }, [filter, isSuperAdmin])
+  }, [filter, sort, isSuperAdmin])
 
   const loadData = async () => {
     try {
@@ -48,7 +49,11 @@ export default function AdminPage() {
       
       // Load suggestions
       const filterStatus = filter === 'all' ? undefined : filter
-      const suggestionsData = await apiService.getSuggestions(filterStatus)
+      // Lowest confidence first: those need the closest look
+      const suggestionsData = await apiService.getSuggestions(
+        filterStatus,
+        sort === 'confidence' ? { sort: 'confidence', order: 'asc' } : {}
+      )
       setSuggestions(suggestionsData)
       
       // Load stats
@@ -338,6 +343,16 @@ export default function AdminPage() {
                   {tab.label} ({tab.count})
                 </button>
               ))}
+              <div className="ml-auto flex items-center">
+                <select
+                  value={sort}
+                  onChange={(e) => setSort(e.target.value as 'created_at' | 'confidence')}
+                  className="text-sm border-gray-300 rounded-md"
+                >
+                  <option value="created_at">Newest first</option>
+                  <option value="confidence">Lowest match confidence first</option>
+                </select>
+              </div>
             </nav>
           </div>
 
@@ -399,6 +414,30 @@ export default function AdminPage() {
                           </div>
                         )}
 
+                        {suggestion.action === 'add' && suggestion.detected_zone && (
+                          <div className="text-sm text-gray-500 mb-2">
+                            <strong>Zone:</strong> {suggestion.detected_zone}
+                            {suggestion.nearest_zone_id && (
+                              <>, nearest {suggestion.nearest_zone_id} ({suggestion.nearest_distance} units,
+                              confidence {Math.round((suggestion.match_confidence ?? 0) * 100)}%)</>
+                            )}
+                          </div>
+                        )}
+
+                        {suggestion.review_flags && suggestion.review_flags.length > 0 && (
+                          <div className="text-sm text-yellow-800 bg-yellow-50 border-l-4 border-yellow-400 p-2 mb-2 space-y-1">
+                            <div className="font-medium">⚠️ Possible duplicate</div>
+                            {suggestion.review_flags.map((flag, i) => (
+                              <div key={i}>
+                                {flag.type === 'near_dockmaster' && `${flag.distance} units from existing dockmaster ${flag.zone_id} (${flag.x}, ${flag.y})`}
+                                {flag.type === 'near_pending_suggestion' && `${flag.distance} units from pending suggestion for ${flag.zone_id} (${flag.x}, ${flag.y})`}
+                                {flag.type === 'unknown_zone_id' && `No dockmaster ${flag.zone_id} exists`}
+                                {flag.type === 'duplicate_pending_removal' && `Another pending suggestion already removes ${flag.zone_id}`}
+                              </div>
+                            ))}
+                          </div>
+                        )}
+
                         <div className="text-sm text-gray-500 space-y-1">
                           <div><strong>Submitted:</strong> {format(new Date(suggestion.created_at), 'PPpp')}</div>
                           {suggestion.submitter_name && (
@@ -2,7 +2,7 @@ import React, { useState, useEffect, useCallback } from 'react'
 import Layout from '@/components/Layout'
 import GGMemberGuard from '@/components/GGMemberGuard'
 import { useForm } from 'react-hook-form'
-import { SuggestionCreate, apiService, DockmasterEntry } from '@/lib/api'
+import { SuggestionCreate, apiService, DockmasterEntry, ZoneIdMatch } from '@/lib/api'
 import { useAuth } from '@/lib/auth'
 import toast from 'react-hot-toast'
 import { useRouter } from 'next/router'
@@ -120,6 +120,22 @@ export default function SuggestPage() {
   }, [router.isReady, router.query, setValue, dockmasters.length])
 
   const watchAction = watch('action')
+  const watchZoneId = watch('zone_id')
+  const [zoneIdMatches, setZoneIdMatches] = useState<ZoneIdMatch[]>([])
+
+  // Existing zone IDs starting with what has been typed, so duplicates are easy to spot
+  useEffect(() => {
+    if (watchAction !== 'add' || !watchZoneId) {
+      setZoneIdMatches([])
+      return
+    }
+    const timer = setTimeout(() => {
+      apiService.autocompleteZoneIds(watchZoneId)
+        .then(setZoneIdMatches)
+        .catch(() => setZoneIdMatches([]))
+    }, 150)
+    return () => clearTimeout(timer)
+  }, [watchAction, watchZoneId])
 
   // When action changes to remove, skip coord step
   useEffect(() => {
@@ -730,9 +746,16 @@ export default function SuggestPage() {
                             }
                           })}
                           type="text"
+                          list="zone-id-matches"
+                          autoComplete="off"
                           placeholder="e.g., XD11, 1A-E, 2B-N, 4C-E"
                           className="mt-1 block w-full border-gray-300 rounded-md shadow-sm focus:ring-primary-500 focus:border-primary-500 sm:text-sm"
                         />
+                        <datalist id="zone-id-matches">
+                          {zoneIdMatches.map((match) => (
+                            <option key={match.zone_id} value={match.zone_id}>Already exists</option>
+                          ))}
+                        </datalist>
                         <p className="mt-1 text-xs text-gray-500">
                           Format: XD + number (e.g., XD11) or NumberLetter-Direction (e.g., 1A-E, 2B-N). Make sure this Zone ID doesn't already exist.
                         </p>